@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Effects chain benchmark
+
+Times EffectsSource.read over N frames of 48 kHz stereo int16 noise with the
+chain bypassed, with volume only, with the two-band EQ, and with the volume
+high enough that most frames go through the soft limiter. The AudioPlayer
+thread has a 20 ms budget per frame, shared with FFmpeg and Opus encoding.
+
+Usage:
+    python bench/bench_effects.py [frames]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np  # noqa: E402
+from discord.opus import Encoder as OpusEncoder  # noqa: E402
+
+import Effects  # noqa: E402
+
+# Number of distinct frames cycled through (so the source does not allocate while timed)
+DISTINCT = 64
+
+
+class NoiseSource:
+    """Returns prebuilt frames of noise at about -6 dBFS"""
+
+    def __init__(self, frames: int):
+        rng = np.random.default_rng(0)
+        self.frames = [
+            (rng.standard_normal(OpusEncoder.SAMPLES_PER_FRAME * OpusEncoder.CHANNELS) * 16384 / 3)
+            .clip(-32768, 32767).astype(np.int16).tobytes()
+            for _ in range(DISTINCT)
+        ]
+        self.remaining = frames
+
+    def read(self) -> bytes:
+        self.remaining -= 1
+        return self.frames[self.remaining % DISTINCT] if self.remaining >= 0 else b''
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def configure(chain: Effects.EffectsChain, label: str):
+    if label == 'volume':
+        chain.set_volume(0.5)
+    elif label == 'eq':
+        chain.set_eq(bass=6, treble=-3)
+    elif label == 'limiter':
+        chain.set_volume(2.0)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    budget = OpusEncoder.FRAME_LENGTH
+    print(f'{frames} frames ({budget} ms budget per frame)')
+    for label in ('bypass', 'volume', 'eq', 'limiter'):
+        chain = Effects.EffectsChain()
+        configure(chain, label)
+        source = Effects.EffectsSource(NoiseSource(frames), chain)
+        # Warm up the kernel and buffers outside the timed loop
+        source.process(source.original.frames[0])
+        started = time.perf_counter()
+        while source.read():
+            pass
+        elapsed = (time.perf_counter() - started) * 1000 / frames
+        print(f'  {label:<8}: {elapsed:7.4f} ms/frame ({elapsed / budget:6.2%} of budget)')
+
+
+if __name__ == '__main__':
+    main()
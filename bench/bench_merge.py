@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Playlist merge/dedupe benchmark
+
+Times Merge.merge, Merge.subtract and Merge.dedupe on an N-entry playlist and
+N incoming URLs (half of them already registered), with canonical watch URLs
+and with youtu.be links that need a full parse. For reference, the list scan
+they replaced (url in existing) is timed on a smaller input, since it is O(n*m).
+
+Usage:
+    python bench/bench_merge.py [entries]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import Merge  # noqa: E402
+
+
+def video_id(n: int) -> str:
+    return f'{n:011d}'.translate(str.maketrans('0123456789', 'aB3dE5gH7j'))
+
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f'  {label:<10}: {time.perf_counter() - started:7.3f} s')
+    return result
+
+
+def list_merge(existing: list, incoming: list) -> list:
+    """The O(n*m) membership scan replaced by Merge.merge"""
+    merged = list(existing)
+    for url in incoming:
+        if url not in merged:
+            merged.append(url)
+    return merged
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    random.seed(0)
+    existing = [f'https://www.youtube.com/watch?v={video_id(n)}' for n in range(entries)]
+    ids = random.sample(range(entries * 2), entries)
+    for label, spell in (('canonical', 'https://www.youtube.com/watch?v={}'),
+                         ('youtu.be', 'https://youtu.be/{}?si=share')):
+        incoming = [spell.format(video_id(n)) for n in ids]
+        print(f'{entries} entries + {entries} incoming ({label} URLs)')
+        added, _ = timed('merge', Merge.merge, existing, incoming)
+        timed('subtract', Merge.subtract, existing, incoming)
+        timed('dedupe', Merge.dedupe, existing + incoming)
+        assert len(added) == sum(n >= entries for n in ids)
+
+    small = min(entries, 5_000)
+    print(f'{small} entries + {small} incoming (list scan, for comparison)')
+    timed('list scan', list_merge, existing[:small],
+          [f'https://www.youtube.com/watch?v={video_id(n)}' for n in ids[:small]])
+    timed('merge', Merge.merge, existing[:small],
+          [f'https://www.youtube.com/watch?v={video_id(n)}' for n in ids[:small]])
+
+
+if __name__ == '__main__':
+    main()
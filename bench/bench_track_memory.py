@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Queue memory benchmark: URL strings vs interned Tracks
+
+Measures with tracemalloc the memory held by a queue of N entries, stored as
+full URL strings and as interned Track records, and checks that Tracks are
+freed from the intern table once nothing refers to them.
+
+By default every entry is a different video (deduped playlists, the track
+table, the search index). There a Track costs about 2.5 times its URL string:
+the Track, the id string and the weak intern table entry. Interning pays off
+only when entries repeat: pass a smaller number of distinct videos, e.g.
+100000 10000, to model queues and playlists with repeats.
+
+Usage:
+    python bench/bench_track_memory.py [entries] [distinct]
+"""
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Track import Site, Track  # noqa: E402
+
+
+def video_id(n: int) -> str:
+    return f'{n:011d}'.translate(str.maketrans('0123456789', 'aB3dE5gH7j'))
+
+
+def measure(build) -> tuple:
+    """Return (current bytes held by the result, peak bytes while building)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else entries
+    random.seed(0)
+    # URLs arrive as fresh strings (parsed from commands, files and yt-dlp), not shared objects
+    if distinct >= entries:
+        picks = random.sample(range(distinct), entries)
+    else:
+        picks = [random.randrange(distinct) for _ in range(entries)]
+
+    urls, url_bytes, url_peak = measure(
+        lambda: [f'https://www.youtube.com/watch?v={video_id(n)}' for n in picks])
+    tracks, track_bytes, track_peak = measure(
+        lambda: [Track.from_url(f'https://www.youtube.com/watch?v={video_id(n)}') for n in picks])
+
+    print(f'{entries} entries, {len(set(picks))} distinct videos')
+    print(f'  URL strings : {url_bytes / 1024:9.0f} KiB held, {url_peak / 1024:9.0f} KiB peak')
+    print(f'  Tracks      : {track_bytes / 1024:9.0f} KiB held, {track_peak / 1024:9.0f} KiB peak '
+          f'({track_bytes / url_bytes:.0%} of URL strings, {track_bytes / entries:.0f} vs '
+          f'{url_bytes / entries:.0f} bytes per entry)')
+    print(f'  Interned    : {len(Track._interned[Site.YOUTUBE])} Tracks')
+
+    del urls, tracks
+    gc.collect()
+    print(f'  After release: {len(Track._interned[Site.YOUTUBE])} Tracks left in the intern table')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+import logging
+import threading
+import time
+
+import discord
+from discord.opus import Encoder as OpusEncoder
+
+import Effects
+from Silence import SilenceAnalyzer
+
+logger = logging.getLogger('PlayAudio')
+
+# Seconds of audio in one frame returned by AudioSource.read()
+FRAME_SECONDS = OpusEncoder.FRAME_LENGTH / 1000.0
+
+
+class TrackedSource(discord.AudioSource):
+    """Tracked Source Class
+    Note: This Class is used to wrap an AudioSource and count the frames the voice thread consumed.
+          The played position is offset + frames * 20 ms, and the time of the last read tells
+          whether the decoder stalled. An end of stream before the known duration is premature.
+
+    Args:
+        original (discord.AudioSource): Source to wrap
+        duration (float): Track length in seconds (None if unknown)
+        offset (float): Position the source starts at in seconds
+        is_live (bool): The source is a livestream
+        end (float): Position the source stops at in seconds (None if it plays to the end)
+        analyzer (Silence.SilenceAnalyzer): Envelope recorder of the source if the track is analysed
+
+    Attributes:
+        frames (int): Frames read so far
+        last_read (float): time.monotonic() of the last read (or of the creation)
+        eof (bool): The original source returned no more data
+    """
+    # Ending earlier than this before the duration counts as premature (seconds)
+    EOF_TOLERANCE = 3.0
+
+    def __init__(self, original: discord.AudioSource, duration: float = None, offset: float = 0.0,
+                 is_live: bool = False, end: float = None, analyzer: SilenceAnalyzer = None):
+        """Initialize TrackedSource Class"""
+        self.original = original
+        self.duration = duration
+        self.offset = offset
+        self.is_live = is_live
+        self.end = end
+        self.analyzer = analyzer
+        self.frames = 0
+        self.last_read = time.monotonic()
+        self.eof = False
+
+    @property
+    def position(self) -> float:
+        """Played position in seconds"""
+        return self.offset + self.frames * FRAME_SECONDS
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        self.last_read = time.monotonic()
+        if data:
+            self.frames += 1
+        else:
+            self.eof = True
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def touch(self):
+        """Restart the stall timer (e.g. after a pause)"""
+        self.last_read = time.monotonic()
+
+    def stalled(self, timeout: float) -> bool:
+        """Return True if no frame was read for timeout seconds"""
+        return not self.eof and time.monotonic() - self.last_read > timeout
+
+    def ended_early(self) -> bool:
+        """Return True if the stream ended before the end of the track"""
+        if not self.eof:
+            return False
+        if self.is_live:
+            return True
+        end = self.end or self.duration
+        if not end:
+            return False
+        return self.position < end - self.EOF_TOLERANCE
+
+    @property
+    def analysis(self) -> SilenceAnalyzer:
+        """Envelope recorder if the whole track was played through it, else None"""
+        if self.analyzer is None or not self.eof or self.ended_early():
+            return None
+        return self.analyzer
+
+
+class BufferedSource(discord.AudioSource):
+    """Buffered Source Class
+    Note: This Class is used to read ahead of the voice thread. A reader thread fills a bounded
+          buffer of frames from the original source, so a short pipe or network hiccup in the
+          decoder is absorbed instead of being heard as stutter. Playback waits for the pre-roll
+          before the first frame and again after an underrun.
+          Works for both PCM and Opus sources since frames are passed through unchanged.
+
+    Args:
+        original (discord.AudioSource): Source to read ahead of
+        capacity (int): Maximum buffered frames
+        preroll (int): Frames buffered before playback starts or continues after an underrun
+
+    Attributes:
+        underruns (int): Times the voice thread found the buffer empty
+        underrun_seconds (float): Total time the voice thread waited on an empty buffer
+    """
+    def __init__(self, original: discord.AudioSource, capacity: int = 250, preroll: int = 25):
+        """Initialize BufferedSource Class"""
+        self.original = original
+        self.capacity = max(1, capacity)
+        self.preroll = max(1, min(preroll, self.capacity))
+        self.underruns = 0
+        self.underrun_seconds = 0.0
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._eof = False
+        self._closed = False
+        self._buffering = True
+        self._reader = threading.Thread(target=self._fill, daemon=True, name='audio-read-ahead')
+        self._reader.start()
+
+    def _fill(self):
+        try:
+            while True:
+                with self._cond:
+                    while len(self._frames) >= self.capacity and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                data = self.original.read()
+                with self._cond:
+                    if not data:
+                        return
+                    self._frames.append(data)
+                    self._cond.notify_all()
+        except Exception as e:
+            # Reading a decoder that cleanup() just killed is expected
+            if not self._closed:
+                logger.warning(f'⚠️ 先読みスレッドでエラーが発生しました: {e}')
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def read(self) -> bytes:
+        with self._cond:
+            if not self._frames and not self._eof and not self._buffering:
+                self.underruns += 1
+                self._buffering = True
+                logger.debug(f'🎧 バッファ不足が発生しました ({self.underruns}回目)')
+            if self._buffering:
+                waited = time.monotonic()
+                while len(self._frames) < self.preroll and not self._eof and not self._closed:
+                    self._cond.wait()
+                if self.underruns:
+                    self.underrun_seconds += time.monotonic() - waited
+                self._buffering = False
+            if not self._frames:
+                return b''
+            data = self._frames.popleft()
+            self._cond.notify_all()
+            return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        with self._cond:
+            if self.underruns and not self._closed:
+                logger.info(f'🎧 バッファ不足: {self.underruns}回, 合計{self.underrun_seconds:.1f}秒')
+            self._closed = True
+            self._frames.clear()
+            self._cond.notify_all()
+        # Unblocks a reader waiting on the decoder pipe
+        self.original.cleanup()
+
+    @property
+    def buffered(self) -> int:
+        """Frames currently buffered"""
+        return len(self._frames)
+
+
+class RecordingSource(discord.AudioSource):
+    """Recording Source Class
+    Note: This Class is used to keep an Opus-encoded copy of every frame read through it. When the
+          source reaches its end, on_complete is called with the packets; recording gives up (and
+          frees the packets) once they take more than limit bytes.
+
+    Args:
+        original (discord.AudioSource): PCM source
+        limit (int): Most bytes kept
+        on_complete (callable): Called with the list of Opus packets at EOF
+        bitrate (int): Opus bitrate in kbps
+    """
+    def __init__(self, original: discord.AudioSource, limit: int, on_complete, bitrate: int = 64):
+        """Initialize RecordingSource Class"""
+        self.original = original
+        self.limit = limit
+        self.on_complete = on_complete
+        # The packets are kept, not sent, so no forward error correction
+        self.encoder = discord.opus.Encoder(bitrate=bitrate, fec=False, expected_packet_loss=0.01)
+        self.frames = []
+        self.size = 0
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        frames = self.frames
+        if frames is not None:
+            if not data:
+                self.frames = None
+                self.on_complete(frames)
+            elif len(data) != OpusEncoder.FRAME_SIZE:
+                self.frames = None
+            else:
+                packet = self.encoder.encode(data, OpusEncoder.SAMPLES_PER_FRAME)
+                self.size += len(packet)
+                if self.size <= self.limit:
+                    frames.append(packet)
+                else:
+                    self.frames = None
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.frames = None
+        self.original.cleanup()
+
+
+class ReplaySource(discord.AudioSource):
+    """Replay Source Class
+    Note: This Class is used to play packets recorded by RecordingSource from memory. The packets
+          are decoded back to PCM, so effects apply as they do to FFmpeg output.
+
+    Args:
+        frames (list): Recorded Opus packets
+        index (int): Index of the first frame to play
+    """
+    def __init__(self, frames: list, index: int = 0):
+        """Initialize ReplaySource Class"""
+        self.frames = frames
+        self.index = min(max(index, 0), len(frames))
+        self.decoder = discord.opus.Decoder()
+        if self.index:
+            # Prime the decoder with the previous packet so a seek does not start with a click
+            self.decoder.decode(frames[self.index - 1])
+
+    def read(self) -> bytes:
+        if self.index >= len(self.frames):
+            return b''
+        data = self.decoder.decode(self.frames[self.index])
+        self.index += 1
+        return data
+
+    def is_opus(self) -> bool:
+        return False
+
+
+class Stream:
+    """Stream Class
+    Note: This Class is used to hold a resolved stream so it can be opened more than once.
+          Opening starts a new FFmpeg at the given position without resolving the URL again,
+          which is what seeking and loop playback need. A stream whose URL expired has to be
+          resolved again. In loop mode, a short track played through to its end is kept in memory
+          as Opus packets, after which opening it (a repeat or a seek) needs no FFmpeg or network
+          at all. Replays are decoded back to PCM so volume and EQ still apply.
+
+    Args:
+        url (str): Track URL
+        stream_url (str): Media URL passed to FFmpeg
+        before_options (str): FFmpeg input options
+        options (str): FFmpeg output options
+        duration (float): Track length in seconds (None if unknown)
+        is_live (bool): The stream is a livestream
+        buffer_frames (int): Read-ahead buffer size in frames
+        preroll (int): Read-ahead pre-roll in frames
+        on_close (callable): Called once when the stream is closed (e.g. to close a Nico session)
+        fanout (FanOut.FanOut): Shares one decoder between listeners of the same track if set
+        supervisor (Supervisor.FFmpegSupervisor): Tracks every FFmpeg started for the stream if set
+        guild_id (int): Guild the stream plays for
+        effects (Effects.EffectsChain): Effects applied to the decoded PCM if set
+        trim (tuple): (start, end) of the non-silent part in seconds, applied when opening
+        analyse (bool): Record the envelope when played from the start to find the trim points
+        record (callable): Returns True if the track should be kept for replay (e.g. loop mode)
+
+    Attributes:
+        resolved_at (float): time.monotonic() when the URL was resolved
+        replay (list): Opus packets of the whole track (None until recorded)
+    """
+    # Longest track analysed for silence (seconds)
+    MAX_ANALYSE_SECONDS = 3600
+    # Opus bitrate of the copy kept for replay (kbps), the default bitrate of a voice channel
+    REPLAY_BITRATE = 64
+    # Largest copy kept in memory for replay (bytes, about a minute at REPLAY_BITRATE)
+    MAX_REPLAY_BYTES = 512 * 1024
+    # Reuse the resolved URL for this long (seconds), media URLs expire after a few hours
+    MAX_AGE = 3600
+
+    def __init__(self, url: str, stream_url: str, before_options: str, options: str,
+                 duration: float = None, is_live: bool = False, buffer_frames: int = 250,
+                 preroll: int = 25, on_close=None, fanout=None, supervisor=None, guild_id: int = None,
+                 effects=None, trim: tuple = None, analyse: bool = False, record=None):
+        """Initialize Stream Class"""
+        self.url = url
+        self.stream_url = stream_url
+        self.before_options = before_options
+        self.options = options
+        self.duration = duration
+        self.is_live = is_live
+        self.buffer_frames = buffer_frames
+        self.preroll = preroll
+        self.on_close = on_close
+        self.fanout = fanout
+        self.supervisor = supervisor
+        self.guild_id = guild_id
+        self.effects = effects
+        self.trim = trim
+        self.analyse = analyse
+        self.record = record
+        self.resolved_at = time.monotonic()
+        self.replay = None
+        self._replay_start = 0.0
+        self._closed = False
+
+    @property
+    def reusable(self) -> bool:
+        """The stream can be opened again without resolving the URL"""
+        if self.is_live:
+            return False
+        return self.replay is not None or time.monotonic() - self.resolved_at < self.MAX_AGE
+
+    def open(self, start: float = 0.0) -> TrackedSource:
+        """Start decoding at start seconds
+
+        Returns:
+            TrackedSource: Source for VoiceClient.play
+        """
+        before_options = self.before_options
+        end = None
+        if self.is_live:
+            # Livestreams always start at the live edge
+            start = 0.0
+        else:
+            if self.trim is not None:
+                # Skip the silence at both ends of the track
+                start = max(start, self.trim[0])
+                end = self.trim[1]
+            if end is not None and end > start:
+                before_options = f'-t {end - start:.2f} {before_options}'
+            if start:
+                before_options = f'-ss {start:.2f} {before_options}'
+
+        if self.replay is not None:
+            source = ReplaySource(self.replay, round((start - self._replay_start) / FRAME_SECONDS))
+            return self._wrap(source, start, end)
+
+        def decoder():
+            source = discord.FFmpegPCMAudio(self.stream_url, before_options=before_options, options=self.options)
+            if self.supervisor is not None:
+                source = self.supervisor.track(source, self.guild_id, self.url)
+            return source
+
+        if self.fanout is not None:
+            key = (self.url, before_options, self.options)
+            source = self.fanout.open(key, decoder, capacity=self.buffer_frames, preroll=self.preroll)
+        else:
+            source = BufferedSource(decoder(), capacity=self.buffer_frames, preroll=self.preroll)
+        if self.record is not None and start == (self.trim[0] if self.trim else 0.0) and not self.is_live and \
+                not source.is_opus() and self.duration and \
+                self.duration * self.REPLAY_BITRATE * 1000 / 8 <= self.MAX_REPLAY_BYTES and self.record():
+            source = RecordingSource(source, self.MAX_REPLAY_BYTES,
+                                     lambda frames: self._recorded(frames, start, end), bitrate=self.REPLAY_BITRATE)
+        return self._wrap(source, start, end)
+
+    def _recorded(self, frames: list, start: float, end: float):
+        """Keep the frames of a recording that reached the end of the track"""
+        expected = (end or self.duration) - start
+        if len(frames) * FRAME_SECONDS < expected - TrackedSource.EOF_TOLERANCE or self._closed:
+            return
+        self.replay = frames
+        self._replay_start = start
+        size = sum(map(len, frames)) / 1024
+        logger.debug(f'💾 エンコード済みの音声をメモリに保持しました ({size:.0f}KB): {self.url}')
+
+    def _wrap(self, source: discord.AudioSource, start: float, end: float) -> TrackedSource:
+        """Add the analyzer and effects to a PCM source"""
+        analyzer = None
+        if self.analyse and start == 0.0 and not self.is_live and not source.is_opus() and \
+                self.duration and self.duration <= self.MAX_ANALYSE_SECONDS:
+            # Before the effects so the envelope does not depend on the volume
+            source = analyzer = SilenceAnalyzer(source, self.duration)
+        if self.effects is not None and not source.is_opus():
+            # Applied per listener after the shared decoder, so changes do not restart FFmpeg
+            source = Effects.EffectsSource(source, self.effects)
+        return TrackedSource(source, duration=self.duration, offset=start, is_live=self.is_live, end=end,
+                             analyzer=analyzer)
+
+    def close(self):
+        """Release resources held by the stream"""
+        self._closed = True
+        self.replay = None
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
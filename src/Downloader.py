@@ -7,8 +7,10 @@ import requests
 
 import orjson
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import PagedList
 from niconico import NicoNico
 
+from Track import Site, Track
 import Utils
 
 # Setup Logging
@@ -38,6 +40,17 @@ class Downloader:
     ydl_opts_only_info = {
         'skip_download': True
     }
+    # YoutubeDL Options Flat Playlist (no per-video resolution)
+    ydl_opts_flat_playlist = {
+        'skip_download': True,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True
+    }
+    # Titles of unavailable entries in flat YouTube playlists
+    UNAVAILABLE_ENTRY_TITLES = ('[Deleted video]', '[Private video]')
+    # Entries fetched per page from paged playlists
+    PLAYLIST_PAGE_SIZE = 100
 
     def __init__(self):
         """Initialize Downloader Class"""
@@ -64,7 +77,7 @@ class Downloader:
 
         with YoutubeDL(options) as ydl:
             song = ydl.extract_info(url, download=False)
-            self.logger.info(f'YoutubeDL Streamming Information: {song}')
+            self.logger.info(f'YoutubeDL Streamming Information: {song.get("id")} {song.get("title")}')
         return song
 
     def get_info(self, source_url: str, options: str) -> str:
@@ -130,4 +143,53 @@ class Downloader:
             res = requests.get(url)
             return res.text[res.text.find("<title>")+7:res.text.rfind("</title>")]
         else:
-            return None
\ No newline at end of file
+            return None
+
+    def iter_playlist_urls(self, playlist_url: str):
+        """Iterate Playlist URLs
+        Note: This Function is used to expand a YouTube playlist or NicoNico mylist with
+              flat extraction. Entries are yielded page by page as yt-dlp fetches them,
+              without resolving each video.
+
+        Args:
+            playlist_url (str): Playlist URL
+
+        Yields:
+            str: Video URL
+        """
+        self.logger.info(f'📥 プレイリスト展開開始: {playlist_url}')
+        with YoutubeDL(self.ydl_opts_flat_playlist) as ydl:
+            info = ydl.extract_info(playlist_url, download=False, process=False)
+            # Follow redirects to the playlist extractor (e.g. watch?v=...&list=...)
+            for _ in range(3):
+                if info.get('_type') not in ('url', 'url_transparent'):
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=False)
+
+            entries = info.get('entries')
+            if entries is None:
+                self.logger.warning(f'⚠️ プレイリストではありません: {playlist_url}')
+                return
+            if isinstance(entries, PagedList):
+                entries = self._iter_paged_list(entries)
+
+            for entry in entries:
+                if not entry or entry.get('title') in self.UNAVAILABLE_ENTRY_TITLES:
+                    continue
+                url = entry.get('url') or entry.get('webpage_url')
+                if not url:
+                    continue
+                track = Track.from_url(url)
+                if track.site == Site.OTHER:
+                    self.logger.debug(f'Skip Unsupported Entry: {url}')
+                    continue
+                yield track.url
+
+    def _iter_paged_list(self, entries: PagedList):
+        start = 0
+        while True:
+            page = entries.getslice(start, start + self.PLAYLIST_PAGE_SIZE)
+            if not page:
+                return
+            yield from page
+            start += len(page)
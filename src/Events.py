@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+
+logger = logging.getLogger('PlayAudio')
+
+# Playback Events
+TRACK_STARTED = 'track_started'      # url, loop
+TRACK_ENDED = 'track_ended'          # url, error, analysis
+TRACK_SKIPPED = 'track_skipped'      # url
+TRACK_ERRORED = 'track_errored'      # url, error
+PLAYBACK_STOPPED = 'playback_stopped'  # reason
+
+
+class EventBus:
+    """Event Bus Class
+    Note: This Class is used to publish playback state transitions to subscribers.
+          Handlers are coroutine functions run as tasks, so emit never waits for them.
+    """
+    def __init__(self):
+        """Initialize EventBus Class"""
+        self.logger = logger
+        self.handlers = {}
+
+    def subscribe(self, event: str, handler):
+        """Subscribe handler(**payload) to event"""
+        self.handlers.setdefault(event, []).append(handler)
+
+    def unsubscribe(self, event: str, handler):
+        """Unsubscribe handler from event"""
+        if handler in self.handlers.get(event, []):
+            self.handlers[event].remove(handler)
+
+    def emit(self, event: str, **payload):
+        """Emit Event (call from the event loop)"""
+        self.logger.debug(f'📣 イベント: {event} {payload}')
+        for handler in list(self.handlers.get(event, [])):
+            result = handler(**payload)
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(result)
+                task.add_done_callback(self._log_error)
+
+    def emit_threadsafe(self, loop: asyncio.AbstractEventLoop, event: str, **payload):
+        """Emit Event from another thread (e.g. the audio player thread)"""
+        loop.call_soon_threadsafe(lambda: self.emit(event, **payload))
+
+    def _log_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning(f'⚠️ イベントハンドラでエラーが発生しました: {task.exception()}')
+
+
+class Debouncer:
+    """Debouncer Class
+    Note: Calls func with the arguments of the last call once no call came for delay seconds
+
+    Args:
+        func (callable): Coroutine function
+        delay (float): Quiet period in seconds
+    """
+    def __init__(self, func, delay: float):
+        """Initialize Debouncer Class"""
+        self.func = func
+        self.delay = delay
+        self._handle = None
+        self._task = None
+
+    def __call__(self, *args, **kwargs):
+        self.cancel()
+        loop = asyncio.get_running_loop()
+        self._handle = loop.call_later(self.delay, self._fire, args, kwargs)
+
+    def _fire(self, args, kwargs):
+        self._handle = None
+        self._task = asyncio.ensure_future(self.func(*args, **kwargs))
+        self._task.add_done_callback(
+            lambda task: task.cancelled() or task.exception() is None or
+            logger.warning(f'⚠️ イベントハンドラでエラーが発生しました: {task.exception()}'))
+
+    def cancel(self):
+        """Cancel the pending call"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+import logging
+import threading
+import time
+
+import discord
+
+logger = logging.getLogger('PlayAudio')
+
+
+class SharedDecoder:
+    """Shared Decoder Class
+    Note: This Class is used to read one decoder on a dedicated thread into a ring buffer that
+          several readers consume through their own cursors. The decoder stays at most capacity
+          frames ahead of the slowest reader, so readers at the same rate never lose a frame.
+          A reader that falls a whole capacity behind the leading one (e.g. paused) is dropped
+          from the pacing so it does not stall the others; it skips ahead to the oldest frame
+          still buffered when it reads again. Call start() once the first reader is attached.
+
+    Args:
+        key (tuple): Registry key
+        source (discord.AudioSource): Decoder to read
+        capacity (int): Frames kept in the ring buffer
+        on_close (callable): Called with the decoder when the last reader left
+    """
+    def __init__(self, key: tuple, source: discord.AudioSource, capacity: int, on_close):
+        """Initialize SharedDecoder Class"""
+        self.key = key
+        self.source = source
+        self.capacity = max(1, capacity)
+        self.on_close = on_close
+        self.cond = threading.Condition()
+        self.frames = deque()
+        # Frame index of frames[0]
+        self.base = 0
+        self.eof = False
+        self.closed = False
+        self.readers = set()
+        self._thread = threading.Thread(target=self._fill, daemon=True, name='audio-fan-out')
+
+    def start(self):
+        """Start decoding"""
+        self._thread.start()
+
+    @property
+    def written(self) -> int:
+        """Frames decoded so far"""
+        return self.base + len(self.frames)
+
+    @property
+    def joinable(self) -> bool:
+        """A new reader can still start from the first frame"""
+        return self.base == 0 and not self.closed
+
+    def _fill(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.closed and self._full():
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                data = self.source.read()
+                with self.cond:
+                    if not data:
+                        return
+                    self.frames.append(data)
+                    # Only frames every paced reader has read are released
+                    slowest = self._slowest()
+                    while len(self.frames) > self.capacity and self.base < slowest:
+                        self.frames.popleft()
+                        self.base += 1
+                    self.cond.notify_all()
+        except Exception as e:
+            # Reading a decoder that close() just killed is expected
+            if not self.closed:
+                logger.warning(f'⚠️ 共有デコーダーでエラーが発生しました: {e}')
+        finally:
+            with self.cond:
+                self.eof = True
+                self.cond.notify_all()
+
+    def _slowest(self) -> int:
+        """Cursor of the slowest reader still paced (call with cond held)"""
+        return min((reader.cursor for reader in self.readers if not reader.dropped), default=self.written)
+
+    def _full(self) -> bool:
+        """The decoder is capacity frames ahead of the slowest paced reader (call with cond held)"""
+        paced = [reader for reader in self.readers if not reader.dropped]
+        if not paced:
+            return True
+        slowest = min(paced, key=lambda reader: reader.cursor)
+        if self.written - slowest.cursor < self.capacity:
+            return False
+        if max(reader.cursor for reader in paced) - slowest.cursor < self.capacity:
+            return True
+        # The leading reader is waiting on a reader a whole buffer behind it
+        slowest.dropped = True
+        logger.debug(f'🎧 共有デコーダーに{self.capacity}フレーム遅れたリスナーを待たずに進めます')
+        return self._full()
+
+    def attach(self, preroll: int) -> 'FanOutReader':
+        """Add a reader starting at the oldest buffered frame (None if already closed)"""
+        with self.cond:
+            if self.closed:
+                return None
+            reader = FanOutReader(self, self.base, preroll)
+            self.readers.add(reader)
+            return reader
+
+    def detach(self, reader: 'FanOutReader'):
+        """Remove a reader, closing the decoder when it was the last one"""
+        with self.cond:
+            self.readers.discard(reader)
+            self.cond.notify_all()
+            if self.readers or self.closed:
+                return
+            self.closed = True
+            self.frames.clear()
+        self.on_close(self)
+        # Unblocks the thread waiting on the decoder pipe
+        self.source.cleanup()
+
+
+class FanOutReader(discord.AudioSource):
+    """Fan Out Reader Class
+    Note: This Class is used to read a SharedDecoder from its own cursor. Playback waits for the
+          pre-roll before the first frame and again after an underrun, like Audio.BufferedSource.
+
+    Attributes:
+        cursor (int): Index of the next frame to read
+        underruns (int): Times the voice thread found no frame
+        underrun_seconds (float): Total time the voice thread waited for frames
+        skipped (int): Frames dropped because the reader fell behind the decoder
+        dropped (bool): The decoder stopped waiting for this reader
+    """
+    def __init__(self, decoder: SharedDecoder, cursor: int, preroll: int):
+        """Initialize FanOutReader Class"""
+        self.decoder = decoder
+        self.cursor = cursor
+        self.preroll = max(1, min(preroll, decoder.capacity))
+        self.underruns = 0
+        self.underrun_seconds = 0.0
+        self.skipped = 0
+        self.dropped = False
+        self._buffering = True
+        self._closed = False
+
+    def read(self) -> bytes:
+        decoder = self.decoder
+        with decoder.cond:
+            if self._closed:
+                return b''
+            if self.dropped:
+                # Rejoin from the oldest frame still buffered
+                self.dropped = False
+                if self.cursor < decoder.base:
+                    self.skipped += decoder.base - self.cursor
+                    self.cursor = decoder.base
+            available = decoder.written - self.cursor
+            if available <= 0 and not decoder.eof and not self._buffering:
+                self.underruns += 1
+                self._buffering = True
+                logger.debug(f'🎧 バッファ不足が発生しました ({self.underruns}回目)')
+            if self._buffering:
+                waited = time.monotonic()
+                while decoder.written - self.cursor < self.preroll and not decoder.eof and not self._closed:
+                    decoder.cond.wait()
+                if self.underruns:
+                    self.underrun_seconds += time.monotonic() - waited
+                self._buffering = False
+            if self._closed or self.cursor >= decoder.written:
+                return b''
+            data = decoder.frames[self.cursor - decoder.base]
+            self.cursor += 1
+            decoder.cond.notify_all()
+            return data
+
+    def is_opus(self) -> bool:
+        return self.decoder.source.is_opus()
+
+    def cleanup(self):
+        with self.decoder.cond:
+            if self._closed:
+                return
+            if self.underruns:
+                logger.info(f'🎧 バッファ不足: {self.underruns}回, 合計{self.underrun_seconds:.1f}秒')
+            if self.skipped:
+                logger.info(f'🎧 共有デコーダーに遅れたため{self.skipped}フレームを飛ばしました')
+            self._closed = True
+        self.decoder.detach(self)
+
+
+class FanOut:
+    """Fan Out Class
+    Note: This Class is used to share one decoder between every listener of the same track.
+          Decoders are keyed by (track, input options, output options) and reference counted by
+          their readers; a listener that starts the same track while its first frames are still
+          buffered joins the running decoder instead of spawning FFmpeg again. The decoder is torn
+          down when the last listener leaves, so decoding cost scales with distinct tracks, not listeners.
+    """
+    def __init__(self):
+        """Initialize FanOut Class"""
+        self.logger = logger
+        self.decoders = {}
+        self._lock = threading.Lock()
+
+    def open(self, key: tuple, factory, capacity: int = 250, preroll: int = 25) -> FanOutReader:
+        """Open a reader of the decoder for key
+
+        Args:
+            key (tuple): (track, input options, output options)
+            factory (callable): Creates the decoder AudioSource if none can be joined
+            capacity (int): Ring buffer size in frames
+            preroll (int): Pre-roll in frames
+
+        Returns:
+            FanOutReader: Source for VoiceClient.play
+        """
+        with self._lock:
+            decoder = self.decoders.get(key)
+            if decoder is not None and decoder.joinable:
+                reader = decoder.attach(preroll)
+                if reader is not None:
+                    self.logger.debug(f'🔀 共有デコーダーに参加しました ({len(decoder.readers)}人): {key[0]}')
+                    return reader
+            decoder = SharedDecoder(key, factory(), capacity, self._remove)
+            self.decoders[key] = decoder
+            # Attached before decoding starts, so no frame is decoded before a reader can see it
+            reader = decoder.attach(preroll)
+            decoder.start()
+            return reader
+
+    def _remove(self, decoder: SharedDecoder):
+        with self._lock:
+            if self.decoders.get(decoder.key) is decoder:
+                del self.decoders[decoder.key]
+
+    def stats(self) -> dict:
+        """Return {'decoders': int, 'readers': int}"""
+        with self._lock:
+            return {
+                'decoders': len(self.decoders),
+                'readers': sum(len(decoder.readers) for decoder in self.decoders.values())
+            }
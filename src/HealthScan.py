@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+
+import requests
+
+from RateLimit import TokenBucket
+
+logger = logging.getLogger('PlayAudio')
+
+
+class HealthScanner:
+    """Health Scanner Class
+    Note: This Class is used to check every track registered in a playlist for availability.
+          Each track is probed once however many playlists contain it, by a fixed number of workers
+          sharing one request budget. Results are saved in batches to the tracks table, so an
+          interrupted scan resumes from where it stopped and recent results are reused.
+
+    Args:
+        playlist (Playlist): Playlist
+        utils (Utils): Utils
+        concurrency (int): Number of probing workers
+        rate (float): Probes per second across all workers
+
+    Attributes:
+        running (bool): A scan is in progress
+    """
+    # Statuses reported (and pruned) by the scan
+    BAD_STATUSES = ('dead', 'premium', 'region')
+    # Results newer than this are reused without probing again (seconds)
+    CACHE_TTL = 86400
+    # Number of results saved per transaction
+    SAVE_BATCH = 50
+
+    def __init__(self, playlist, utils, concurrency: int = 8, rate: float = 4.0):
+        """Initialize HealthScanner Class"""
+        self.logger = logger
+        self.playlist = playlist
+        self.utils = utils
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, capacity=concurrency)
+        self.running = False
+
+    async def scan(self, progress=None, force: bool = False) -> dict:
+        """Scan all playlists
+
+        Args:
+            progress (callable): Coroutine function called as progress(done, total) after each probe
+            force (bool): Probe every track, ignoring cached results
+
+        Returns:
+            dict: {'total': int, 'probed': int, 'unknown': int, 'resumed': bool,
+                   'bad': {url: status}, 'report': {playlist_name: [(url, status)]}}
+        """
+        if self.running:
+            raise RuntimeError('Health scan is already running')
+        self.running = True
+        try:
+            return await self._scan(progress, force)
+        finally:
+            self.running = False
+
+    async def _scan(self, progress, force: bool) -> dict:
+        started = self.playlist.get_scan_state()
+        resumed = started is not None
+        if started is None:
+            started = time.time()
+            self.playlist.set_scan_state(started)
+        cutoff = started if force else started - self.CACHE_TTL
+
+        tracks = self.playlist.get_scan_tracks()
+        statuses = {url: status for url, status, checked_at in tracks
+                    if status is not None and checked_at is not None and checked_at >= cutoff}
+        targets = [url for url, _, _ in tracks if url not in statuses]
+        self.logger.info(f'🩺 ヘルススキャン開始 - {len(tracks)}曲中{len(targets)}曲を確認します'
+                         f'{" (再開)" if resumed else ""}')
+
+        pending = {}
+        unknown = 0
+        done = 0
+        queue = iter(targets)
+
+        def save():
+            if pending:
+                self.playlist.set_track_statuses(dict(pending))
+                pending.clear()
+
+        async def worker():
+            nonlocal unknown, done
+            with requests.Session() as session:
+                for url in queue:
+                    await self.bucket.acquire()
+                    status = await asyncio.to_thread(self.utils.probe_availability, url, session)
+                    done += 1
+                    if status == 'unknown':
+                        unknown += 1
+                    else:
+                        statuses[url] = status
+                        pending[url] = status
+                        if len(pending) >= self.SAVE_BATCH:
+                            save()
+                    if progress is not None:
+                        await progress(done, len(targets))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(targets)))))
+        finally:
+            # Keep finished results so an interrupted scan can resume
+            save()
+
+        bad = {url: status for url, status in statuses.items() if status in self.BAD_STATUSES}
+        report = {}
+        for url, status in bad.items():
+            for playlist in self.playlist.get_track_playlists(url):
+                report.setdefault(playlist, []).append((url, status))
+        self.playlist.set_scan_state(None)
+        self.logger.info(f'🩺 ヘルススキャン完了 - 確認{done}曲, 問題{len(bad)}曲, 不明{unknown}曲, '
+                         f'処理時間: {time.time() - started:.1f}秒')
+        return {'total': len(tracks), 'probed': done, 'unknown': unknown, 'resumed': resumed,
+                'bad': bad, 'report': report}
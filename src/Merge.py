@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""URLリストの重複排除・結合・差分
+
+URLを正規化したTrack（サイト+動画ID）で比較するため、
+youtu.be/watch?v= などの表記揺れも同じ動画として扱う。
+どの処理も順序を保ったままハッシュセットでO(n+m)で動作する。
+"""
+
+import logging
+
+from Track import Track
+
+logger = logging.getLogger('PlayAudio')
+
+
+def dedupe(urls: list) -> tuple:
+    """Dedupe URLs
+
+    Args:
+        urls (list): List of URLs
+
+    Returns:
+        tuple: (unique URLs, duplicate URLs)
+    """
+    seen = set()
+    unique = []
+    duplicates = []
+    for url in urls:
+        track = Track.from_url(url)
+        if track in seen:
+            duplicates.append(url)
+        else:
+            seen.add(track)
+            unique.append(url)
+    if duplicates:
+        logger.debug(f'🔁 重複URLを{len(duplicates)}件検出しました')
+    return unique, duplicates
+
+
+def track_set(urls: list) -> set:
+    """Set of Tracks for URLs (for merge across batches)"""
+    return {Track.from_url(url) for url in urls}
+
+
+def merge(existing: list, incoming: list, seen: set = None) -> tuple:
+    """Merge URLs into an existing list
+
+    Args:
+        existing (list): List of URLs already registered
+        incoming (list): List of URLs to add
+        seen (set): Tracks of existing, reused and updated across batches (built from existing if None)
+
+    Returns:
+        tuple: (URLs to append, skipped URLs already registered or duplicated in incoming)
+    """
+    if seen is None:
+        seen = track_set(existing)
+    added = []
+    skipped = []
+    for url in incoming:
+        track = Track.from_url(url)
+        if track in seen:
+            skipped.append(url)
+        else:
+            seen.add(track)
+            added.append(url)
+    logger.debug(f'🔀 URL結合 - 追加: {len(added)}件, スキップ: {len(skipped)}件')
+    return added, skipped
+
+
+def subtract(existing: list, to_remove: list) -> tuple:
+    """Remove URLs from an existing list
+
+    Args:
+        existing (list): List of URLs
+        to_remove (list): List of URLs to remove
+
+    Returns:
+        tuple: (kept URLs, removed URLs as spelled in existing)
+    """
+    targets = {Track.from_url(url) for url in to_remove}
+    kept = []
+    removed = []
+    for url in existing:
+        if Track.from_url(url) in targets:
+            removed.append(url)
+        else:
+            kept.append(url)
+    return kept, removed
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import deque
+import logging
+
+import discord
+
+from RateLimit import TokenBucket
+
+logger = logging.getLogger('PlayAudio')
+
+
+class _Outgoing:
+    __slots__ = ('content', 'embeds', 'view', 'file', 'key', 'future')
+
+    def __init__(self, content, embeds, view, file, key, future):
+        self.content = content
+        self.embeds = embeds
+        self.view = view
+        self.file = file
+        self.key = key
+        self.future = future
+
+    @property
+    def mergeable(self) -> bool:
+        return self.view is None and self.file is None
+
+
+class _Outbox:
+    """Pending messages of one channel"""
+    def __init__(self, channel, rate: float, capacity: int):
+        self.channel = channel
+        self.pending = deque()
+        self.bucket = TokenBucket(rate, capacity)
+        self.task = None
+
+
+class Messenger:
+    """Messenger Class
+    Note: This Class is used to send channel messages through one outbox per channel.
+          Messages posted within COALESCE_DELAY of each other are merged into one message
+          (within Discord's embed count and size limits), each channel is paced by a token bucket, and a message
+          posted with a key replaces an unsent message with the same key (e.g. now playing).
+
+    Args:
+        rate (float): Messages per second per channel
+        capacity (int): Burst size per channel
+    """
+    # Seconds to wait for more messages before sending
+    COALESCE_DELAY = 0.3
+    # Discord limits per message
+    MAX_EMBEDS = 10
+    MAX_CONTENT = 2000
+    # Characters of all embeds of a message together
+    MAX_EMBED_TOTAL = 6000
+
+    def __init__(self, rate: float = 1.0, capacity: int = 5):
+        """Initialize Messenger Class"""
+        self.logger = logger
+        self.rate = rate
+        self.capacity = capacity
+        self.outboxes = {}
+
+    def post(self, channel, content: str = None, embed: discord.Embed = None, embeds: list = None,
+             view: discord.ui.View = None, file: discord.File = None, key: str = None) -> asyncio.Future:
+        """Post Message without waiting
+
+        Args:
+            channel (discord.abc.Messageable): Channel
+            content (str): Content
+            embed (discord.Embed): Embed
+            embeds (list): Embeds
+            view (discord.ui.View): View (sent as its own message)
+            file (discord.File): File (sent as its own message)
+            key (str): Supersede key, an unsent message with the same key is dropped
+
+        Returns:
+            asyncio.Future: Resolves to the sent discord.Message, or None if dropped or failed
+        """
+        embeds = list(embeds or [])
+        if embed is not None:
+            embeds.append(embed)
+        future = asyncio.get_running_loop().create_future()
+        outbox = self.outboxes.get(channel.id)
+        if outbox is None:
+            outbox = self.outboxes[channel.id] = _Outbox(channel, self.rate, self.capacity)
+
+        if key is not None:
+            for message in [message for message in outbox.pending if message.key == key]:
+                outbox.pending.remove(message)
+                message.future.set_result(None)
+                self.logger.debug(f'📨 未送信のメッセージを置き換えました: {key}')
+        outbox.pending.append(_Outgoing(content, embeds, view, file, key, future))
+
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.create_task(self._drain(outbox))
+        return future
+
+    async def send(self, channel, **kwargs):
+        """Send Message through the outbox and wait until it is sent
+
+        Returns:
+            discord.Message: Sent Message (None if dropped or failed)
+        """
+        return await self.post(channel, **kwargs)
+
+    def _take_batch(self, outbox: _Outbox) -> list:
+        first = outbox.pending.popleft()
+        batch = [first]
+        if not first.mergeable:
+            return batch
+        embeds = len(first.embeds)
+        size = sum(len(embed) for embed in first.embeds)
+        content = len(first.content or '')
+        while outbox.pending and outbox.pending[0].mergeable:
+            message = outbox.pending[0]
+            message_size = sum(len(embed) for embed in message.embeds)
+            if embeds + len(message.embeds) > self.MAX_EMBEDS or \
+                    size + message_size > self.MAX_EMBED_TOTAL or \
+                    content + len(message.content or '') + 1 > self.MAX_CONTENT:
+                break
+            batch.append(outbox.pending.popleft())
+            embeds += len(message.embeds)
+            size += message_size
+            content += len(message.content or '') + 1
+        return batch
+
+    async def _drain(self, outbox: _Outbox):
+        while outbox.pending:
+            await asyncio.sleep(self.COALESCE_DELAY)
+            await outbox.bucket.acquire()
+            if not outbox.pending:
+                break
+            batch = self._take_batch(outbox)
+            kwargs = {}
+            contents = [message.content for message in batch if message.content]
+            if contents:
+                kwargs['content'] = '\n'.join(contents)
+            embeds = [embed for message in batch for embed in message.embeds]
+            if embeds:
+                kwargs['embeds'] = embeds
+            if batch[0].view is not None:
+                kwargs['view'] = batch[0].view
+            if batch[0].file is not None:
+                kwargs['file'] = batch[0].file
+            try:
+                sent = await outbox.channel.send(**kwargs)
+                if len(batch) > 1:
+                    self.logger.debug(f'📨 {len(batch)}件のメッセージをまとめて送信しました')
+            except discord.HTTPException as e:
+                self.logger.warning(f'⚠️ メッセージの送信に失敗しました: {e}')
+                sent = None
+            for message in batch:
+                if not message.future.done():
+                    message.future.set_result(sent)
+
+    async def flush(self):
+        """Wait until every outbox is empty"""
+        tasks = [outbox.task for outbox in self.outboxes.values() if outbox.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
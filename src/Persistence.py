@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger('PlayAudio')
+
+
+def atomic_write(path: str, data: bytes, mode: int = None) -> None:
+    """Atomic Write
+    Note: Writes to a temporary file in the same directory, fsyncs it and renames it over path,
+          so a crash leaves either the old or the new file, never a truncated one.
+
+    Args:
+        path (str): File Path
+        data (bytes): File Content
+        mode (int): File Permission (keeps the current permission, or 0o644 for a new file, if None)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if mode is None:
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class WriteBehind:
+    """Write Behind Class
+    Note: This Class is used to coalesce bursts of changes into one flush per interval.
+          Call mark_dirty after each change and close on shutdown. Changes marked after
+          close are refused, so nothing is written once the owner has shut down.
+
+    Args:
+        flush (callable): Writes the pending changes
+        interval (float): Seconds between the first change and the flush
+        name (str): Name for logging
+    """
+    def __init__(self, flush, interval: float = 5.0, name: str = ''):
+        """Initialize WriteBehind Class"""
+        self.logger = logger
+        self._flush = flush
+        self.interval = interval
+        self.name = name
+        self.dirty = False
+        self.closed = False
+        self._handle = None
+
+    def mark_dirty(self) -> None:
+        """Mark Dirty
+        Note: Schedules a flush after interval seconds, or flushes now without a running event loop
+        """
+        if self.closed:
+            self.logger.warning(f'⚠️ 終了後の変更は書き込まれません: {self.name}')
+            return
+        self.dirty = True
+        if self._handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._handle = loop.call_later(self.interval, self.flush)
+
+    def flush(self) -> None:
+        """Flush pending changes now"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            self._flush()
+            self.logger.debug(f'💾 書き込みを反映しました: {self.name}')
+        except Exception as e:
+            self.dirty = True
+            self.logger.error(f'❌ 書き込みの反映に失敗しました: {self.name} {e}')
+
+    def close(self) -> None:
+        """Flush pending changes and stop scheduling"""
+        self.closed = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.flush()
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from enum import Enum
+import logging
+
+import Events
+
+logger = logging.getLogger('PlayAudio')
+
+
+class State(Enum):
+    """Playback State"""
+    IDLE = 'idle'
+    RESOLVING = 'resolving'
+    BUFFERING = 'buffering'
+    PLAYING = 'playing'
+    PAUSED = 'paused'
+    STOPPING = 'stopping'
+
+
+class PlaybackController:
+    """Playback Controller Class
+    Note: This Class is used to drive track transitions for one voice connection.
+          Every transition (play, track end, skip, pause, resume, stop) is a command handled
+          one at a time by a single worker task, so callers never race each other.
+          Each started track gets a generation number; the after callback of a track that was
+          already stopped or replaced carries an old generation and is ignored.
+          While a track is playing, a watchdog restarts it at the played position when the
+          stream stalls or ends before the end of the track (e.g. the stream URL expired). Seeking reopens the already
+          resolved stream at the new position.
+
+    Args:
+        queue (Queue): Queue
+        resolver (callable): Coroutine resolver(url) -> Audio.Stream, runs blocking work off the loop
+        events (Events.EventBus): Event Bus for state transitions
+        is_loop (callable): Returns True while the current track should repeat
+
+    Attributes:
+        state (State): Current State
+        vc (discord.VoiceClient): Voice Client of the current track
+        current (str): URL of the current track
+    """
+    # Seconds without a frame read before the stream counts as stalled
+    STALL_TIMEOUT = 10.0
+    # Seconds between watchdog checks
+    WATCHDOG_INTERVAL = 2.0
+    # Restarts allowed per track
+    MAX_RESUMES = 3
+
+    def __init__(self, queue, resolver, events, is_loop=lambda: False):
+        """Initialize PlaybackController Class"""
+        self.logger = logger
+        self.queue = queue
+        self.resolver = resolver
+        self.events = events
+        self.is_loop = is_loop
+        self.state = State.IDLE
+        self.vc = None
+        self.current = None
+        self._stream = None
+        self._source = None
+        self._resumes = 0
+        self._generation = 0
+        self._commands = None
+        self._worker = None
+        self._watchdog = None
+
+    # ---- Commands (safe to call from any coroutine) ----
+
+    async def play(self, vc) -> bool:
+        """Start playback if idle
+
+        Returns:
+            bool: True if a track is playing after the command
+        """
+        return await self._submit('play', vc)
+
+    async def skip(self, count: int = 1) -> bool:
+        """Skip the current track and count - 1 queued tracks
+
+        Returns:
+            bool: True if a track was playing
+        """
+        return await self._submit('skip', count)
+
+    async def seek(self, position: float) -> bool:
+        """Restart the current track at position seconds
+
+        Returns:
+            bool: True if the track was restarted
+        """
+        return await self._submit('seek', position)
+
+    async def pause(self) -> bool:
+        """Pause the current track"""
+        return await self._submit('pause')
+
+    async def resume(self) -> bool:
+        """Resume the paused track"""
+        return await self._submit('resume')
+
+    async def stop(self) -> bool:
+        """Stop playback and go idle (the queue is kept)"""
+        return await self._submit('stop')
+
+    @property
+    def position(self) -> float:
+        """Played position of the current track in seconds (None if idle)"""
+        if self.state in (State.PLAYING, State.PAUSED) and self._source is not None:
+            return self._source.position
+        return None
+
+    @property
+    def duration(self) -> float:
+        """Length of the current track in seconds (None if unknown)"""
+        if self.state in (State.PLAYING, State.PAUSED) and self._stream is not None:
+            return self._stream.duration
+        return None
+
+    def _after(self, loop: asyncio.AbstractEventLoop, generation: int):
+        """Build the after callback of vc.play (runs on the audio thread)"""
+        def after(error):
+            loop.call_soon_threadsafe(self._commands.put_nowait, ('ended', (generation, error), []))
+        return after
+
+    # ---- Worker ----
+
+    async def _submit(self, name: str, *args):
+        if self._commands is None:
+            self._commands = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._commands.put_nowait((name, args, [future]))
+        return await future
+
+    def _drain(self, first) -> list:
+        """Take every pending command and merge consecutive skips into one"""
+        commands = [first]
+        while not self._commands.empty():
+            name, args, futures = self._commands.get_nowait()
+            previous = commands[-1]
+            if name == 'skip' and previous[0] == 'skip':
+                # The merged skip answers every caller
+                commands[-1] = ('skip', (previous[1][0] + args[0],), previous[2] + futures)
+            else:
+                commands.append((name, args, futures))
+        return commands
+
+    async def _run(self):
+        while True:
+            for name, args, futures in self._drain(await self._commands.get()):
+                try:
+                    result = await getattr(self, f'_on_{name}')(*args)
+                except Exception as e:
+                    self.logger.error(f'❌ 再生状態の遷移でエラーが発生しました: {name} {e}')
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+
+    def _start_watchdog(self):
+        """Start the watchdog while a track is playing (it exits on its own when playback ends)"""
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch())
+
+    def _stop_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.WATCHDOG_INTERVAL)
+            if self.state not in (State.PLAYING, State.PAUSED):
+                # Nothing to watch, _play starts a new watchdog for the next track
+                return
+            if self.state == State.PLAYING and self._source is not None and self._commands is not None and \
+                    self._source.stalled(self.STALL_TIMEOUT):
+                self._commands.put_nowait(('stalled', (self._generation,), []))
+
+    # ---- Transitions (only called by the worker) ----
+
+    def _set_state(self, state: State):
+        if state != self.state:
+            self.logger.debug(f'🎛️ 再生状態: {self.state.value} -> {state.value}')
+            self.state = state
+
+    async def _on_play(self, vc) -> bool:
+        self.vc = vc
+        if self.state != State.IDLE:
+            return True
+        return await self._start_next()
+
+    async def _on_ended(self, generation: int, error) -> bool:
+        if generation != self._generation:
+            # Stale callback of a track that was stopped by skip/stop
+            return False
+        if error:
+            self.logger.error(f'❌ 音楽再生後のコールバックエラー: {error}')
+        if (error or self._source.ended_early()) and await self._resume():
+            return True
+        repeat = None
+        if self.is_loop() and not error and self._stream is not None and self._stream.reusable:
+            # Loop playback opens the same stream again instead of resolving the URL
+            repeat, self._stream = self._stream, None
+        self._release()
+        self.events.emit(Events.TRACK_ENDED, url=self.current, error=error, analysis=self._source.analysis)
+        self._set_state(State.IDLE)
+        return await self._start_next(repeat)
+
+    async def _on_skip(self, count: int) -> bool:
+        if self.state not in (State.PLAYING, State.PAUSED, State.BUFFERING):
+            return False
+        self.events.emit(Events.TRACK_SKIPPED, url=self.current)
+        if count > 1:
+            self.queue.skip_queue(count - 1)
+        self._stop_current()
+        await self._start_next()
+        return True
+
+    async def _on_stalled(self, generation: int) -> bool:
+        if generation != self._generation or self.state != State.PLAYING or \
+                not self._source.stalled(self.STALL_TIMEOUT):
+            return False
+        self.logger.warning(f'⚠️ ストリームが{self.STALL_TIMEOUT:.0f}秒以上停止しています: {self.current}')
+        if await self._resume():
+            return True
+        self._stop_current()
+        self.events.emit(Events.TRACK_ERRORED, url=self.current, error=TimeoutError('stream stalled'))
+        return await self._start_next()
+
+    async def _resume(self) -> bool:
+        """Restart the current track at the played position with a freshly resolved stream"""
+        if self._resumes >= self.MAX_RESUMES:
+            self.logger.error(f'❌ 再接続の上限に達したため次の曲に進みます: {self.current}')
+            return False
+        stopped = self._source
+        position = 0.0 if stopped.is_live else stopped.position
+        if stopped.duration and position >= stopped.duration - stopped.EOF_TOLERANCE:
+            # Nothing left worth restarting for
+            return False
+        self._resumes += 1
+        self.logger.warning(f'🔁 ストリームを再取得して{position:.1f}秒から再開します '
+                            f'({self._resumes}/{self.MAX_RESUMES}): {self.current}')
+        self._stop_current()
+        # A stalled decoder blocks the player thread in read(), kill it to release the thread
+        await asyncio.to_thread(stopped.cleanup)
+
+        self._set_state(State.RESOLVING)
+        try:
+            stream = await self.resolver(self.current)
+        except Exception as e:
+            self.logger.error(f'❌ ストリームの再取得に失敗しました: {e}')
+            self._set_state(State.IDLE)
+            return False
+        return self._play(stream, position)
+
+    async def _on_seek(self, position: float) -> bool:
+        if self.state not in (State.PLAYING, State.PAUSED) or self._stream.is_live:
+            return False
+        paused = self.state == State.PAUSED
+        stream = self._stream
+        # Keep the resolved stream, only the decoder is restarted
+        self._stream = None
+        self._stop_current()
+        self.logger.info(f'⏩ {position:.1f}秒にシークします: {self.current}')
+        if not self._play(stream, position):
+            return await self._start_next()
+        if paused:
+            self.vc.pause()
+            self._set_state(State.PAUSED)
+        return True
+
+    async def _on_pause(self) -> bool:
+        if self.state != State.PLAYING or self.vc is None:
+            return False
+        self.vc.pause()
+        self._set_state(State.PAUSED)
+        return True
+
+    async def _on_resume(self) -> bool:
+        if self.state != State.PAUSED or self.vc is None:
+            return False
+        self.vc.resume()
+        self._source.touch()
+        self._set_state(State.PLAYING)
+        return True
+
+    async def _on_stop(self) -> bool:
+        was_active = self.state != State.IDLE
+        self._stop_current()
+        self._stop_watchdog()
+        self.current = None
+        self.events.emit(Events.PLAYBACK_STOPPED, reason='stopped')
+        return was_active
+
+    def _stop_current(self):
+        self._set_state(State.STOPPING)
+        # Invalidate the after callback of the current track
+        self._generation += 1
+        if self.vc is not None and (self.vc.is_playing() or self.vc.is_paused()):
+            self.vc.stop()
+        self._release()
+        self._set_state(State.IDLE)
+
+    def _release(self):
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception as e:
+                self.logger.warning(f'⚠️ 再生リソースの解放に失敗しました: {e}')
+            self._stream = None
+
+    async def _start_next(self, repeat=None) -> bool:
+        """Resolve and start the next track, skipping tracks that fail to resolve
+
+        Args:
+            repeat (Audio.Stream): Stream of the track that just ended, replayed in loop mode
+        """
+        try:
+            return await self._next(repeat)
+        finally:
+            # Loop mode was turned off or playback stopped before the repeat started
+            if repeat is not None and repeat is not self._stream:
+                repeat.close()
+
+    async def _next(self, repeat) -> bool:
+        while True:
+            if self.vc is None or not self.vc.is_connected():
+                self.logger.error('❌ ボイスチャンネルに接続されていません')
+                self._set_state(State.IDLE)
+                return False
+            if self.is_loop() and self.current:
+                url = self.current
+            elif len(self.queue) > 0:
+                url = self.queue.pop_queue()
+            else:
+                self.logger.info('📋 キューが空になりました - 再生を停止します')
+                self.current = None
+                self._set_state(State.IDLE)
+                self._stop_watchdog()
+                self.events.emit(Events.PLAYBACK_STOPPED, reason='finished')
+                return False
+
+            self.current = url
+            self._resumes = 0
+            if repeat is not None and url == repeat.url:
+                self.logger.debug(f'🔁 解決済みのストリームを再利用します: {url}')
+                stream, repeat = repeat, None
+                if self._play(stream):
+                    self.events.emit(Events.TRACK_STARTED, url=url, loop=self.is_loop())
+                    return True
+            self._set_state(State.RESOLVING)
+            try:
+                stream = await self.resolver(url)
+            except Exception as e:
+                self.logger.error(f'❌ 音楽再生処理でエラーが発生しました: {e}')
+                self.events.emit(Events.TRACK_ERRORED, url=url, error=e)
+                if self.is_loop():
+                    # Do not retry a broken track forever
+                    self.current = None
+                continue
+
+            if not self._play(stream):
+                continue
+            self.events.emit(Events.TRACK_STARTED, url=url, loop=self.is_loop())
+            return True
+
+    def _play(self, stream, start: float = 0.0) -> bool:
+        """Open a resolved stream at start seconds and hand it to the voice client"""
+        self._set_state(State.BUFFERING)
+        self._generation += 1
+        self._stream = stream
+        self._source = None
+        try:
+            self._source = stream.open(start)
+            self.vc.play(self._source, after=self._after(asyncio.get_running_loop(), self._generation))
+        except Exception as e:
+            self.logger.error(f'❌ 音楽再生の開始に失敗しました: {e}')
+            if self._source is not None:
+                self._source.cleanup()
+            self._release()
+            self._source = None
+            self._set_state(State.IDLE)
+            self.events.emit(Events.TRACK_ERRORED, url=self.current, error=e)
+            return False
+        self._set_state(State.PLAYING)
+        self._start_watchdog()
+        return True
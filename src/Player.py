@@ -20,6 +20,9 @@ class Player:
     Player Class
     Note: This Class is used to manage Player
     """
+    # Format choices remembered per (video, channel bitrate)
+    FORMAT_CACHE_SIZE = 1000
+
     def __init__(self):
         """Initialize Queue Class"""
         self.logger = logger
@@ -35,7 +38,49 @@ class Player:
             self.logger.warning('⚠️ YouTubeのボット検出を回避するにはCookieファイルが必要な場合があります')
             self.cookie_file = None
 
-    def streamming_youtube(self, url):
+        # (extractor, video id, kbps) -> format_id
+        self.format_cache = {}
+
+    @staticmethod
+    def select_audio_format(formats: list, bitrate: int) -> dict:
+        """Select the audio-only format that best matches a voice channel bitrate
+        Note: Only the preferred audio track is considered (the original language on videos
+              with dubbed tracks), as with yt-dlp's default sort, and DRC variants come last.
+              Opus is preferred (Discord sends Opus), then the smallest format at or above the
+              channel bitrate, or the largest one below it if none reaches it. Progressive
+              (non-HLS) formats are preferred over HLS.
+
+        Args:
+            formats (list): Formats from yt-dlp info
+            bitrate (int): Voice channel bitrate in bps
+
+        Returns:
+            dict: Selected format (None if there is no audio-only format)
+        """
+        kbps = bitrate / 1000
+        candidates = [f for f in formats
+                      if f.get('url') and f.get('vcodec') in ('none', None) and f.get('acodec') not in ('none', None)]
+        if not candidates:
+            return None
+
+        def language(f):
+            # yt-dlp treats a missing language_preference as -1
+            preference = f.get('language_preference')
+            return -1 if preference is None else preference
+
+        best = max(map(language, candidates))
+        candidates = [f for f in candidates if language(f) == best]
+
+        def rank(f):
+            abr = f.get('abr') or f.get('tbr') or 0
+            enough = abr >= kbps
+            drc = (f.get('format_id') or '').endswith('-drc') or 'DRC' in (f.get('format_note') or '')
+            return (drc, (f.get('protocol') or '').startswith('m3u8'), 'opus' not in (f.get('acodec') or ''),
+                    not enough, abr if enough else -abr)
+
+        return min(candidates, key=rank)
+
+    def streamming_youtube(self, url, bitrate: int = None):
         logger.info(f'🎼 YouTube動画のストリーミング準備開始: {url}')
 
         # ストリーミング用設定（ダウンロードしない）
@@ -74,4 +119,29 @@ class Player:
                 manifest_url = song.get('manifest_url') or song.get('url')
                 logger.debug(f'🎵 HLSマニフェストURL検出: {manifest_url[:80]}...' if manifest_url and len(manifest_url) > 80 else f'🎵 HLSマニフェストURL: {manifest_url}')
 
+            if bitrate and song.get('formats'):
+                self._apply_audio_format(song, bitrate)
+
         return song
+
+    def _apply_audio_format(self, song: dict, bitrate: int):
+        """Replace the format yt-dlp selected with the one matched to the channel bitrate"""
+        key = (song.get('extractor_key'), song.get('id'), bitrate // 1000)
+        formats = song['formats']
+        cached = self.format_cache.get(key)
+        selected = next((f for f in formats if f.get('format_id') == cached and f.get('url')), None) \
+            if cached else None
+        if selected is None:
+            selected = self.select_audio_format(formats, bitrate)
+            if selected is None:
+                return
+            if len(self.format_cache) >= self.FORMAT_CACHE_SIZE:
+                del self.format_cache[next(iter(self.format_cache))]
+            self.format_cache[key] = selected.get('format_id')
+        if selected.get('format_id') == song.get('format_id'):
+            return
+        logger.info(f'🎚️ 音声フォーマットを選択しました: format_id={selected.get("format_id")}, '
+                    f'acodec={selected.get("acodec")}, abr={selected.get("abr")}kbps '
+                    f'(チャンネル {bitrate // 1000}kbps, 既定 format_id={song.get("format_id")}, abr={song.get("abr")}kbps)')
+        for field in ('format_id', 'url', 'ext', 'acodec', 'abr', 'protocol'):
+            song[field] = selected.get(field)
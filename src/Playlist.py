@@ -1,29 +1,273 @@
 # -*- coding: utf-8 -*-
+import asyncio
+from collections import OrderedDict
 import os
 import logging
+import sqlite3
+import time
+import weakref
 from datetime import datetime
 
 import orjson
 
+from Persistence import WriteBehind
+from PlaylistIndex import PlaylistIndex
+from Track import Site, Track
+from UsageStats import UsageStats
+
 # Setup Logging
 logger = logging.getLogger('PlayAudio')
 
+# SQLite Schema
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    locked      INTEGER NOT NULL DEFAULT 0,
+    last_played REAL
+);
+CREATE TABLE IF NOT EXISTS playlist_owners (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    user_id     INTEGER NOT NULL,
+    PRIMARY KEY (playlist_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS playlist_entries (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    url         TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_playlist_entries_url ON playlist_entries (playlist_id, url);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+
+def _migrate_tracks(db: sqlite3.Connection):
+    """Move entry URLs and track plays into a global tracks table"""
+    db.execute('''CREATE TABLE tracks (
+        id          INTEGER PRIMARY KEY,
+        site        INTEGER NOT NULL,
+        video_id    TEXT NOT NULL,
+        title       TEXT,
+        available   INTEGER,
+        checked_at  REAL,
+        plays       INTEGER NOT NULL DEFAULT 0,
+        last_played REAL,
+        UNIQUE (site, video_id)
+    )''')
+    db.execute('''CREATE TABLE playlist_entries_new (
+        playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+        position    INTEGER NOT NULL,
+        track_id    INTEGER NOT NULL REFERENCES tracks(id),
+        PRIMARY KEY (playlist_id, position)
+    )''')
+    entries = db.execute('SELECT playlist_id, position, url FROM playlist_entries').fetchall()
+    track_ids = {}
+    for _, _, url in entries:
+        key = Track.from_url(url).key
+        if key not in track_ids:
+            track_ids[key] = db.execute('INSERT INTO tracks (site, video_id) VALUES (?, ?)',
+                                        (int(key[0]), key[1])).lastrowid
+    db.executemany('INSERT INTO playlist_entries_new (playlist_id, position, track_id) VALUES (?, ?, ?)',
+                   ((playlist_id, position, track_ids[Track.from_url(url).key])
+                    for playlist_id, position, url in entries))
+    db.execute('''INSERT INTO tracks (site, video_id, plays, last_played)
+        SELECT site, video_id, plays, last_played FROM track_plays WHERE true
+        ON CONFLICT (site, video_id) DO UPDATE SET plays = excluded.plays, last_played = excluded.last_played''')
+    db.execute('DROP TABLE track_plays')
+    db.execute('DROP TABLE playlist_entries')
+    db.execute('ALTER TABLE playlist_entries_new RENAME TO playlist_entries')
+    # Reverse index: track -> playlists
+    db.execute('CREATE INDEX idx_playlist_entries_track ON playlist_entries (track_id)')
+
+
+# Schema migrations applied in order after SCHEMA, PRAGMA user_version holds the number applied.
+# A migration is either a SQL statement or a callable taking the connection.
+MIGRATIONS = [
+    # 1: Version counter for compare-and-swap writes
+    'ALTER TABLE playlists ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+    # 2: Playlist play count for usage stats
+    'ALTER TABLE playlists ADD COLUMN play_count INTEGER NOT NULL DEFAULT 0',
+    # 3: Per-track plays for usage stats
+    '''CREATE TABLE IF NOT EXISTS track_plays (
+        site        INTEGER NOT NULL,
+        video_id    TEXT NOT NULL,
+        plays       INTEGER NOT NULL DEFAULT 0,
+        last_played REAL,
+        PRIMARY KEY (site, video_id)
+    )''',
+    # 4: Global tracks table, entries reference it and track_plays is folded into it
+    _migrate_tracks,
+    # 5: Availability status from the health scan ('ok', 'dead', 'premium', 'region')
+    'ALTER TABLE tracks ADD COLUMN status TEXT',
+    # 6, 7: Non-silent part of the track found by the silence analysis (trim_start is NULL until analysed)
+    'ALTER TABLE tracks ADD COLUMN trim_start REAL',
+    'ALTER TABLE tracks ADD COLUMN trim_end REAL',
+]
+
+
+class PlaylistConflictError(Exception):
+    """Playlist Conflict Error
+    Note: Raised when a playlist was changed after it was read (version mismatch)
+    """
+
+
+class PlaylistCatalog:
+    """Playlist Catalog Class
+    Note: This Class is used to keep playlist names, entry counts and parsed playlists in memory.
+          The catalog is revalidated by the mtime of the database files at most once per
+          REVALIDATE_INTERVAL seconds, writes made through Playlist update it directly.
+
+    Args:
+        db (sqlite3.Connection): Playlist Database
+        db_path (str): Playlist Database Path
+
+    Attributes:
+        counts (dict): Entry Counts {playlist_name: count}
+        documents (OrderedDict): Parsed Playlists (LRU) {playlist_name: dict}
+        generation (int): Incremented each time the catalog is reloaded from the database
+    """
+    REVALIDATE_INTERVAL = 5
+    MAX_DOCUMENTS = 64
+
+    def __init__(self, db: sqlite3.Connection, db_path: str):
+        """Initialize PlaylistCatalog Class"""
+        self.logger = logger
+        self.db = db
+        self.stamp_paths = (db_path, f'{db_path}-wal')
+        self.counts = None
+        self.documents = OrderedDict()
+        self._names = None
+        self._stamp = None
+        self._checked = 0.0
+        self.generation = 0
+
+    def _get_stamp(self) -> tuple:
+        stamp = []
+        for path in self.stamp_paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _revalidate(self):
+        now = time.monotonic()
+        if self.counts is not None and now - self._checked < self.REVALIDATE_INTERVAL:
+            return
+        self._checked = now
+        stamp = self._get_stamp()
+        if self.counts is not None and stamp == self._stamp:
+            return
+        self._stamp = stamp
+        self.counts = dict(self.db.execute(
+            'SELECT p.name, COUNT(e.position) FROM playlists p '
+            'LEFT JOIN playlist_entries e ON e.playlist_id = p.id GROUP BY p.id'))
+        self.documents.clear()
+        self._names = None
+        self.generation += 1
+        self.logger.debug(f'🗂️ プレイリストカタログを再読み込みしました - {len(self.counts)}個のプレイリスト')
+
+    def invalidate(self):
+        """Reload the catalog from the database on next access"""
+        self.counts = None
+
+    def names(self) -> list:
+        """Sorted Playlist Names"""
+        self._revalidate()
+        if self._names is None:
+            self._names = sorted(self.counts)
+        return self._names
+
+    def exists(self, playlist: str) -> bool:
+        """Check Playlist Exists"""
+        self._revalidate()
+        return playlist in self.counts
+
+    def count(self, playlist: str) -> int:
+        """Entry Count (0 if not found)"""
+        self._revalidate()
+        return self.counts.get(playlist, 0)
+
+    def get(self, playlist: str, loader):
+        """Get Parsed Playlist
+
+        Args:
+            playlist (str): Playlist Name
+            loader (callable): Loads the playlist from the database on a cache miss
+
+        Returns:
+            dict: Cached Playlist (do not modify)
+            None: Playlist Not Found
+        """
+        self._revalidate()
+        if playlist not in self.counts:
+            return None
+        document = self.documents.get(playlist)
+        if document is None:
+            document = loader(playlist)
+            if document is None:
+                return None
+            self.documents[playlist] = document
+            if len(self.documents) > self.MAX_DOCUMENTS:
+                self.documents.popitem(last=False)
+        else:
+            self.documents.move_to_end(playlist)
+        return document
+
+    def update(self, playlist: str, count: int = None):
+        """Update Catalog after a write through Playlist
+
+        Args:
+            playlist (str): Playlist Name
+            count (int): New Entry Count, None if the playlist was deleted
+        """
+        if self.counts is None:
+            return
+        self.documents.pop(playlist, None)
+        if count is None:
+            if self.counts.pop(playlist, None) is not None:
+                self._names = None
+        else:
+            if playlist not in self.counts:
+                self._names = None
+            self.counts[playlist] = count
+        self.touch()
+
+    def touch(self):
+        """Accept the current database mtime after a write through Playlist"""
+        if self.counts is not None:
+            self._stamp = self._get_stamp()
+
 
 class Playlist:
     """Playlist Class
-    Note: This Class is used to manage Playlist
+    Note: This Class is used to manage Playlist.
+          Playlists are stored in a SQLite database (playlists, entries with position,
+          owners, lock flag and last played date). Entries reference a global tracks table
+          keyed by (site, video_id), which holds each video's metadata once.
 
     Args:
-        PLAYLIST_PATH (str): Playlist Path
-        PLAYLIST_DATES_PATH (str): Playlist Dates Path
+        PLAYLIST_PATH (str): Playlist Path (legacy JSON directory, imported once)
+        PLAYLIST_DATES_PATH (str): Playlist Dates Path (legacy JSON file, imported once)
+        PLAYLIST_DB_PATH (str): Playlist Database Path
 
     Attributes:
         logger (logging): Logger
         playlist_path (str): Playlist Path
         playlist_dates_path (str): Playlist Dates Path
-        playlist_dates (dict): Playlist Dates
+        db (sqlite3.Connection): Playlist Database
+        catalog (PlaylistCatalog): In-memory Playlist Catalog
+        index (PlaylistIndex): Autocomplete Index
+        stats (UsageStats): Play counts, last played dates and per-track plays
+        stats_writer (WriteBehind): Coalesces stats changes into one save per interval
+        locks (WeakValueDictionary): Per-playlist asyncio Locks {playlist_name: asyncio.Lock}
     """
-    def __init__(self, PLAYLIST_PATH: str, PLAYLIST_DATES_PATH: str):
+    def __init__(self, PLAYLIST_PATH: str, PLAYLIST_DATES_PATH: str, PLAYLIST_DB_PATH: str):
         """Initialize Playlist Class"""
         self.logger = logger
         self.logger.debug('🗂️ Playlist クラスが初期化されました')
@@ -32,128 +276,635 @@ class Playlist:
         self.logger.debug(f'📁 プレイリストパス設定: {self.playlist_path}')
 
         self.playlist_dates_path = PLAYLIST_DATES_PATH
+        self.stats = UsageStats()
+        self.stats_writer = WriteBehind(self.save_stats, name='usage stats')
+
+        db_dir = os.path.dirname(PLAYLIST_DB_PATH)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db = sqlite3.connect(PLAYLIST_DB_PATH, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self._migrate()
+        self.logger.info(f'🗄️ プレイリストデータベースを開きました: {PLAYLIST_DB_PATH}')
+
+        if self._get_meta('json_imported') is None:
+            self.import_json_playlists()
+
+        self.catalog = PlaylistCatalog(self.db, PLAYLIST_DB_PATH)
+        self.index = PlaylistIndex()
+        self._index_generation = None
+        self.locks = weakref.WeakValueDictionary()
+        self._load_stats()
+
+    def _load_stats(self):
+        playlists = {name: (count, last_played) for name, count, last_played in self.db.execute(
+            'SELECT name, play_count, last_played FROM playlists')}
+        tracks = {(Site(site), video_id): (plays, last_played) for site, video_id, plays, last_played in self.db.execute(
+            'SELECT site, video_id, plays, last_played FROM tracks WHERE plays > 0')}
+        self.stats.build(playlists, tracks)
+
+    def _migrate(self):
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            # New database, or one created before migrations existed
+            with self.db:
+                self.db.executescript(SCHEMA)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.db:
+                self.db.execute('BEGIN')
+                if callable(migration):
+                    migration(self.db)
+                else:
+                    self.db.execute(migration)
+                self.db.execute(f'PRAGMA user_version = {number}')
+            self.logger.info(f'🗄️ データベースを移行しました: version {number}')
+
+    def lock(self, playlist: str) -> asyncio.Lock:
+        """Get Playlist Lock
+        Note: Hold this lock across read-modify-write sequences that await in between.
+              Read-only paths do not need it.
+
+        Args:
+            playlist (str): Playlist Name
 
+        Returns:
+            asyncio.Lock: Lock for the playlist
+        """
+        lock = self.locks.get(playlist)
+        if lock is None:
+            lock = self.locks[playlist] = asyncio.Lock()
+        return lock
+
+    def _bump_version(self, playlist_id: int, expected_version: int = None):
+        """Increment the playlist version inside a transaction
+
+        Raises:
+            PlaylistConflictError: expected_version does not match the stored version
+        """
+        if expected_version is None:
+            self.db.execute('UPDATE playlists SET version = version + 1 WHERE id = ?', (playlist_id,))
+            return
+        cur = self.db.execute('UPDATE playlists SET version = version + 1 WHERE id = ? AND version = ?',
+                              (playlist_id, expected_version))
+        if cur.rowcount == 0:
+            self.catalog.invalidate()
+            raise PlaylistConflictError(f'Playlist was modified concurrently (expected version {expected_version})')
+
+    def _get_meta(self, key: str):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def _get_playlist_id(self, playlist: str):
+        row = self.db.execute('SELECT id FROM playlists WHERE name = ?', (playlist,)).fetchone()
+        return row[0] if row else None
+
+    def import_json_playlists(self) -> int:
+        """Import JSON Playlists
+        Note: One-shot importer for the legacy {PLAYLIST_PATH}{name}.json files and playlist_date.json.
+              The JSON files are left in place.
+
+        Returns:
+            int: Number of imported playlists
+        """
+        dates = {}
         if os.path.isfile(self.playlist_dates_path):
-            self.playlist_dates = self.load_playlists_date()
-            self.logger.info(f'📅 プレイリスト使用履歴を読み込みました - {len(self.playlist_dates)}個のプレイリスト')
+            try:
+                with open(self.playlist_dates_path, 'r', encoding='utf-8') as f:
+                    dates = orjson.loads(f.read())
+            except Exception as e:
+                self.logger.error(f'❌ プレイリスト使用履歴の読み込みに失敗しました: {e}')
+
+        files = []
+        if os.path.isdir(self.playlist_path):
+            files = [file for file in os.listdir(self.playlist_path) if file.endswith('.json')]
+
+        imported = 0
+        with self.db:
+            for file in files:
+                playlist = file[:-5]
+                try:
+                    with open(os.path.join(self.playlist_path, file), 'r', encoding='utf-8') as f:
+                        data = orjson.loads(f.read())
+                except Exception as e:
+                    self.logger.error(f'❌ プレイリスト"{playlist}"の読み込みに失敗しました: {e}')
+                    continue
+                if self._get_playlist_id(playlist) is not None:
+                    continue
+
+                last_played = None
+                date = dates.get(file)
+                if date:
+                    try:
+                        last_played = datetime.strptime(date[0], '%Y-%m-%d %H:%M:%S').timestamp()
+                    except ValueError:
+                        self.logger.warning(f'⚠️ 日付の形式が不正です: {playlist} {date}')
+
+                self._insert_playlist(playlist, data.get('owner', []), data.get('locked', False),
+                                      data.get('urls', []), last_played)
+                imported += 1
+            self._set_meta('json_imported', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        self.logger.info(f'📥 JSONプレイリストをデータベースにインポートしました - {imported}個のプレイリスト')
+        return imported
+
+    def _insert_playlist(self, playlist: str, owner: list, locked: bool, urls: list, last_played: float = None):
+        cur = self.db.execute('INSERT INTO playlists (name, locked, last_played) VALUES (?, ?, ?)',
+                              (playlist, int(locked), last_played))
+        playlist_id = cur.lastrowid
+        self.db.executemany('INSERT OR IGNORE INTO playlist_owners (playlist_id, user_id) VALUES (?, ?)',
+                            ((playlist_id, user_id) for user_id in owner))
+        self.db.executemany('INSERT INTO playlist_entries (playlist_id, position, track_id) VALUES (?, ?, ?)',
+                            ((playlist_id, position, track_id)
+                             for position, track_id in enumerate(self._get_track_ids(urls))))
+        return playlist_id
+
+    def _get_track_ids(self, urls: list, create: bool = True) -> list:
+        """Track IDs for URLs (missing tracks are created, or skipped if create is False)"""
+        keys = [Track.from_url(url).key for url in urls]
+        if create:
+            self.db.executemany('INSERT OR IGNORE INTO tracks (site, video_id) VALUES (?, ?)',
+                                ((int(site), video_id) for site, video_id in keys))
+        track_ids = []
+        for site, video_id in keys:
+            row = self.db.execute('SELECT id FROM tracks WHERE site = ? AND video_id = ?',
+                                  (int(site), video_id)).fetchone()
+            if row is not None:
+                track_ids.append(row[0])
+        return track_ids
+
+    def check_file(self, playlist: str) -> bool:
+        """Check Playlist Exists"""
+        if self.catalog.exists(playlist):
+            self.logger.debug('Playlist Exists')
+            return True
         else:
-            self.playlist_dates = {}
-            self.save_playlists_date()
+            self.logger.debug('Playlist Not Found')
+            return False
+
+    def list_playlists(self) -> list:
+        """List Playlists
+
+        Returns:
+            list: Playlist Names
+        """
+        return list(self.catalog.names())
+
+    def get_playlist_count(self, playlist: str) -> int:
+        """Get Number of URLs in Playlist
+
+        Args:
+            playlist (str): Playlist Name
+
+        Returns:
+            int: Number of URLs
+        """
+        return self.catalog.count(playlist)
+
+    def get_playlist_version(self, playlist: str):
+        """Get Playlist Version without loading its URLs
+
+        Args:
+            playlist (str): Playlist Name
+
+        Returns:
+            int: Version (None if the playlist does not exist)
+        """
+        row = self.db.execute('SELECT version FROM playlists WHERE name = ?', (playlist,)).fetchone()
+        return row[0] if row else None
+
+    def get_playlist(self, playlist: str):
+        """Get Playlist
+
+        Args:
+            playlist (str): Playlist Name
+
+        Returns:
+            dict: {'owner': list, 'locked': bool, 'urls': list, 'version': int}
+            None: Playlist Not Found
+        """
+        document = self.catalog.get(playlist, self._load_playlist)
+        if document is None:
+            return None
+        return {'owner': list(document['owner']), 'locked': document['locked'], 'urls': list(document['urls']),
+                'version': document['version']}
+
+    def _load_playlist(self, playlist: str):
+        row = self.db.execute('SELECT id, locked, version FROM playlists WHERE name = ?', (playlist,)).fetchone()
+        if row is None:
+            return None
+        playlist_id, locked, version = row
+        owner = [r[0] for r in self.db.execute(
+            'SELECT user_id FROM playlist_owners WHERE playlist_id = ?', (playlist_id,))]
+        urls = [Track.get(Site(site), video_id).url for site, video_id in self.db.execute(
+            'SELECT t.site, t.video_id FROM playlist_entries e JOIN tracks t ON t.id = e.track_id '
+            'WHERE e.playlist_id = ? ORDER BY e.position', (playlist_id,))]
+        return {'owner': owner, 'locked': bool(locked), 'urls': urls, 'version': version}
+
+    def create_playlist(self, playlist: str, owner: int, locked: bool, urls: list):
+        """Create Playlist
+
+        Args:
+            playlist (str): Playlist Name
+            owner (int): Owner User ID
+            locked (bool): Edit Lock
+            urls (list): List of URLs
+
+        Raises:
+            sqlite3.IntegrityError: Playlist already exists
+        """
+        with self.db:
+            self._insert_playlist(playlist, [owner], locked, urls)
+        self.catalog.update(playlist, len(urls))
+        self.index.add(playlist)
+        self.stats.add_playlist(playlist)
+        self.logger.info(f'🗂️ プレイリスト"{playlist}"を作成しました - {len(urls)}曲')
+
+    def add_urls(self, playlist: str, urls: list, expected_version: int = None) -> int:
+        """Append URLs to Playlist
+
+        Args:
+            playlist (str): Playlist Name
+            urls (list): List of URLs
+            expected_version (int): Version read by the caller (no check if None)
+
+        Returns:
+            int: Number of appended URLs
+
+        Raises:
+            PlaylistConflictError: The playlist was modified after expected_version was read
+        """
+        playlist_id = self._get_playlist_id(playlist)
+        if playlist_id is None:
+            self.logger.warning(f'⚠️ プレイリストが見つかりません: {playlist}')
+            return 0
+        with self.db:
+            self._bump_version(playlist_id, expected_version)
+            last = self.db.execute('SELECT MAX(position) FROM playlist_entries WHERE playlist_id = ?',
+                                   (playlist_id,)).fetchone()[0]
+            start = 0 if last is None else last + 1
+            self.db.executemany('INSERT INTO playlist_entries (playlist_id, position, track_id) VALUES (?, ?, ?)',
+                                ((playlist_id, start + i, track_id)
+                                 for i, track_id in enumerate(self._get_track_ids(urls))))
+        self.catalog.update(playlist, self.catalog.count(playlist) + len(urls))
+        self.logger.info(f'➕ プレイリスト"{playlist}"に{len(urls)}曲追加しました')
+        return len(urls)
+
+    def set_locked(self, playlist: str, locked: bool, expected_version: int = None):
+        """Set Playlist Edit Lock
+
+        Args:
+            playlist (str): Playlist Name
+            locked (bool): Edit Lock
+            expected_version (int): Version read by the caller (no check if None)
+
+        Raises:
+            PlaylistConflictError: The playlist was modified after expected_version was read
+        """
+        playlist_id = self._get_playlist_id(playlist)
+        if playlist_id is None:
+            self.logger.warning(f'⚠️ プレイリストが見つかりません: {playlist}')
+            return
+        with self.db:
+            self._bump_version(playlist_id, expected_version)
+            self.db.execute('UPDATE playlists SET locked = ? WHERE id = ?', (int(locked), playlist_id))
+        self.catalog.update(playlist, self.catalog.count(playlist))
+        self.logger.info(f'🔒 プレイリスト"{playlist}"の編集ロック: {locked}')
+
+    def delete_playlist(self, playlist: str, expected_version: int = None):
+        """Delete Playlist
+
+        Args:
+            playlist (str): Playlist Name
+            expected_version (int): Version read by the caller (no check if None)
+
+        Raises:
+            PlaylistConflictError: The playlist was modified after expected_version was read
+        """
+        playlist_id = self._get_playlist_id(playlist)
+        if playlist_id is None:
+            return
+        with self.db:
+            self._bump_version(playlist_id, expected_version)
+            self.db.execute('DELETE FROM playlists WHERE id = ?', (playlist_id,))
+        self.catalog.update(playlist)
+        self.index.remove(playlist)
+        self.stats.remove_playlist(playlist)
+        self.logger.info(f'🗑️ プレイリスト"{playlist}"を削除しました')
 
     def record_play_date(self, playlist_name: str, play_date: datetime):
         """Record Play Date
+        Note: Updates the last played date without counting a play (create, edit).
+              The date is saved in the background by stats_writer
+
         Args:
             playlist_name (str): Playlist Name
             play_date (datetime): Play Date
         """
-        play_date = play_date.strftime("%Y-%m-%d %H:%M:%S")
-        try:
-            if len(self.playlist_dates[playlist_name]) == 0:
-                self.playlist_dates[playlist_name].append(play_date)
-            else:
-                self.playlist_dates[playlist_name][0] = play_date
-            self.logger.info(f'Record Date {self.playlist_dates}')
-        except KeyError:
-            self.logger.warning('KeyError: Playlist Name Not Found')
-            self.playlist_dates.update({playlist_name: [play_date]})
-            logger.debug(f'Playlist Dates: {self.playlist_dates}')
+        self.stats.touch_playlist(playlist_name, play_date.timestamp())
+        self.index.record_play(playlist_name, play_date.timestamp(), count=0)
+        self.stats_writer.mark_dirty()
+        self.logger.debug(f'Record Date {playlist_name}: {play_date}')
+
+    def record_play(self, playlist_name: str, play_date: datetime):
+        """Record Playlist Play
+        Note: Counts one play and updates the last played date
 
-    def calculate_playlist_usage(self, file: list) -> list:
-        """Calculate Playlist Usage
         Args:
-            file (list): List of Files
-        Returns:
-            list: Playlist Usage
+            playlist_name (str): Playlist Name
+            play_date (datetime): Play Date
         """
-        playlist_usage = []
-        self.logger.debug('Calculate Playlist Usage')
-        # ファイル名から日付を抽出する辞書
-        diff_playlists_dates = {key: self.playlist_dates[key] for key in self.playlist_dates
-                                if any(filename in key.split('.')[0] for filename in file)}
+        self.stats.record_playlist(playlist_name, play_date.timestamp())
+        self.index.record_play(playlist_name, play_date.timestamp())
+        self.stats_writer.mark_dirty()
+        self.logger.debug(f'Record Play {playlist_name}: {self.stats.play_count(playlist_name)}回')
 
-        for playlist_name in diff_playlists_dates:
-            usage_count = diff_playlists_dates[playlist_name]
-            playlist_usage.append({playlist_name: usage_count})
-        try:
-            playlist_usage = sorted(playlist_usage,
-                                    key=lambda x: datetime.strptime(list(x.values())[0][0], '%Y-%m-%d %H:%M:%S')
-                                    if len(list(x.values())[0]) > 0 else datetime.min, reverse=True)
-        except Exception as e:
-            logger.error(f'calculate_playlist_usage Error: {e}')
-        return playlist_usage[:25]
+    def record_track_play(self, url: str, play_date: datetime = None):
+        """Record Track Play
 
-    def save_playlists_date(self):
-        """Save Playlists Date"""
-        with open(self.playlist_dates_path, 'w', encoding='utf-8') as f:
-            f.write(orjson.dumps(self.playlist_dates, option=orjson.OPT_INDENT_2).decode('utf-8'))
-            self.logger.info(self.playlist_dates)
-            self.logger.info('Save Playlists Date')
-        os.chmod(self.playlist_dates_path, 0o666)
+        Args:
+            url (str): Video URL
+            play_date (datetime): Play Date (now if None)
+        """
+        play_date = play_date or datetime.now()
+        self.stats.record_track(Track.from_url(url).key, play_date.timestamp())
+        self.stats_writer.mark_dirty()
+
+    def get_usage(self, limit: int = 10) -> dict:
+        """Get Usage Stats
 
-    def load_playlists_date(self):
-        """Load Playlists Date"""
-        with open(self.playlist_dates_path, 'r', encoding='utf-8') as f:
-            self.logger.info('Load Playlists Date')
-            return orjson.loads(f.read())
+        Args:
+            limit (int): Max entries per ranking
 
-    def delete_playlists_date(self, playlist):
-        """Delete Playlists Date
+        Returns:
+            dict: {'most_used': [(playlist, play_count)], 'recently_used': [(playlist, datetime)],
+                   'top_tracks': [(url, plays)]}
+        """
+        most_used = [playlist for playlist in self.stats.most_used(limit) if self.catalog.exists(playlist)]
+        recently_used = [playlist for playlist in self.stats.recently_used(limit) if self.catalog.exists(playlist)]
+        return {
+            'most_used': [(playlist, self.stats.play_count(playlist)) for playlist in most_used],
+            'recently_used': [(playlist, datetime.fromtimestamp(self.stats.last_played(playlist)))
+                              for playlist in recently_used],
+            'top_tracks': [(Track.get(*key).url, plays) for key, plays in self.stats.top_tracks(limit)],
+        }
 
+    def search_playlists(self, query: str, limit: int = 25) -> list:
+        """Search Playlists for autocomplete
         Args:
-            playlist (str): Playlist Name
+            query (str): Query
+            limit (int): Max Results
+        Returns:
+            list: Playlist Names ordered by match quality and usage
         """
-        del self.playlist_dates[f'{playlist}.json']
-        self.logger.info(f'Delete Playlists Date: {playlist}')
-        self.save_playlists_date()
+        if not query:
+            # Recently used first, from the stats in O(limit)
+            playlists = [playlist for playlist in self.stats.recently_used(limit) if self.catalog.exists(playlist)]
+            if len(playlists) < limit:
+                found = set(playlists)
+                playlists.extend(playlist for playlist in self.catalog.names() if playlist not in found)
+            return playlists[:limit]
+
+        names = self.catalog.names()
+        if self._index_generation != self.catalog.generation:
+            self.index.build(names, dict(self.stats.recent), self.stats.playlists.counts)
+            self._index_generation = self.catalog.generation
+        return self.index.search(query, limit)
+
+    def save_stats(self):
+        """Save Usage Stats"""
+        playlists, tracks = self.stats.take_dirty()
+        if not playlists and not tracks:
+            return
+        try:
+            with self.db:
+                self.db.executemany('UPDATE playlists SET play_count = ?, last_played = ? WHERE name = ?',
+                                    ((count, played, name) for name, (count, played) in playlists.items()))
+                self.db.executemany(
+                    'INSERT INTO tracks (site, video_id, plays, last_played) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (site, video_id) DO UPDATE SET plays = excluded.plays, last_played = excluded.last_played',
+                    ((int(site), video_id, plays, played) for (site, video_id), (plays, played) in tracks.items()))
+        except Exception:
+            # Retry on the next flush
+            self.stats.dirty_playlists.update(playlists)
+            self.stats.dirty_tracks.update(tracks)
+            raise
+        self.catalog.touch()
+        self.logger.info(f'Save Usage Stats: プレイリスト{len(playlists)}件, 曲{len(tracks)}件')
+
+    def close(self):
+        """Save pending changes and close the database"""
+        self.stats_writer.close()
+        self.db.close()
+        self.logger.info('🗄️ プレイリストデータベースを閉じました')
 
     def rename_playlist(self, old_playlist: str, new_playlist: str):
-        """Rename Playlists Date
+        """Rename Playlist
         Args:
             old_playlist (str): Old Playlist Name
             new_playlist (str): New Playlist Name
         """
-        self.playlist_dates[f'{new_playlist}.json'] = self.playlist_dates[f'{old_playlist}.json']
-        self.delete_playlists_date(old_playlist)
-        os.rename(f'{self.playlist_path}{old_playlist}.json', f'{self.playlist_path}{new_playlist}.json')
-        self.logger.info(f'Rename Playlists Date: {old_playlist} -> {new_playlist}')
-        self.save_playlists_date()
+        with self.db:
+            self.db.execute('UPDATE playlists SET name = ?, version = version + 1 WHERE name = ?',
+                            (new_playlist, old_playlist))
+        count = self.catalog.count(old_playlist)
+        self.catalog.update(old_playlist)
+        self.catalog.update(new_playlist, count)
+        self.index.rename(old_playlist, new_playlist)
+        self.stats.rename_playlist(old_playlist, new_playlist)
+        self.logger.info(f'Rename Playlist: {old_playlist} -> {new_playlist}')
 
-    def check_file(self, playlist: str) -> bool:
-        """Check File"""
-        if os.path.isfile(os.path.join(self.playlist_path, f'{playlist}.json')):
-            self.logger.debug('File Exists')
-            return True
-        else:
-            self.logger.debug('File Not Found')
-            return False
-
-    def remove_urls_from_playlist(self, playlist: str, urls_to_remove: list) -> int:
+    def remove_urls_from_playlist(self, playlist: str, urls_to_remove: list, expected_version: int = None) -> int:
         """プレイリストからエラーURLを削除
         Args:
-            playlist (str): プレイリスト名（拡張子なし）
+            playlist (str): プレイリスト名
             urls_to_remove (list): 削除するURLのリスト
+            expected_version (int): 呼び出し元が読み込んだバージョン（Noneの場合は確認しない）
         Returns:
             int: 削除されたURLの数
+        Raises:
+            PlaylistConflictError: expected_version以降にプレイリストが変更された
         """
-        playlist_file = os.path.join(self.playlist_path, f'{playlist}.json')
-        if not os.path.isfile(playlist_file):
+        playlist_id = self._get_playlist_id(playlist)
+        if playlist_id is None:
             self.logger.warning(f'⚠️ プレイリストが見つかりません: {playlist}')
             return 0
 
         try:
-            with open(playlist_file, 'r', encoding='utf-8') as f:
-                data = orjson.loads(f.read())
-
-            original_count = len(data['urls'])
-            data['urls'] = [url for url in data['urls'] if url not in urls_to_remove]
-            removed_count = original_count - len(data['urls'])
+            # 表記揺れも含めて動画IDで照合する
+            track_ids = set(self._get_track_ids(urls_to_remove, create=False))
+            if not track_ids:
+                return 0
+            with self.db:
+                self._bump_version(playlist_id, expected_version)
+                removed_count = sum(
+                    self.db.execute('DELETE FROM playlist_entries WHERE playlist_id = ? AND track_id = ?',
+                                    (playlist_id, track_id)).rowcount
+                    for track_id in track_ids)
+            if removed_count == 0:
+                # Only the version changed, drop the cached document
+                self.catalog.update(playlist, self.catalog.count(playlist))
+                return 0
 
-            if removed_count > 0:
-                with open(playlist_file, 'w', encoding='utf-8') as f:
-                    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8'))
-                self.logger.info(f'🗑️ プレイリスト "{playlist}" から {removed_count}件のエラーURLを削除しました')
+            self.catalog.update(playlist, self.catalog.count(playlist) - removed_count)
+            self.logger.info(f'🗑️ プレイリスト "{playlist}" から {removed_count}件のエラーURLを削除しました')
 
             return removed_count
+        except PlaylistConflictError:
+            raise
         except Exception as e:
             self.logger.error(f'❌ プレイリストからのURL削除でエラー: {e}')
             return 0
+
+    def get_track_playlists(self, url: str) -> list:
+        """Get Playlists containing a Track
+        Note: Uses the reverse index on playlist_entries.track_id
+
+        Args:
+            url (str): Video URL (any spelling of the same video)
+
+        Returns:
+            list: Playlist Names
+        """
+        track_ids = self._get_track_ids([url], create=False)
+        if not track_ids:
+            return []
+        return [row[0] for row in self.db.execute(
+            'SELECT DISTINCT p.name FROM playlist_entries e JOIN playlists p ON p.id = e.playlist_id '
+            'WHERE e.track_id = ? ORDER BY p.name', (track_ids[0],))]
+
+    def remove_tracks(self, urls: list) -> dict:
+        """Remove Tracks from every Playlist
+        Note: One transaction over the reverse index, the tracks are marked unavailable
+
+        Args:
+            urls (list): Video URLs
+
+        Returns:
+            dict: Removed entry count per playlist {playlist_name: count}
+        """
+        track_ids = set(self._get_track_ids(urls, create=False))
+        if not track_ids:
+            return {}
+        removed = {}
+        with self.db:
+            for track_id in track_ids:
+                rows = self.db.execute(
+                    'SELECT p.id, p.name, COUNT(*) FROM playlist_entries e JOIN playlists p ON p.id = e.playlist_id '
+                    'WHERE e.track_id = ? GROUP BY p.id', (track_id,)).fetchall()
+                for playlist_id, name, count in rows:
+                    self._bump_version(playlist_id)
+                    removed[name] = removed.get(name, 0) + count
+                self.db.execute('DELETE FROM playlist_entries WHERE track_id = ?', (track_id,))
+                self.db.execute('UPDATE tracks SET available = 0, checked_at = ? WHERE id = ?', (time.time(), track_id))
+        for name, count in removed.items():
+            self.catalog.update(name, self.catalog.count(name) - count)
+        if removed:
+            self.logger.info(f'🗑️ {len(track_ids)}曲を{len(removed)}個のプレイリストから削除しました')
+        return removed
+
+    def set_track_info(self, url: str, title: str = None, available: bool = None):
+        """Set Track Metadata (stored once for every playlist containing the track)
+
+        Args:
+            url (str): Video URL
+            title (str): Title (unchanged if None)
+            available (bool): Availability (unchanged if None)
+        """
+        site, video_id = Track.from_url(url).key
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO tracks (site, video_id) VALUES (?, ?)', (int(site), video_id))
+            self.db.execute(
+                'UPDATE tracks SET title = COALESCE(?, title), available = COALESCE(?, available), checked_at = ? '
+                'WHERE site = ? AND video_id = ?',
+                (title, None if available is None else int(available), time.time(), int(site), video_id))
+
+    def get_track_info(self, url: str):
+        """Get Track Metadata
+
+        Args:
+            url (str): Video URL
+
+        Returns:
+            dict: {'url', 'title', 'available', 'checked_at', 'plays'}
+            None: Track Not Found
+        """
+        track = Track.from_url(url)
+        row = self.db.execute('SELECT title, available, checked_at, plays FROM tracks WHERE site = ? AND video_id = ?',
+                              (int(track.site), track.video_id)).fetchone()
+        if row is None:
+            return None
+        title, available, checked_at, plays = row
+        return {'url': track.url, 'title': title, 'available': None if available is None else bool(available),
+                'checked_at': checked_at, 'plays': plays}
+
+    def get_track_trim(self, url: str):
+        """Get Track Trim Points
+
+        Args:
+            url (str): Video URL
+
+        Returns:
+            tuple: (start, end) in seconds, end is None if the track plays to the end
+            None: Not analysed yet
+        """
+        track = Track.from_url(url)
+        row = self.db.execute('SELECT trim_start, trim_end FROM tracks WHERE site = ? AND video_id = ?',
+                              (int(track.site), track.video_id)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0], row[1]
+
+    def set_track_trim(self, url: str, start: float, end: float = None):
+        """Set Track Trim Points
+
+        Args:
+            url (str): Video URL
+            start (float): Start of the non-silent part in seconds
+            end (float): End of the non-silent part in seconds (None if it runs to the end)
+        """
+        site, video_id = Track.from_url(url).key
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO tracks (site, video_id) VALUES (?, ?)', (int(site), video_id))
+            self.db.execute('UPDATE tracks SET trim_start = ?, trim_end = ? WHERE site = ? AND video_id = ?',
+                            (start, end, int(site), video_id))
+
+    def get_scan_tracks(self) -> list:
+        """Get Tracks registered in any Playlist for the health scan
+
+        Returns:
+            list: [(url, status, checked_at)]
+        """
+        return [(Track.get(Site(site), video_id).url, status, checked_at)
+                for site, video_id, status, checked_at in self.db.execute(
+                    'SELECT site, video_id, status, checked_at FROM tracks '
+                    'WHERE id IN (SELECT track_id FROM playlist_entries)')]
+
+    def set_track_statuses(self, statuses: dict):
+        """Set Track Availability Statuses in one transaction
+
+        Args:
+            statuses (dict): {url: status}
+        """
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                'UPDATE tracks SET status = ?, available = ?, checked_at = ? WHERE site = ? AND video_id = ?',
+                ((status, int(status == 'ok'), now, int(track.site), track.video_id)
+                 for track, status in ((Track.from_url(url), status) for url, status in statuses.items())))
+
+    def get_scan_state(self):
+        """Get the start epoch of an interrupted health scan (None if no scan is pending)"""
+        value = self._get_meta('health_scan_started')
+        return float(value) if value is not None else None
+
+    def set_scan_state(self, started_at: float = None):
+        """Set the start epoch of a running health scan (None when finished)"""
+        with self.db:
+            if started_at is None:
+                self.db.execute("DELETE FROM meta WHERE key = 'health_scan_started'")
+            else:
+                self._set_meta('health_scan_started', str(started_at))
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import math
+
+logger = logging.getLogger('PlayAudio')
+
+
+class PlaylistIndex:
+    """Playlist Index Class
+    Note: This Class is used to search playlist names for autocomplete.
+          A trie answers prefix queries, a bigram index answers substring and fuzzy queries
+          (a character index for 1-character queries), and each playlist keeps a usage score
+          that is updated incrementally on each play. The top playlists by score are kept
+          sorted for the empty query, so no query scans every playlist.
+
+    Attributes:
+        scores (dict): Usage Score {playlist_name: float}
+        play_counts (dict): Play Count {playlist_name: int}
+        last_played (dict): Last Played Epoch {playlist_name: float}
+    """
+    # Score bonus per doubling of play count, in seconds of recency
+    FREQUENCY_BONUS = 86400
+    # Minimum bigram overlap (Dice coefficient) for fuzzy matches
+    FUZZY_THRESHOLD = 0.6
+    # Playlists kept ranked for the empty query (autocomplete shows 25)
+    TOP_SIZE = 25
+
+    def __init__(self):
+        """Initialize PlaylistIndex Class"""
+        self.logger = logger
+        self.scores = {}
+        self.play_counts = {}
+        self.last_played = {}
+        self._trie = {}
+        self._bigrams = {}
+        self._chars = {}
+        self._top = []
+        self._top_dirty = False
+
+    @staticmethod
+    def _to_bigrams(text: str) -> set:
+        text = f' {text} '
+        return {text[i:i+2] for i in range(len(text) - 1)}
+
+    def _score(self, playlist: str) -> float:
+        return (self.last_played.get(playlist) or 0) + \
+            self.FREQUENCY_BONUS * math.log2(1 + self.play_counts.get(playlist, 0))
+
+    def build(self, playlists: list, last_played: dict = None, play_counts: dict = None):
+        """Build Index
+
+        Args:
+            playlists (list): Playlist Names
+            last_played (dict): Last Played Epoch {playlist_name: float}
+            play_counts (dict): Play Count {playlist_name: int}
+        """
+        self.scores = {}
+        self.last_played = dict(last_played or {})
+        self.play_counts = dict(play_counts or {})
+        self._trie = {}
+        self._bigrams = {}
+        self._chars = {}
+        self._top = []
+        self._top_dirty = False
+        for playlist in playlists:
+            self.add(playlist)
+        self.logger.debug(f'🔎 プレイリスト検索インデックスを構築しました - {len(self.scores)}個のプレイリスト')
+
+    def add(self, playlist: str):
+        """Add Playlist to Index"""
+        if playlist in self.scores:
+            return
+        key = playlist.lower()
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(playlist)
+        for bigram in self._to_bigrams(key):
+            self._bigrams.setdefault(bigram, set()).add(playlist)
+        for char in set(key):
+            self._chars.setdefault(char, set()).add(playlist)
+        self.scores[playlist] = self._score(playlist)
+        self._rank(playlist)
+
+    def remove(self, playlist: str):
+        """Remove Playlist from Index"""
+        if playlist not in self.scores:
+            return
+        key = playlist.lower()
+        path = [self._trie]
+        for char in key:
+            path.append(path[-1][char])
+        path[-1][None].discard(playlist)
+        if not path[-1][None]:
+            del path[-1][None]
+        # Prune empty nodes
+        for i in range(len(key) - 1, -1, -1):
+            if path[i + 1]:
+                break
+            del path[i][key[i]]
+        for bigram in self._to_bigrams(key):
+            names = self._bigrams[bigram]
+            names.discard(playlist)
+            if not names:
+                del self._bigrams[bigram]
+        for char in set(key):
+            names = self._chars[char]
+            names.discard(playlist)
+            if not names:
+                del self._chars[char]
+        if playlist in self._top:
+            # Rebuilt on the next empty query
+            self._top_dirty = True
+        del self.scores[playlist]
+        self.last_played.pop(playlist, None)
+        self.play_counts.pop(playlist, None)
+
+    def rename(self, old_playlist: str, new_playlist: str):
+        """Rename Playlist in Index"""
+        last_played = self.last_played.get(old_playlist)
+        play_count = self.play_counts.get(old_playlist)
+        self.remove(old_playlist)
+        if last_played is not None:
+            self.last_played[new_playlist] = last_played
+        if play_count is not None:
+            self.play_counts[new_playlist] = play_count
+        self.add(new_playlist)
+
+    def record_play(self, playlist: str, timestamp: float, count: int = 1):
+        """Record Play
+        Note: Updates the usage score of one playlist in O(1)
+
+        Args:
+            playlist (str): Playlist Name
+            timestamp (float): Play Epoch
+            count (int): Number of plays to add
+        """
+        if playlist not in self.scores:
+            return
+        self.last_played[playlist] = max(timestamp, self.last_played.get(playlist) or 0)
+        self.play_counts[playlist] = self.play_counts.get(playlist, 0) + count
+        self.scores[playlist] = self._score(playlist)
+        self._rank(playlist)
+
+    def _rank(self, playlist: str):
+        """Update the top playlists after the score of one playlist rose"""
+        if self._top_dirty:
+            return
+        top = self._top
+        scores = self.scores
+        if playlist in top:
+            top.remove(playlist)
+        elif len(top) >= self.TOP_SIZE and scores[playlist] <= scores[top[-1]]:
+            return
+        # Scores only rise, so the playlist moves up and the last one may drop out
+        i = len(top)
+        while i > 0 and scores[top[i - 1]] < scores[playlist]:
+            i -= 1
+        top.insert(i, playlist)
+        del top[self.TOP_SIZE:]
+
+    def _top_playlists(self, limit: int) -> list:
+        if limit > self.TOP_SIZE:
+            return heapq.nlargest(limit, self.scores, key=self.scores.__getitem__)
+        if self._top_dirty:
+            self._top = heapq.nlargest(self.TOP_SIZE, self.scores, key=self.scores.__getitem__)
+            self._top_dirty = False
+        return self._top[:limit]
+
+    def _prefix(self, key: str) -> list:
+        node = self._trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return []
+        playlists = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    playlists.extend(child)
+                else:
+                    stack.append(child)
+        return playlists
+
+    def search(self, query: str, limit: int = 25) -> list:
+        """Search Playlists
+        Note: Prefix matches come first, then substring matches, then fuzzy matches.
+              Each group is ordered by usage score.
+
+        Args:
+            query (str): Query
+            limit (int): Max Results
+
+        Returns:
+            list: Playlist Names
+        """
+        key = query.lower()
+        scores = self.scores
+        if not key:
+            return self._top_playlists(limit)
+
+        results = heapq.nlargest(limit, self._prefix(key), key=scores.__getitem__)
+        if len(results) >= limit:
+            return results
+        found = set(results)
+
+        # Substring candidates: playlists containing every bigram of the query
+        query_bigrams = self._to_bigrams(key)
+        inner_bigrams = [bigram for bigram in query_bigrams if ' ' not in bigram]
+        if inner_bigrams:
+            sets = sorted((self._bigrams.get(bigram, set()) for bigram in inner_bigrams), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:])
+        else:
+            # 1-character query
+            candidates = self._chars.get(key, set())
+        substring = [playlist for playlist in candidates
+                     if playlist not in found and key in playlist.lower()]
+        results.extend(heapq.nlargest(limit - len(results), substring, key=scores.__getitem__))
+        if len(results) >= limit or len(key) < 3:
+            return results
+        found.update(results)
+
+        # Fuzzy candidates: Dice coefficient of bigram sets
+        overlap = {}
+        for bigram in query_bigrams:
+            for playlist in self._bigrams.get(bigram, ()):
+                if playlist not in found:
+                    overlap[playlist] = overlap.get(playlist, 0) + 1
+        fuzzy = []
+        for playlist, shared in overlap.items():
+            similarity = 2 * shared / (len(query_bigrams) + len(playlist) + 1)
+            if similarity >= self.FUZZY_THRESHOLD:
+                fuzzy.append((similarity, scores[playlist], playlist))
+        results.extend(playlist for _, _, playlist in heapq.nlargest(limit - len(results), fuzzy))
+        return results
@@ -1,40 +1,110 @@
 # -*- coding: utf-8 -*-
+from collections import deque
+from itertools import islice
 import logging
 
+from Track import Track
+
 logger = logging.getLogger('PlayAudio')
 
 
 class Queue:
     """Queue Class
     Note: This Class is used to manage Queue
+
+    Args:
+        fair (bool): Enable fair per-requester round-robin scheduling
+
+    Attributes:
+        queue (list): FIFO Queue of Tracks (used when fair scheduling is disabled)
+        now_playing (str): Now Playing URL
+        fair (bool): Fair scheduling enabled
+        requester_queues (dict): Per-requester sub-queues (fair scheduling)
+        rotation (deque): Requester ids in play order, head plays next (fair scheduling)
+        weights (dict): Number of consecutive tracks per turn for each requester
     """
-    def __init__(self):
+    def __init__(self, fair: bool = False):
         """Initialize Queue Class"""
         self.logger = logger
         self.logger.debug('📋 Queue クラスが初期化されました')
         self.queue = []
         self.now_playing = None
 
-    def add_queue(self, urls: list, interrupt: bool) -> list:
+        # Fair Scheduling
+        self.fair = fair
+        self.requester_queues = {}
+        self.rotation = deque()
+        self.weights = {}
+        self._credits = 0
+        self._fair_length = 0
+
+    def __len__(self) -> int:
+        if self.fair:
+            return self._fair_length
+        return len(self.queue)
+
+    def set_fair(self, fair: bool) -> None:
+        """Set Fair Scheduling
+        Note: This Function is used to switch between FIFO and fair scheduling.
+              Queued URLs are kept in their current effective order.
+
+        Args:
+            fair (bool): Enable fair scheduling
+        """
+        if fair == self.fair:
+            return
+        if fair:
+            tracks = self.queue
+            self.queue = []
+            self.fair = True
+            if tracks:
+                self._add_fair(tracks, interrupt=False, requester=None)
+        else:
+            tracks = list(self._iter_fair())
+            self._clear_fair()
+            self.fair = False
+            self.queue = tracks
+        self.logger.info(f'⚖️ 公平スケジューリング: {fair}, 現在のキュー長: {len(self)}曲')
+
+    def set_weight(self, requester: int, weight: int) -> None:
+        """Set Requester Weight
+        Note: A requester with weight N plays N tracks per turn in fair scheduling
+
+        Args:
+            requester (int): Requester ID
+            weight (int): Weight (1 or more)
+        """
+        self.weights[requester] = max(1, int(weight))
+        if self.rotation and self.rotation[0] == requester:
+            self._credits = self.weights[requester]
+
+    def add_queue(self, urls: list, interrupt: bool, requester: int = None) -> list:
         """Add Queue
         Note: This Function is used to add Queue
 
         Args:
-            urls (list): List of URLs
+            urls (list): List of URLs or Tracks
+            interrupt (bool): Add URLs to the front of the queue
+            requester (int): Requester ID (used by fair scheduling)
 
         Returns:
-            list: List of URLs
+            list: List of queued Tracks in play order (the same in FIFO and fair scheduling)
 
         """
-        if interrupt:
+        tracks = [Track.from_url(url) if isinstance(url, str) else url for url in urls]
+        if self.fair:
+            self._add_fair(tracks, interrupt, requester)
+        elif interrupt:
             tmp = self.queue.copy()
             self.queue.clear()
-            self.queue.extend(list(urls))
+            self.queue.extend(tracks)
             self.queue.extend(tmp)
         else:
-            self.queue.extend(list(urls))
-        self.logger.info(f'📋 キューに追加完了 - 割り込み: {interrupt}, 現在のキュー長: {len(self.queue)}曲')
-        return self.queue
+            self.queue.extend(tracks)
+        self.logger.info(f'📋 キューに追加完了 - 割り込み: {interrupt}, 現在のキュー長: {len(self)}曲')
+        if self.fair:
+            return list(self._iter_fair())
+        return list(self.queue)
 
     def clear_queue(self) -> list:
         """Clear Queue
@@ -44,6 +114,7 @@ class Queue:
             list: List of URLs
         """
         self.queue = []
+        self._clear_fair()
         self.logger.info('🗑️ キューをクリアしました')
         return self.queue
 
@@ -55,22 +126,45 @@ class Queue:
             index (int): Index of Queue
 
         """
-        if index < len(self.queue):
-            self.queue = self.queue[index:]
-            self.logger.info(f'⏭️ キューを{index}曲スキップしました - 残りキュー長: {len(self.queue)}曲')
+        if index < len(self):
+            if self.fair:
+                for _ in range(index):
+                    self._pop_fair()
+            else:
+                self.queue = self.queue[index:]
+            self.logger.info(f'⏭️ キューを{index}曲スキップしました - 残りキュー長: {len(self)}曲')
         else:
             self.queue.clear()
+            self._clear_fair()
             self.logger.info('⏭️ キューを全てスキップしました（キューが空になりました）')
 
     def get_queue(self) -> list:
         """Get Queue
-        Note: This Function is used to get Queue
+        Note: This Function is used to get Queue.
+              In fair scheduling the effective play order is built on each call,
+              use peek_queue when only the head of the queue is needed.
 
         Returns:
             list: List of URLs
         """
-        self.logger.debug(f'📋 キュー情報取得 - 現在のキュー長: {len(self.queue)}曲')
-        return self.queue
+        self.logger.debug(f'📋 キュー情報取得 - 現在のキュー長: {len(self)}曲')
+        if self.fair:
+            return [track.url for track in self._iter_fair()]
+        return [track.url for track in self.queue]
+
+    def peek_queue(self, count: int) -> list:
+        """Peek Queue
+        Note: This Function is used to get the next URLs in play order without removing them
+
+        Args:
+            count (int): Number of URLs
+
+        Returns:
+            list: List of URLs
+        """
+        if self.fair:
+            return [track.url for track in islice(self._iter_fair(), count)]
+        return [track.url for track in self.queue[:count]]
 
     def pop_queue(self) -> str:
         """Pop Queue
@@ -79,8 +173,75 @@ class Queue:
         Returns:
             str: URL
         """
-        url = self.queue.pop(0)
+        if self.fair:
+            url = self._pop_fair().url
+        else:
+            url = self.queue.pop(0).url
         self.now_playing = url
-        self.logger.info(f'🎵 キューから次の曲を取得しました - 残りキュー長: {len(self.queue)}曲')
+        self.logger.info(f'🎵 キューから次の曲を取得しました - 残りキュー長: {len(self)}曲')
         self.logger.debug(f'▶️ 再生開始: {url}')
         return url
+
+    def _add_fair(self, tracks: list, interrupt: bool, requester: int) -> None:
+        """Add Tracks to the requester's sub-queue
+        Note: Interrupt only moves Tracks to the front of the requester's own sub-queue
+        """
+        sub_queue = self.requester_queues.get(requester)
+        if sub_queue is None:
+            sub_queue = self.requester_queues[requester] = deque()
+            self.rotation.append(requester)
+            if len(self.rotation) == 1:
+                self._credits = self.weights.get(requester, 1)
+        if interrupt:
+            sub_queue.extendleft(reversed(tracks))
+        else:
+            sub_queue.extend(tracks)
+        self._fair_length += len(tracks)
+
+        # Drop requester who added nothing
+        if not sub_queue:
+            del self.requester_queues[requester]
+            self.rotation.pop()
+            if not self.rotation:
+                self._credits = 0
+
+    def _pop_fair(self) -> Track:
+        """Pop the next Track in fair order, O(1) in the number of requesters"""
+        requester = self.rotation[0]
+        sub_queue = self.requester_queues[requester]
+        track = sub_queue.popleft()
+        self._fair_length -= 1
+        self._credits -= 1
+        if not sub_queue:
+            del self.requester_queues[requester]
+            self.rotation.popleft()
+            self._credits = self.weights.get(self.rotation[0], 1) if self.rotation else 0
+        elif self._credits <= 0:
+            self.rotation.rotate(-1)
+            self._credits = self.weights.get(self.rotation[0], 1)
+        return track
+
+    def _iter_fair(self):
+        """Iterate Tracks in effective fair order without modifying the queue"""
+        rotation = deque(self.rotation)
+        iterators = {requester: iter(self.requester_queues[requester]) for requester in rotation}
+        remaining = {requester: len(self.requester_queues[requester]) for requester in rotation}
+        credits = self._credits
+        while rotation:
+            requester = rotation[0]
+            yield next(iterators[requester])
+            remaining[requester] -= 1
+            credits -= 1
+            if remaining[requester] == 0:
+                rotation.popleft()
+                credits = self.weights.get(rotation[0], 1) if rotation else 0
+            elif credits <= 0:
+                rotation.rotate(-1)
+                credits = self.weights.get(rotation[0], 1)
+
+    def _clear_fair(self) -> None:
+        """Clear fair scheduling sub-queues"""
+        self.requester_queues.clear()
+        self.rotation.clear()
+        self._credits = 0
+        self._fair_length = 0
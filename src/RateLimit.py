@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('PlayAudio')
+
+
+class TokenBucket:
+    """Token Bucket Class
+    Note: This Class is used to share a request budget between concurrent tasks.
+          Tokens refill at rate per second up to capacity, acquire waits until one is available.
+
+    Args:
+        rate (float): Tokens per second
+        capacity (int): Max tokens (burst size)
+    """
+    def __init__(self, rate: float, capacity: int = 1):
+        """Initialize TokenBucket Class"""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available without waiting"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1) -> float:
+        """Seconds until tokens are available"""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them (FIFO between waiters)"""
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.delay(tokens))
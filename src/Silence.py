@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import discord
+from discord.opus import Encoder as OpusEncoder
+import numpy as np
+
+logger = logging.getLogger('PlayAudio')
+
+# Seconds of audio in one frame
+FRAME_SECONDS = OpusEncoder.FRAME_LENGTH / 1000.0
+
+
+class SilenceAnalyzer(discord.AudioSource):
+    """Silence Analyzer Class
+    Note: This Class is used to record the loudness envelope of a track while it is played.
+          It wraps the decoded PCM and stores the mean square of every 20 ms frame in a
+          preallocated array; once the track has been played to the end, bounds() finds where
+          the non-silent content starts and ends with vectorized thresholding of the envelope.
+          It must wrap the PCM before any volume change so the envelope is the track's own.
+
+    Args:
+        original (discord.AudioSource): PCM source starting at the beginning of the track
+        duration (float): Track length in seconds
+    """
+    # Frames below this level (dBFS RMS) are silent
+    THRESHOLD_DB = -50.0
+    # Audio kept before the first and after the last non-silent frame (seconds)
+    LEAD_IN = 0.2
+    LEAD_OUT = 0.5
+    # Trims shorter than this are not worth applying (seconds)
+    MIN_TRIM = 0.5
+
+    def __init__(self, original: discord.AudioSource, duration: float):
+        """Initialize SilenceAnalyzer Class"""
+        self.original = original
+        self.duration = duration
+        # Room for a slightly longer decode than the reported duration
+        self.levels = np.zeros(int(duration / FRAME_SECONDS) + 250, dtype=np.float32)
+        self.frames = 0
+        self._frame = np.empty(OpusEncoder.SAMPLES_PER_FRAME * OpusEncoder.CHANNELS, dtype=np.float32)
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        if len(data) == OpusEncoder.FRAME_SIZE and self.frames < len(self.levels):
+            frame = self._frame
+            np.copyto(frame, np.frombuffer(data, dtype=np.int16), casting='unsafe')
+            self.levels[self.frames] = np.dot(frame, frame) / frame.size
+            self.frames += 1
+        return data
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def bounds(self) -> tuple:
+        """Find the non-silent part of the recorded envelope
+
+        Returns:
+            tuple: (start, end) in seconds, end is None if the track runs to the end
+        """
+        levels = self.levels[:self.frames]
+        with np.errstate(divide='ignore'):
+            db = 10 * np.log10(levels / (32768.0 ** 2))
+        loud = np.flatnonzero(db > self.THRESHOLD_DB)
+        if loud.size == 0:
+            # Silent all the way through, leave it alone
+            return 0.0, None
+        start = max(0.0, float(loud[0]) * FRAME_SECONDS - self.LEAD_IN)
+        end = min(self.frames * FRAME_SECONDS, float(loud[-1] + 1) * FRAME_SECONDS + self.LEAD_OUT)
+        if start < self.MIN_TRIM:
+            start = 0.0
+        if self.frames * FRAME_SECONDS - end < self.MIN_TRIM:
+            end = None
+        return round(start, 2), None if end is None else round(end, 2)
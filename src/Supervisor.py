@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import deque
+import logging
+import os
+import subprocess
+import threading
+import time
+import weakref
+
+import discord
+
+logger = logging.getLogger('PlayAudio')
+
+
+class ProcessInfo:
+    """FFmpeg process tracked by FFmpegSupervisor"""
+    __slots__ = ('process', 'owner', 'guild_id', 'label', 'started', 'cpu_seconds', 'cpu_percent',
+                 'rss', 'bytes_read', '_sampled_at')
+
+    def __init__(self, process: subprocess.Popen, owner, guild_id: int, label: str):
+        self.process = process
+        self.owner = weakref.ref(owner) if owner is not None else None
+        self.guild_id = guild_id
+        self.label = label
+        self.started = time.time()
+        self.cpu_seconds = 0.0
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.bytes_read = 0
+        self._sampled_at = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def orphaned(self) -> bool:
+        """The source that owns the process was cleaned up or collected"""
+        if self.owner is None:
+            return False
+        owner = self.owner()
+        return owner is None or getattr(owner, '_process', None) is not self.process
+
+
+class SupervisedSource(discord.AudioSource):
+    """Supervised Source Class
+    Note: This Class is used to take the final reading of an FFmpeg process right before the
+          source kills it, so the bytes it pulled are counted up to the end.
+
+    Args:
+        original (discord.FFmpegAudio): Source that spawned FFmpeg
+        supervisor (FFmpegSupervisor): Supervisor tracking the process
+    """
+    def __init__(self, original: discord.AudioSource, supervisor: 'FFmpegSupervisor'):
+        """Initialize SupervisedSource Class"""
+        self.original = original
+        self.supervisor = supervisor
+
+    def read(self) -> bytes:
+        return self.original.read()
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.supervisor.finish(self.original)
+        self.original.cleanup()
+
+
+class FFmpegSupervisor:
+    """FFmpeg Supervisor Class
+    Note: This Class is used to account for every FFmpeg process started for playback.
+          Each process is tracked per guild with its PID, start time, CPU time and RSS read from
+          /proc. A process whose source was already cleaned up but is still running is orphaned
+          and killed, as is a process over the memory or CPU limit (playback then resumes it).
+          FFmpeg children this class did not start (e.g. yt-dlp post-processing) are only reported.
+          The bytes each process read (rchar, i.e. what it pulled from the network) are logged
+          when its source is cleaned up. CPU usage is only measured over at least half an interval,
+          since CPU time is counted in 10 ms ticks and a shorter window overstates it.
+
+    Args:
+        max_rss_mb (int): Kill a process above this resident memory (MB)
+        max_cpu_percent (float): Kill a process above this CPU usage for a whole interval
+        interval (float): Seconds between samples
+    """
+    # Samples between metrics log lines
+    LOG_EVERY = 30
+    # Finished processes listed by stats()
+    RECENT = 10
+
+    def __init__(self, max_rss_mb: int = 512, max_cpu_percent: float = 150.0, interval: float = 10.0):
+        """Initialize FFmpegSupervisor Class"""
+        self.logger = logger
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_cpu_percent = max_cpu_percent
+        self.interval = interval
+        self.processes = {}
+        self._lock = threading.Lock()
+        # Serializes sample() between the periodic task and other callers
+        self._sample_lock = threading.Lock()
+        self.killed = {'orphaned': 0, 'rss': 0, 'cpu': 0, 'reset': 0}
+        self.exited = 0
+        self.bytes_received = 0
+        self.recent = deque(maxlen=self.RECENT)
+        self._task = None
+        self._samples = 0
+        try:
+            self._clock_ticks = os.sysconf('SC_CLK_TCK')
+            self._page_size = os.sysconf('SC_PAGE_SIZE')
+        except (AttributeError, ValueError, OSError):
+            self._clock_ticks = None
+            self._page_size = None
+
+    def track(self, source, guild_id: int = None, label: str = None) -> discord.AudioSource:
+        """Track the FFmpeg process of an FFmpegAudio source
+
+        Args:
+            source (discord.FFmpegAudio): Source that just spawned FFmpeg
+            guild_id (int): Guild the process plays for
+            label (str): Track URL
+
+        Returns:
+            discord.AudioSource: Source to play instead (source itself if it has no process)
+        """
+        process = getattr(source, '_process', None)
+        if not isinstance(process, subprocess.Popen):
+            return source
+        with self._lock:
+            self.processes[process.pid] = ProcessInfo(process, source, guild_id, label)
+        self.logger.debug(f'🛠️ FFmpegプロセスを登録しました: pid={process.pid}')
+        return SupervisedSource(source, self)
+
+    def finish(self, source):
+        """Record the bytes read by the process of a source that is about to be cleaned up"""
+        process = getattr(source, '_process', None)
+        if not isinstance(process, subprocess.Popen):
+            return
+        with self._lock:
+            info = self.processes.get(process.pid)
+        if info is None or info.process is not process:
+            return
+        usage = self._read_proc(info.pid)
+        if usage is not None:
+            info.bytes_read = usage[2]
+        seconds = time.time() - info.started
+        with self._lock:
+            # The source kills and reaps the process right after this
+            if self.processes.pop(info.pid, None) is not info:
+                # Already counted by sample() or killed
+                return
+            self.exited += 1
+            self.bytes_received += info.bytes_read
+            self.recent.append((info.label, info.bytes_read, seconds))
+        self.logger.info(f'📥 FFmpegの受信量: {info.bytes_read / 1024 / 1024:.1f}MB '
+                         f'({seconds:.0f}秒, pid={info.pid}) {info.label}')
+
+    def start(self):
+        """Start sampling on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop sampling and kill every tracked process"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.kill_all()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                self.logger.warning(f'⚠️ FFmpegプロセスの監視でエラーが発生しました: {e}')
+
+    def _read_proc(self, pid: int):
+        """Return (cpu_seconds, rss_bytes, bytes_read) from /proc (None if unavailable)"""
+        if self._clock_ticks is None:
+            return None
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                # The command name may contain spaces, fields start after its closing parenthesis
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{pid}/statm') as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return None
+        bytes_read = 0
+        try:
+            with open(f'/proc/{pid}/io') as f:
+                for line in f:
+                    if line.startswith('rchar:'):
+                        bytes_read = int(line.split()[1])
+                        break
+        except (OSError, IndexError, ValueError):
+            pass
+        utime, stime = int(fields[11]), int(fields[12])
+        return (utime + stime) / self._clock_ticks, resident_pages * self._page_size, bytes_read
+
+    def sample(self):
+        """Reap exited processes, refresh usage and enforce the limits"""
+        with self._sample_lock:
+            self._sample()
+
+    def _sample(self):
+        now = time.monotonic()
+        with self._lock:
+            tracked = list(self.processes.items())
+        for pid, info in tracked:
+            if info.process.poll() is not None:
+                # poll() also reaps the zombie
+                with self._lock:
+                    if self.processes.pop(pid, None) is info:
+                        self.exited += 1
+                continue
+            if info.orphaned:
+                self._kill(info, 'orphaned')
+                continue
+            usage = self._read_proc(pid)
+            if usage is None:
+                continue
+            cpu_seconds, info.rss, info.bytes_read = usage
+            if info._sampled_at is None:
+                info.cpu_seconds = cpu_seconds
+                info._sampled_at = now
+            elif now - info._sampled_at >= self.interval / 2:
+                info.cpu_percent = (cpu_seconds - info.cpu_seconds) / (now - info._sampled_at) * 100
+                info.cpu_seconds = cpu_seconds
+                info._sampled_at = now
+            if info.rss > self.max_rss:
+                self._kill(info, 'rss')
+            elif info.cpu_percent > self.max_cpu_percent:
+                self._kill(info, 'cpu')
+
+        self._samples += 1
+        if self._samples % self.LOG_EVERY == 0:
+            stats = self.stats()
+            self.logger.info(
+                f'📊 FFmpeg: {stats["running"]}プロセス, CPU {stats["cpu_percent"]:.0f}%, '
+                f'RSS {stats["rss"] / 1024 / 1024:.0f}MB, 受信{stats["bytes_received"] / 1024 / 1024:.0f}MB, '
+                f'終了{stats["exited"]}, 強制終了{stats["killed"]}, '
+                f'未管理{len(stats["untracked"])}'
+            )
+
+    def _kill(self, info: ProcessInfo, reason: str):
+        labels = {'orphaned': '孤立', 'rss': 'メモリ上限超過', 'cpu': 'CPU上限超過', 'reset': 'リセット'}
+        self.logger.warning(f'🛠️ FFmpegプロセスを強制終了します ({labels[reason]}): pid={info.pid}, '
+                            f'RSS={info.rss / 1024 / 1024:.0f}MB, CPU={info.cpu_percent:.0f}%, {info.label}')
+        try:
+            info.process.kill()
+            info.process.wait(timeout=5)
+        except Exception as e:
+            self.logger.warning(f'⚠️ FFmpegプロセスの強制終了に失敗しました: pid={info.pid} {e}')
+        with self._lock:
+            if self.processes.pop(info.pid, None) is info:
+                self.killed[reason] += 1
+
+    def kill_all(self, guild_id: int = None):
+        """Kill every tracked process (of one guild if given)"""
+        with self._lock:
+            tracked = list(self.processes.values())
+        for info in tracked:
+            if guild_id is None or info.guild_id == guild_id:
+                if info.process.poll() is None:
+                    self._kill(info, 'reset')
+                else:
+                    with self._lock:
+                        self.processes.pop(info.pid, None)
+
+    def untracked(self) -> list:
+        """Return PIDs of FFmpeg children of this process that are not tracked"""
+        pids = []
+        if self._clock_ticks is None:
+            return pids
+        parent = os.getpid()
+        with self._lock:
+            tracked = set(self.processes)
+        try:
+            entries = os.listdir('/proc')
+        except OSError:
+            return pids
+        for entry in entries:
+            if not entry.isdigit() or int(entry) in tracked:
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    head, rest = f.read().rsplit(')', 1)
+            except (OSError, ValueError):
+                continue
+            if head.split('(', 1)[-1] == 'ffmpeg' and int(rest.split()[1]) == parent:
+                pids.append(int(entry))
+        return pids
+
+    def stats(self) -> dict:
+        """Return the current numbers
+
+        Returns:
+            dict: {'running': int, 'cpu_percent': float, 'rss': int, 'exited': int, 'killed': int,
+                   'killed_by': dict, 'untracked': list, 'processes': [ProcessInfo],
+                   'bytes_received': int, 'recent': [(label, bytes_read, seconds)]}
+        """
+        with self._lock:
+            processes = sorted(self.processes.values(), key=lambda info: info.started)
+            recent = list(self.recent)
+        return {
+            'running': len(processes),
+            'cpu_percent': sum(info.cpu_percent for info in processes),
+            'rss': sum(info.rss for info in processes),
+            'exited': self.exited,
+            'killed': sum(self.killed.values()),
+            'killed_by': dict(self.killed),
+            'untracked': self.untracked(),
+            'processes': processes,
+            'bytes_received': self.bytes_received,
+            'recent': recent
+        }
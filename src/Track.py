@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from enum import IntEnum
+import logging
+import re
+import threading
+from urllib.parse import urlparse, parse_qs
+import weakref
+
+logger = logging.getLogger('PlayAudio')
+
+# NicoNico Video ID Format
+NICO_VIDEO_ID = re.compile(r'(?:sm|nm|so)\d+')
+# Canonical URL Prefixes
+YOUTUBE_WATCH_PREFIX = 'https://www.youtube.com/watch?v='
+NICO_WATCH_PREFIX = 'https://www.nicovideo.jp/watch/'
+
+
+class Site(IntEnum):
+    """Site Enum
+    Note: Site of the Track
+    """
+    OTHER = 0
+    YOUTUBE = 1
+    NICONICO = 2
+    TWITTER = 3
+    SOUNDCLOUD = 4
+
+
+class Track:
+    """Track Class
+    Note: This Class is used to hold a compact, interned reference to a video.
+          Tracks are interned per site by video_id, so the same video queued or stored
+          many times shares one object and one id string. The intern table only holds weak
+          references, so a Track is freed once no queue, playlist or cache refers to it.
+          Sites without a stable video id keep the full URL as video_id.
+          Each distinct video costs about 2.5 times its URL string (the Track, the id and the weak
+          table entry), so the saving comes from repeats; see bench/bench_track_memory.py.
+
+    Attributes:
+        site (Site): Site
+        video_id (str): Video ID (full URL for Site.OTHER, TWITTER and SOUNDCLOUD)
+    """
+    __slots__ = ('site', 'video_id', '__weakref__')
+
+    # Intern Table: {Site: WeakValueDictionary(video_id: Track)}
+    _interned = {site: weakref.WeakValueDictionary() for site in Site}
+    _intern_lock = threading.Lock()
+
+    def __init__(self, site: Site, video_id: str):
+        """Initialize Track Class
+        Note: Use Track.get or Track.from_url to obtain interned Tracks
+        """
+        self.site = site
+        self.video_id = video_id
+
+    @classmethod
+    def get(cls, site: Site, video_id: str) -> 'Track':
+        """Get Interned Track
+
+        Args:
+            site (Site): Site
+            video_id (str): Video ID
+
+        Returns:
+            Track: Interned Track
+        """
+        table = cls._interned[site]
+        track = table.get(video_id)
+        if track is None:
+            # The lock keeps interning consistent when called from worker threads
+            with cls._intern_lock:
+                track = table.get(video_id)
+                if track is None:
+                    # The table key and the Track share the id string
+                    track = table[video_id] = cls(site, video_id)
+        return track
+
+    @classmethod
+    def from_url(cls, url: str) -> 'Track':
+        """Get Interned Track from URL
+
+        Args:
+            url (str): URL
+
+        Returns:
+            Track: Interned Track
+        """
+        site, video_id = cls.parse_url(url)
+        return cls.get(site, video_id)
+
+    @staticmethod
+    def parse_url(url: str) -> tuple:
+        """Parse URL to (Site, Video ID)
+
+        Args:
+            url (str): URL
+
+        Returns:
+            tuple: (Site, Video ID)
+        """
+        # Fast path for canonical URLs produced by Utils.check_url
+        if url.startswith(YOUTUBE_WATCH_PREFIX) and '&' not in url:
+            return Site.YOUTUBE, url[len(YOUTUBE_WATCH_PREFIX):]
+        if url.startswith(NICO_WATCH_PREFIX) and '?' not in url:
+            return Site.NICONICO, url[len(NICO_WATCH_PREFIX):]
+
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        if 'youtu' in host:
+            if 'youtu.be' in host:
+                video_id = parsed.path[1:]
+            else:
+                video_id = parse_qs(parsed.query).get('v', [None])[0]
+                if video_id is None and parsed.path.startswith(('/live/', '/shorts/')):
+                    video_id = parsed.path.split('/')[2]
+            if video_id:
+                return Site.YOUTUBE, video_id
+        elif 'nico' in host:
+            match = NICO_VIDEO_ID.search(parsed.path)
+            if match:
+                return Site.NICONICO, match.group(0)
+        elif 'twitter' in host or host in ('x.com', 'www.x.com'):
+            return Site.TWITTER, url
+        elif 'soundcloud' in host:
+            return Site.SOUNDCLOUD, url
+        return Site.OTHER, url
+
+    @property
+    def url(self) -> str:
+        """Canonical URL"""
+        if self.site == Site.YOUTUBE:
+            return YOUTUBE_WATCH_PREFIX + self.video_id
+        if self.site == Site.NICONICO:
+            return NICO_WATCH_PREFIX + self.video_id
+        return self.video_id
+
+    @property
+    def key(self) -> tuple:
+        """Hashable Key (site, video_id)"""
+        return (self.site, self.video_id)
+
+    def __repr__(self) -> str:
+        return f'Track({self.site.name}, {self.video_id!r})'
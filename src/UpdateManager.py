@@ -22,6 +22,8 @@ class UpdateManager:
         """UpdateManager初期化"""
         self.logger = logger
         self.logger.debug('🔧 UpdateManager クラスが初期化されました')
+        # 再起動前に実行する処理（保留中の書き込みの反映など）
+        self.shutdown_hooks = []
     
     def get_current_version(self, package_name: str) -> Optional[str]:
         """現在インストールされているパッケージのバージョンを取得
@@ -168,6 +170,11 @@ class UpdateManager:
         現在のプロセスを終了し、新しいプロセスを開始
         """
         self.logger.info('🔄 Bot再起動を実行します...')
+        for hook in self.shutdown_hooks:
+            try:
+                hook()
+            except Exception as e:
+                self.logger.error(f'❌ 再起動前処理でエラーが発生しました: {e}')
         try:
             # 現在のプロセスを新しいプロセスで置き換え
             python = sys.executable
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger('PlayAudio')
+
+
+class Ranking:
+    """Ranking Class
+    Note: This Class keeps keys sorted by count (descending) while counts only grow by one.
+          An increment swaps the key with the first key of the same count, so it is O(1),
+          and top(k) is a slice of the sorted list, so it is O(k).
+
+    Attributes:
+        counts (dict): Count {key: int}
+    """
+    def __init__(self, counts: dict = None):
+        """Initialize Ranking Class"""
+        self.build(counts or {})
+
+    def build(self, counts: dict):
+        """Build Ranking from {key: count}"""
+        self.counts = dict(counts)
+        self._order = sorted(self.counts, key=self.counts.__getitem__, reverse=True)
+        self._position = {key: i for i, key in enumerate(self._order)}
+        # First position of each count in _order
+        self._start = {}
+        for i in range(len(self._order) - 1, -1, -1):
+            self._start[self.counts[self._order[i]]] = i
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, key) -> bool:
+        return key in self.counts
+
+    def add(self, key, count: int = 0):
+        """Add Key (rebuilds if count is not the lowest, which only happens on import)"""
+        if key in self.counts:
+            return
+        if self._order and count > self.counts[self._order[-1]]:
+            self.counts[key] = count
+            self.build(self.counts)
+            return
+        self.counts[key] = count
+        self._position[key] = len(self._order)
+        self._order.append(key)
+        self._start.setdefault(count, self._position[key])
+
+    def increment(self, key):
+        """Increment the count of key by one (adds key if missing)"""
+        if key not in self.counts:
+            self.add(key)
+        count = self.counts[key]
+        i = self._position[key]
+        j = self._start[count]
+        if i != j:
+            other = self._order[j]
+            self._order[i], self._order[j] = other, key
+            self._position[other], self._position[key] = i, j
+        if j + 1 < len(self._order) and self.counts[self._order[j + 1]] == count:
+            self._start[count] = j + 1
+        else:
+            del self._start[count]
+        self.counts[key] = count + 1
+        self._start.setdefault(count + 1, j)
+
+    def remove(self, key):
+        """Remove Key (O(n))"""
+        if key not in self.counts:
+            return
+        del self.counts[key]
+        self.build(self.counts)
+
+    def rename(self, old_key, new_key):
+        """Rename Key in place (O(1))"""
+        if old_key not in self.counts or new_key in self.counts:
+            return
+        i = self._position.pop(old_key)
+        self._order[i] = new_key
+        self._position[new_key] = i
+        self.counts[new_key] = self.counts.pop(old_key)
+
+    def top(self, k: int) -> list:
+        """Top k keys with a count above zero"""
+        result = self._order[:k]
+        while result and self.counts[result[-1]] == 0:
+            result.pop()
+        return result
+
+
+class UsageStats:
+    """Usage Stats Class
+    Note: This Class keeps playlist play counts, last played epochs and per-track plays in memory.
+          Each play updates the rankings incrementally, so most_used, recently_used and top_tracks are O(k).
+          Changes are collected in dirty sets for the caller to save.
+
+    Attributes:
+        playlists (Ranking): Playlist Play Count Ranking
+        recent (OrderedDict): Last Played Epoch {playlist_name: float}, oldest first
+        tracks (Ranking): Track Play Count Ranking {track_key: int}
+        dirty_playlists (set): Playlists changed since the last save
+        dirty_tracks (set): Tracks changed since the last save
+    """
+    def __init__(self):
+        """Initialize UsageStats Class"""
+        self.logger = logger
+        self.playlists = Ranking()
+        self.recent = OrderedDict()
+        self.tracks = Ranking()
+        self.track_last_played = {}
+        self.dirty_playlists = set()
+        self.dirty_tracks = set()
+
+    def build(self, playlists: dict, tracks: dict = None):
+        """Build Stats
+
+        Args:
+            playlists (dict): {playlist_name: (play_count, last_played epoch or None)}
+            tracks (dict): {track_key: (plays, last_played epoch or None)}
+        """
+        self.playlists.build({name: count for name, (count, _) in playlists.items()})
+        self.recent = OrderedDict(sorted(
+            ((name, played) for name, (_, played) in playlists.items() if played is not None),
+            key=lambda item: item[1]))
+        tracks = tracks or {}
+        self.tracks.build({key: plays for key, (plays, _) in tracks.items()})
+        self.track_last_played = {key: played for key, (_, played) in tracks.items() if played is not None}
+        self.logger.debug(f'📊 利用統計を読み込みました - プレイリスト{len(self.playlists)}個, 曲{len(self.tracks)}曲')
+
+    def touch_playlist(self, playlist: str, timestamp: float):
+        """Update last played without counting a play (create, edit)"""
+        if playlist not in self.playlists:
+            self.playlists.add(playlist)
+        if timestamp >= self.recent.get(playlist, timestamp):
+            self.recent[playlist] = timestamp
+            self.recent.move_to_end(playlist)
+        self.dirty_playlists.add(playlist)
+
+    def record_playlist(self, playlist: str, timestamp: float):
+        """Record a playlist play"""
+        self.touch_playlist(playlist, timestamp)
+        self.playlists.increment(playlist)
+
+    def record_track(self, key: tuple, timestamp: float):
+        """Record a track play"""
+        self.tracks.increment(key)
+        self.track_last_played[key] = timestamp
+        self.dirty_tracks.add(key)
+
+    def add_playlist(self, playlist: str):
+        self.playlists.add(playlist)
+
+    def remove_playlist(self, playlist: str):
+        self.playlists.remove(playlist)
+        self.recent.pop(playlist, None)
+        self.dirty_playlists.discard(playlist)
+
+    def rename_playlist(self, old_playlist: str, new_playlist: str):
+        self.playlists.rename(old_playlist, new_playlist)
+        if old_playlist in self.recent:
+            # Keep the recency order: rebuild around the renamed key
+            self.recent = OrderedDict(
+                (new_playlist if name == old_playlist else name, played) for name, played in self.recent.items())
+        if old_playlist in self.dirty_playlists:
+            self.dirty_playlists.discard(old_playlist)
+            self.dirty_playlists.add(new_playlist)
+
+    def play_count(self, playlist: str) -> int:
+        return self.playlists.counts.get(playlist, 0)
+
+    def last_played(self, playlist: str):
+        return self.recent.get(playlist)
+
+    def most_used(self, k: int = 25) -> list:
+        """Playlists by play count (O(k))"""
+        return self.playlists.top(k)
+
+    def recently_used(self, k: int = 25) -> list:
+        """Playlists by last played, newest first (O(k))"""
+        result = []
+        for playlist in reversed(self.recent):
+            if len(result) >= k:
+                break
+            result.append(playlist)
+        return result
+
+    def top_tracks(self, k: int = 10) -> list:
+        """Tracks by play count (O(k))
+
+        Returns:
+            list: [(track_key, plays)]
+        """
+        return [(key, self.tracks.counts[key]) for key in self.tracks.top(k)]
+
+    def take_dirty(self) -> tuple:
+        """Take and clear the dirty sets
+
+        Returns:
+            tuple: ({playlist_name: (play_count, last_played)}, {track_key: (plays, last_played)})
+        """
+        playlists = {name: (self.play_count(name), self.recent.get(name)) for name in self.dirty_playlists}
+        tracks = {key: (self.tracks.counts[key], self.track_last_played.get(key)) for key in self.dirty_tracks}
+        self.dirty_playlists = set()
+        self.dirty_tracks = set()
+        return playlists, tracks
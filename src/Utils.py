@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import asyncio
 from functools import lru_cache
 import json
 import logging
@@ -18,11 +19,25 @@ class Utils:
     """Utils Class
     Note: This Class is used to manage Utilities
     """
+    # Markers on the YouTube watch page (Japanese and English)
+    PREMIUM_MARKERS = ('この動画を視聴できるのは、Music Premium のメンバーのみです', 'Music Premium members')
+    REGION_MARKERS = ('お住まいの国では', 'not available in your country', 'The uploader has not made this video available')
+    # URLs per page of the queue embed
+    PAGE_SIZE = 10
+    # Concurrent title requests
+    TITLE_CONCURRENCY = 5
+
     def __init__(self):
         """Initialize Utils Class"""
         self.logger = logger
         self.logger.debug('🔧 Utils クラスが初期化されました')
 
+        # Persistent title cache (Playlist, set by main), consulted before fetching titles
+        self.title_store = None
+        # Outbound Messenger (set by main), channel.send is used directly if None
+        self.messenger = None
+        self._title_semaphore = asyncio.Semaphore(self.TITLE_CONCURRENCY)
+
         # Regular Expression
         # Supported Websites
         self.SUPPORTED_WEBSITES = \
@@ -151,6 +166,41 @@ class Utils:
             logger.warning(f'⚠️ Music Premiumチェックでエラー: {e}')
             return False
 
+    def probe_availability(self, url: str, session: requests.Session = None) -> str:
+        """Probe Availability
+        Note: Blocking, one or two requests per URL. Used by the playlist health scan.
+
+        Args:
+            url (str): Canonical Video URL
+            session (requests.Session): Session to reuse connections
+
+        Returns:
+            str: 'ok', 'dead', 'premium', 'region' or 'unknown' (network error, try again later)
+        """
+        http = session or requests
+        try:
+            if 'youtu' in url:
+                video_id = self.get_video_id(url)
+                if http.get(f'http://img.youtube.com/vi/{video_id}/mqdefault.jpg', timeout=5).status_code != 200:
+                    return 'dead'
+                text = http.get(url, timeout=10, headers={'Accept-Language': 'ja,en'}).text
+                if any(marker in text for marker in self.PREMIUM_MARKERS):
+                    return 'premium'
+                if any(marker in text for marker in self.REGION_MARKERS):
+                    return 'region'
+                if '"playabilityStatus":{"status":"ERROR"' in text:
+                    return 'dead'
+                return 'ok'
+            if 'nico' in url:
+                res = http.get(f'https://ext.nicovideo.jp/api/getthumbinfo/{self.get_video_id(url)}', timeout=5)
+                if res.status_code != 200:
+                    return 'unknown'
+                return 'dead' if 'status="fail"' in res.text else 'ok'
+            return 'dead' if self.get_title_from_ytdlp(url) == 'Not Found Video' else 'ok'
+        except requests.RequestException as e:
+            logger.warning(f'⚠️ 可用性チェックでエラー: {url} {e}')
+            return 'unknown'
+
     @lru_cache(maxsize=500)
     def get_title_from_ytdlp(self, url: str) -> str:
         """Get Tweet Video URL
@@ -215,19 +265,249 @@ class Utils:
         """
         return [urls[i:i+size] for i in range(0, len(urls), size)]
 
+    def format_time(self, seconds: float) -> str:
+        """Format Time
+        Note: This Function is used to format seconds as m:ss or h:mm:ss
+
+        Args:
+            seconds (float): Seconds
+
+        Returns:
+            str: Formatted time
+        """
+        seconds = int(max(0, seconds))
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours:
+            return f'{hours}:{minutes:02d}:{seconds:02d}'
+        return f'{minutes}:{seconds:02d}'
+
+    def parse_time(self, text: str) -> float:
+        """Parse Time
+        Note: This Function is used to parse seconds, m:ss or h:mm:ss
+
+        Args:
+            text (str): Time text
+
+        Returns:
+            float: Seconds (None if the text is not a time)
+        """
+        parts = text.strip().split(':')
+        if not 1 <= len(parts) <= 3:
+            return None
+        try:
+            values = [float(part) for part in parts]
+        except ValueError:
+            return None
+        if any(value < 0 for value in values) or any(value >= 60 for value in values[1:]):
+            return None
+        seconds = 0.0
+        for value in values:
+            seconds = seconds * 60 + value
+        return seconds
+
+    def progress_bar(self, position: float, duration: float, width: int = 20) -> str:
+        """Progress Bar
+        Note: This Function is used to draw the position in a track
+
+        Args:
+            position (float): Played seconds
+            duration (float): Track length in seconds (None if unknown)
+            width (int): Bar length in characters
+
+        Returns:
+            str: Progress bar with times
+        """
+        if not duration:
+            return f'🔴 {self.format_time(position)}'
+        filled = min(width - 1, int(position / duration * width))
+        bar = '▬' * filled + '🔘' + '▬' * (width - filled - 1)
+        return f'{bar} {self.format_time(position)} / {self.format_time(duration)}'
+
+    def paginate_lines(self, lines: list, max_length: int) -> list:
+        """Paginate Lines
+        Note: Joins lines into pages of at most max_length characters (a longer line is cut)
+
+        Args:
+            lines (list): List of lines
+            max_length (int): Max characters per page
+
+        Returns:
+            list: List of pages
+        """
+        pages = []
+        page = []
+        length = 0
+        for line in lines:
+            line = line[:max_length]
+            if page and length + len(line) + 1 > max_length:
+                pages.append('\n'.join(page))
+                page = []
+                length = 0
+            page.append(line)
+            length += len(line) + 1
+        if page:
+            pages.append('\n'.join(page))
+        return pages
+
     def create_queue_embed(self, urls: list, title: str, footer: str = None, addPages: bool = None,
-                           getTitle: bool = True) -> discord.Embed:
-        PAGES = len(self.chunk_list(urls, 10))
-        for i in range(PAGES):
-            queue_slice = urls[i*10:(i+1)*10]
-            # Add Page Number to Title
-            if addPages:
-                title += f'{i+1}/{PAGES}'
-            # Get title from URL
-            if getTitle:
-                queue_description = '\n'.join(f'[{self.get_title_url(item)}]({item})' for item in queue_slice)
+                           getTitle: bool = True, page: int = 0, titles: dict = None) -> discord.Embed:
+        """Create Queue Embed
+        Note: Renders one page of PAGE_SIZE URLs
+
+        Args:
+            urls (list): List of URL
+            title (str): Embed Title
+            footer (str): Embed Footer
+            addPages (bool): Add page number to the title
+            getTitle (bool): Show video titles (fetched now unless given in titles)
+            page (int): Page index
+            titles (dict): Prefetched titles {url: title}
+
+        Returns:
+            discord.Embed: Embed
+        """
+        pages = max(1, -(-len(urls) // self.PAGE_SIZE))
+        queue_slice = urls[page*self.PAGE_SIZE:(page+1)*self.PAGE_SIZE]
+        # Add Page Number to Title
+        if addPages:
+            title = f'{title} {page+1}/{pages}'
+        # Get title from URL
+        if getTitle:
+            titles = titles or {}
+            queue_description = '\n'.join(
+                f'[{titles.get(item) or self.get_title_url(item)}]({item})' for item in queue_slice)
+        else:
+            queue_description = '\n'.join(f'・{item}' for item in queue_slice)
+        embed = discord.Embed(title=title, description=queue_description, color=0xffffff)
+        embed.set_footer(text=footer)
+        return embed
+
+    async def get_titles(self, urls: list) -> dict:
+        """Get Titles concurrently
+        Note: Titles are read from title_store first, the rest are fetched in threads and stored
+
+        Args:
+            urls (list): List of URL
+
+        Returns:
+            dict: {url: title}
+        """
+        titles = {}
+        missing = []
+        for url in urls:
+            info = self.title_store.get_track_info(url) if self.title_store is not None else None
+            if info and info['title']:
+                titles[url] = info['title']
             else:
-                queue_description = '\n'.join(f'・{item}' for item in queue_slice)
-            embed = discord.Embed(title=title, description=queue_description, color=0xffffff)
-            embed.set_footer(text=footer)
-            return embed
+                missing.append(url)
+
+        async def fetch(url):
+            async with self._title_semaphore:
+                title = await asyncio.to_thread(self.get_title_url, url)
+            titles[url] = title
+            if self.title_store is not None and title and title != 'Not Found Video':
+                try:
+                    self.title_store.set_track_info(url, title=title)
+                except Exception as e:
+                    self.logger.warning(f'⚠️ タイトルの保存に失敗しました: {e}')
+
+        await asyncio.gather(*(fetch(url) for url in missing))
+        return titles
+
+    async def send_paginated(self, channel, urls: list, title: str, footer: str = None, getTitle: bool = True):
+        """Send Paginated Queue
+        Note: Only the shown page is rendered, the next page is prefetched in the background
+
+        Args:
+            channel (discord.abc.Messageable): Channel
+            urls (list): List of URL
+            title (str): Embed Title
+            footer (str): Embed Footer
+            getTitle (bool): Show video titles
+
+        Returns:
+            discord.Message: Sent Message
+        """
+        urls = list(urls)
+        pages = max(1, -(-len(urls) // self.PAGE_SIZE))
+
+        def page_urls(page: int) -> list:
+            return urls[page*self.PAGE_SIZE:(page+1)*self.PAGE_SIZE]
+
+        async def render(page: int) -> discord.Embed:
+            titles = await self.get_titles(page_urls(page)) if getTitle else None
+            if getTitle and page + 1 < pages:
+                view.prefetch(self.get_titles(page_urls(page + 1)))
+            return self.create_queue_embed(urls, title, footer, addPages=pages > 1, getTitle=getTitle,
+                                           page=page, titles=titles)
+
+        view = PageView(render, pages)
+        embed = await render(0)
+        send = self.messenger.send if self.messenger is not None else \
+            (lambda target, **kwargs: target.send(**kwargs))
+        if pages == 1:
+            return await send(channel, embed=embed)
+        view.message = await send(channel, embed=embed, view=view)
+        return view.message
+
+
+class PageView(discord.ui.View):
+    """Page View Class
+    Note: Button navigation over pages rendered on demand by render(page)
+
+    Args:
+        render (callable): Coroutine function returning the discord.Embed of a page
+        pages (int): Number of pages
+        timeout (float): Seconds until the buttons are disabled
+    """
+    def __init__(self, render, pages: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.render = render
+        self.pages = pages
+        self.page = 0
+        self.message = None
+        self._prefetch = None
+        self._update_buttons()
+
+    def prefetch(self, coro):
+        """Run coro in the background (the previous prefetch is cancelled)"""
+        if self._prefetch is not None and not self._prefetch.done():
+            self._prefetch.cancel()
+        self._prefetch = asyncio.ensure_future(coro)
+
+    def _update_buttons(self):
+        self.first_page.disabled = self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= self.pages - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self._update_buttons()
+        await interaction.response.defer()
+        embed = await self.render(page)
+        await interaction.edit_original_response(embed=embed, view=self)
+
+    @discord.ui.button(label='⏮', style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.primary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, max(0, self.page - 1))
+
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, min(self.pages - 1, self.page + 1))
+
+    @discord.ui.button(label='⏭', style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.pages - 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException as e:
+                logger.debug(f'Page view timeout edit failed: {e}')
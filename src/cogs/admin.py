@@ -1,28 +1,40 @@
 # -*- coding: utf-8 -*-
 """管理コマンド関連のCog"""
 
+import asyncio
 import io
 import logging
 import os
+import time
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 import orjson
 
+from HealthScan import HealthScanner
+from Utils import PageView
+
 logger = logging.getLogger('PlayAudio')
 
 
 class AdminCog(commands.Cog):
     """管理機能を提供するCog"""
 
-    def __init__(self, bot: commands.Bot, config, queue, utils, update_manager, music_cog=None):
+    # ヘルススキャンの状態別表示
+    HEALTH_LABELS = {'dead': '削除/非公開', 'premium': 'Music Premium限定', 'region': '地域制限'}
+    # ヘルススキャン進捗メッセージの更新間隔（秒）
+    HEALTH_PROGRESS_INTERVAL = 3
+
+    def __init__(self, bot: commands.Bot, config, queue, utils, update_manager, music_cog=None, playlist=None):
         self.bot = bot
         self.config = config
         self.queue = queue
         self.utils = utils
         self.update_manager = update_manager
         self.music_cog = music_cog
+        self.playlist = playlist
+        self.health_scanner = HealthScanner(playlist, utils) if playlist is not None else None
 
     def set_music_cog(self, music_cog):
         """MusicCogへの参照を設定"""
@@ -36,30 +48,26 @@ class AdminCog(commands.Cog):
         reset_steps = []
 
         try:
-            # Step 1: バックグラウンドタスク停止
-            logger.info('Step 1: Stopping background tasks...')
-            if self.music_cog and self.music_cog.check_music.is_running():
-                self.music_cog.check_music.cancel()
-                logger.debug('check_music task stopped')
-            reset_steps.append('バックグラウンドタスク停止')
-
-            # Step 2: グローバル変数リセット
-            logger.info('Step 2: Resetting global variables...')
+            # Step 1: グローバル変数リセット（再生停止イベントで通知も止まる）
+            logger.info('Step 1: Resetting global variables...')
             if self.music_cog:
-                self.music_cog.reset_state()
+                await self.music_cog.reset_state()
+                self.music_cog.effects.reset()
 
             # INTERRUPT設定を再読み込み
             try:
                 settings = self.config.load_settings()
                 self.config._config.interrupt = settings.get('interrupt', False)
+                self.config._config.fair_queue = settings.get('fair_queue', False)
+                self.config._config.buffer_preroll_ms = settings.get('buffer_preroll_ms', 500)
                 logger.debug(f'INTERRUPT setting reloaded: {self.config._config.interrupt}')
             except Exception as e:
                 logger.warning(f'Failed to reload INTERRUPT setting: {e}')
 
             reset_steps.append('グローバル変数リセット')
 
-            # Step 3: ボイスクライアント切断
-            logger.info('Step 4: Disconnecting voice client...')
+            # Step 2: ボイスクライアント切断
+            logger.info('Step 2: Disconnecting voice client...')
             vc = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
             if vc:
                 try:
@@ -70,13 +78,16 @@ class AdminCog(commands.Cog):
                     logger.debug('Voice client disconnected and cleaned up')
                 except Exception as e:
                     logger.warning(f'Failed to disconnect voice client: {e}')
+            # 停止後も残っているFFmpegプロセスを強制終了
+            await asyncio.to_thread(self.bot.supervisor.kill_all, ctx.guild.id)
             reset_steps.append('ボイスクライアント切断')
 
-            # Step 4: クラスインスタンスリセット
-            logger.info('Step 5: Resetting class instances...')
+            # Step 3: クラスインスタンスリセット
+            logger.info('Step 3: Resetting class instances...')
             try:
                 self.queue.clear_queue()
                 self.queue.now_playing = None
+                self.queue.set_fair(self.config._config.fair_queue)
                 logger.debug('Queue instance reset')
 
                 # LRUキャッシュクリア
@@ -95,8 +106,8 @@ class AdminCog(commands.Cog):
 
             reset_steps.append('クラスインスタンスリセット')
 
-            # Step 5: Discordプレゼンスリセット
-            logger.info('Step 6: Resetting Discord presence...')
+            # Step 4: Discordプレゼンスリセット
+            logger.info('Step 4: Resetting Discord presence...')
             try:
                 await self.bot.change_presence(activity=None)
                 logger.debug('Discord presence reset')
@@ -104,16 +115,6 @@ class AdminCog(commands.Cog):
                 logger.warning(f'Failed to reset Discord presence: {e}')
             reset_steps.append('Discord プレゼンスリセット')
 
-            # Step 6: バックグラウンドタスク再開
-            logger.info('Step 7: Restarting background tasks...')
-            try:
-                if self.music_cog and not self.music_cog.check_music.is_running():
-                    self.music_cog.check_music.start()
-                    logger.debug('check_music task restarted')
-            except Exception as e:
-                logger.warning(f'Failed to restart background tasks: {e}')
-            reset_steps.append('バックグラウンドタスク再開')
-
             logger.info('=== Bot Complete Reset Completed Successfully ===')
 
             embed = discord.Embed(
@@ -163,10 +164,30 @@ class AdminCog(commands.Cog):
             await ctx.response.send_message(content=f'ログファイルの送信に失敗しました: {e}')
 
     @app_commands.command(name='settings', description='設定を変更します。')
-    async def setting(self, ctx: discord.Interaction, interrupt: bool):
+    @app_commands.describe(
+        interrupt='曲割り込み機能',
+        fair_queue='リクエストしたユーザーごとに交互に再生する',
+        buffer_preroll_ms='再生開始前に先読みする時間（ミリ秒）'
+    )
+    async def setting(
+        self,
+        ctx: discord.Interaction,
+        interrupt: bool,
+        fair_queue: bool = None,
+        buffer_preroll_ms: app_commands.Range[int, 20, 5000] = None
+    ):
         """設定を変更"""
         self.config._config.interrupt = interrupt
-        self.config.save_settings({'interrupt': interrupt})
+        if fair_queue is not None:
+            self.config._config.fair_queue = fair_queue
+            self.queue.set_fair(fair_queue)
+        if buffer_preroll_ms is not None:
+            self.config._config.buffer_preroll_ms = buffer_preroll_ms
+        self.config.save_settings({
+            'interrupt': interrupt,
+            'fair_queue': self.config._config.fair_queue,
+            'buffer_preroll_ms': self.config._config.buffer_preroll_ms
+        })
 
         embed = discord.Embed(title='設定を変更しました。', color=0xffffff)
         await ctx.response.send_message(embed=embed)
@@ -178,8 +199,116 @@ class AdminCog(commands.Cog):
 
         embed = discord.Embed(title='設定', color=0xffffff)
         embed.add_field(name='曲割り込み機能', value=settings['interrupt'])
+        embed.add_field(name='公平キュー', value=settings.get('fair_queue', False))
+        embed.add_field(name='先読み時間', value=f'{settings.get("buffer_preroll_ms", 500)}ms')
         await ctx.response.send_message(embed=embed)
 
+    @app_commands.command(name='health', description='すべてのプレイリストの曲が再生可能か確認します。')
+    @app_commands.describe(prune='問題のある曲をすべてのプレイリストから削除する', force='前回の結果を使わずにすべて確認する')
+    @app_commands.default_permissions(administrator=True)
+    async def health(self, ctx: discord.Interaction, prune: bool = False, force: bool = False):
+        """プレイリストのヘルススキャン"""
+        logger.info(f'🩺 /healthコマンドが実行されました - ユーザー: {ctx.user.display_name}, prune: {prune}')
+        if self.health_scanner is None or self.health_scanner.running:
+            embed = discord.Embed(title=':warning:ヘルススキャンは実行中です。', color=0xffff00)
+            await ctx.response.send_message(embed=embed)
+            return
+
+        await ctx.response.defer()
+        embed = discord.Embed(title='🩺 ヘルススキャン中...', description='確認を開始しました。', color=0x0099ff)
+        message = await ctx.followup.send(embed=embed, wait=True)
+        last_update = time.monotonic()
+
+        async def progress(done: int, total: int):
+            nonlocal last_update
+            if time.monotonic() - last_update < self.HEALTH_PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            embed.description = f'{done}/{total}曲を確認しました。'
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException as e:
+                logger.warning(f'⚠️ ヘルススキャン進捗の更新に失敗しました: {e}')
+
+        try:
+            result = await self.health_scanner.scan(progress, force=force)
+        except Exception as e:
+            logger.error(f'❌ ヘルススキャンに失敗しました: {e}')
+            embed.title = ':warning:ヘルススキャン中にエラーが発生しました。'
+            embed.description = f'次回の実行時に続きから再開します。\nエラー内容: {e}'
+            embed.color = 0xff0000
+            await message.edit(embed=embed)
+            return
+
+        removed = {}
+        if prune and result['bad']:
+            removed = self.playlist.remove_tracks(list(result['bad']))
+
+        embed.title = '🩺 ヘルススキャン完了' + ('（再開）' if result['resumed'] else '')
+        embed.color = 0xffffff if result['bad'] else 0x00ff00
+        embed.description = (f'登録曲: {result["total"]}曲 - 確認: {result["probed"]}曲, '
+                             f'問題: {len(result["bad"])}曲, 確認できず: {result["unknown"]}曲')
+        if removed:
+            embed.description += f'\n{sum(removed.values())}件を{len(removed)}個のプレイリストから削除しました。'
+        await message.edit(embed=embed)
+
+        if not result['report']:
+            return
+        lines = []
+        for playlist in sorted(result['report']):
+            tracks = result['report'][playlist]
+            lines.append(f'**{playlist}** ({len(tracks)}曲)')
+            lines.extend(f'・{self.HEALTH_LABELS[status]}: {url}' for url, status in tracks)
+        pages = self.utils.paginate_lines(lines, 4000)
+        embeds = [discord.Embed(title='🩺 ヘルススキャン結果', description=page, color=0xffffff)
+                  .set_footer(text=f'{i}/{len(pages)}ページ') for i, page in enumerate(pages, start=1)]
+        if len(embeds) == 1:
+            await self.bot.messenger.send(ctx.channel, embed=embeds[0])
+            return
+
+        async def render(page: int) -> discord.Embed:
+            return embeds[page]
+
+        view = PageView(render, len(embeds))
+        view.message = await self.bot.messenger.send(ctx.channel, embed=embeds[0], view=view)
+
+    @app_commands.command(name='ffmpeg', description='再生中のFFmpegプロセスの状態を表示します。')
+    @app_commands.default_permissions(administrator=True)
+    async def ffmpeg(self, ctx: discord.Interaction):
+        """FFmpegプロセスの状態を表示"""
+        await ctx.response.defer()
+        # CPU使用率は定期的な計測の値を表示する（短い間隔で計測し直すと過大になる）
+        stats = await asyncio.to_thread(self.bot.supervisor.stats)
+
+        embed = discord.Embed(title='🛠️ FFmpegプロセス', color=0xffffff)
+        embed.add_field(name='実行中', value=f'{stats["running"]}')
+        embed.add_field(name='CPU', value=f'{stats["cpu_percent"]:.0f}%')
+        embed.add_field(name='メモリ', value=f'{stats["rss"] / 1024 / 1024:.0f}MB')
+        embed.add_field(name='終了済み', value=f'{stats["exited"]}')
+        embed.add_field(name='受信量', value=f'{stats["bytes_received"] / 1024 / 1024:.1f}MB')
+        killed = stats['killed_by']
+        embed.add_field(
+            name='強制終了',
+            value=f'孤立{killed["orphaned"]} / メモリ{killed["rss"]} / CPU{killed["cpu"]} / リセット{killed["reset"]}'
+        )
+        embed.add_field(name='未管理', value=', '.join(map(str, stats['untracked'])) or 'なし')
+
+        now = time.time()
+        lines = [
+            f'`{info.pid}` {self.utils.format_time(now - info.started)}経過 '
+            f'CPU {info.cpu_seconds:.1f}秒 ({info.cpu_percent:.0f}%) '
+            f'{info.rss / 1024 / 1024:.0f}MB 受信{info.bytes_read / 1024 / 1024:.1f}MB\n{info.label}'
+            for info in stats['processes']
+        ]
+        if stats['recent']:
+            lines.append('\n**最近終了したプロセス**')
+            lines.extend(
+                f'{self.utils.format_time(seconds)} 受信{bytes_read / 1024 / 1024:.1f}MB {label}'
+                for label, bytes_read, seconds in reversed(stats['recent'])
+            )
+        embed.description = '\n'.join(lines)[:4000] or '実行中のプロセスはありません。'
+        await ctx.followup.send(embed=embed)
+
     @app_commands.command(name='update', description='パッケージの更新状況を確認し、更新があれば実行します。')
     @app_commands.default_permissions(administrator=True)
     async def update(self, ctx: discord.Interaction):
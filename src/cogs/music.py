@@ -10,17 +10,27 @@ from typing import List, Literal
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 from niconico import NicoNico
-import orjson
 import requests
 
+import Audio
+import Effects
+import Events
+import Merge
+import Playback
+
 logger = logging.getLogger('PlayAudio')
 
 
 class MusicCog(commands.Cog):
     """音楽再生機能を提供するCog"""
 
+    # 再生開始通知をまとめる待ち時間（秒）、連続スキップ時は最後の曲だけ通知する
+    NOTIFY_DELAY = 1.0
+    # 先読みバッファに保持する最大フレーム数（1フレーム20ms、250フレームで5秒）
+    BUFFER_FRAMES = 250
+
     def __init__(self, bot: commands.Bot, config, player, queue, playlist, utils):
         self.bot = bot
         self.config = config
@@ -31,67 +41,111 @@ class MusicCog(commands.Cog):
 
         # グローバル状態
         self.nclient = NicoNico()
-        self.next_song = None
         self.is_loop = False
-        self.current_nvideo = None
         self.current_presence = None
-
-    async def cog_load(self):
-        """Cog読み込み時の処理"""
-        self.check_music.start()
-        logger.info('🔄 音楽監視タスクを開始しました')
+        # 音量・イコライザー（再生中の曲にも即座に反映される）
+        self.effects = Effects.EffectsChain()
+
+        # 再生状態の変化をイベントで通知する
+        self.events = Events.EventBus()
+        self._notify_started = Events.Debouncer(self._on_track_started, self.NOTIFY_DELAY)
+        self.events.subscribe(Events.TRACK_STARTED, self._notify_started)
+        self.events.subscribe(Events.TRACK_STARTED, self._on_track_recorded)
+        self.events.subscribe(Events.TRACK_ENDED, self._on_track_ended)
+        self.events.subscribe(Events.PLAYBACK_STOPPED, self._on_playback_stopped)
+        self.events.subscribe(Events.PLAYBACK_STOPPED, self._on_queue_finished)
+
+        # 曲の遷移（再生・終了・スキップ・停止）はすべてこのコントローラーが順番に処理する
+        self.playback = Playback.PlaybackController(
+            queue, self._resolve, self.events, is_loop=lambda: self.is_loop
+        )
 
     async def cog_unload(self):
         """Cogアンロード時の処理"""
-        self.check_music.cancel()
+        self._notify_started.cancel()
+
+    async def _on_track_started(self, url: str, loop: bool):
+        """再生開始時にプレゼンスと次の曲の通知を更新"""
+        try:
+            title = await asyncio.to_thread(self.utils.get_title_url, url)
+        except Exception as e:
+            logger.warning(f'⚠️ プレゼンス準備でエラーが発生しました: {e}')
+            title = None
+        if title:
+            new_presence = ('🔄' if loop else '⏩') + title
+        else:
+            new_presence = '🎵 音楽再生中'
+        if new_presence != self.current_presence:
+            try:
+                await self.bot.change_presence(
+                    activity=discord.Activity(type=discord.ActivityType.listening, name=new_presence)
+                )
+                self.current_presence = new_presence
+                logger.debug(f'🎵 プレゼンス更新: {new_presence}')
+            except Exception as e:
+                logger.warning(f'⚠️ プレゼンス更新でエラーが発生しました: {e}')
+
+        channel = self.bot.get_channel(self.config.config.channel_id)
+        if channel is None or len(self.queue) == 0:
+            return
+        try:
+            next_embed = await asyncio.to_thread(self._create_next_embed, self.queue.peek_queue(1)[0])
+        except Exception as e:
+            logger.warning(f'⚠️ 次の曲Embed作成でエラー: {e}')
+            next_embed = discord.Embed(title='次の曲', description='次の曲を準備中...', color=0x00ff00)
+        self.bot.messenger.post(channel, embed=next_embed, key='next_song')
+        logger.info('📢 次の曲通知を送信しました')
+
+    async def _on_playback_stopped(self, reason: str):
+        """再生停止時にプレゼンスを消去"""
+        self._notify_started.cancel()
+        if self.current_presence is not None:
+            self.current_presence = None
+            try:
+                await self.bot.change_presence(activity=None)
+                logger.debug('🎵 プレゼンス更新 - 再生停止')
+            except Exception as e:
+                logger.warning(f'⚠️ プレゼンス更新でエラーが発生しました: {e}')
 
-    def play_music(self, vc) -> dict:
-        """音楽を再生する
+    async def _resolve(self, url: str) -> Audio.Stream:
+        """URLを再生可能なストリームに変換する
 
         Args:
-            vc (discord.VoiceClient): VoiceClient
+            url (str): 動画のURL
 
         Returns:
-            dict: ストリーミング情報
+            Audio.Stream: 任意の位置から開けるストリーム
         """
-        # ボイス接続確認
-        if not vc or not vc.is_connected():
-            logger.error('❌ ボイスチャンネルに接続されていません')
-            return None
+        # DBはイベントループのスレッドで読み、通信を伴う解決だけをワーカースレッドで行う
+        trim = self._get_trim(url)
+        return await asyncio.to_thread(self._resolve_stream, url, trim)
 
-        # キューが空でループもオフの場合は終了
-        if (len(self.queue.get_queue()) == 0) and (not self.is_loop):
-            return None
+    def _resolve_stream(self, url: str, trim) -> Audio.Stream:
+        """URLを再生可能なストリームに変換する（ワーカースレッドで実行）
 
-        # ループ中なら現在の曲、そうでなければキューから取得
-        if self.is_loop:
-            url = self.queue.now_playing
-        else:
-            url = self.queue.pop_queue()
+        Args:
+            url (str): 動画のURL
+            trim (tuple): 前後の無音カット位置（未解析ならNone）
 
+        Returns:
+            Audio.Stream: 任意の位置から開けるストリーム
+        """
         logger.info(f'🎵 音楽再生を開始します: {url}')
 
-        # 前のニコニコ動画接続をクリーンアップ
-        if self.current_nvideo:
-            try:
-                self.current_nvideo.close()
-                logger.debug('🔄 前のニコニコ動画接続を正常にクローズしました')
-            except Exception as e:
-                logger.warning(f'⚠️ 前のニコニコ動画接続のクローズに失敗しました: {e}')
-            finally:
-                self.current_nvideo = None
-
         nvideo = None
         try:
             # ニコニコ動画の場合はダウンロードリンクを取得
             if 'nico' in url:
                 nvideo = self.nclient.video.get_video(url)
                 nvideo.connect()
-                url = nvideo.download_link
-                self.current_nvideo = nvideo
+                stream_source = nvideo.download_link
+            else:
+                stream_source = url
 
             # ストリーミングURL取得
-            s_y = self.player.streamming_youtube(url)
+            # ボイスチャンネルのビットレートに合った音声フォーマットを選ぶ
+            channel = getattr(self.playback.vc, 'channel', None)
+            s_y = self.player.streamming_youtube(stream_source, bitrate=getattr(channel, 'bitrate', None))
             stream_url = s_y.get('url')
 
             # HLS判定
@@ -116,59 +170,82 @@ class MusicCog(commands.Cog):
             logger.debug(f'🔧 FFmpegオプション: before={ffmpeg_options["before_options"]}')
             logger.debug(f'🔧 プロトコル: {s_y.get("protocol")}, ext: {s_y.get("ext")}, acodec: {s_y.get("acodec")}')
 
-            audio_source = discord.FFmpegPCMAudio(
+            # formatsを含むストリーミング情報は保持せず、再生とシークに必要な値だけ残す
+            return Audio.Stream(
+                url,
                 stream_url,
-                before_options=ffmpeg_options['before_options'],
-                options=ffmpeg_options['options']
-            )
-
-            vc.play(
-                source=audio_source,
-                after=lambda e: asyncio.run_coroutine_threadsafe(
-                    self._play_next_song(vc, e), self.bot.loop
-                )
+                ffmpeg_options['before_options'],
+                ffmpeg_options['options'],
+                duration=s_y.get('duration'),
+                is_live=bool(s_y.get('is_live')),
+                # 先読みバッファで再生スレッドをデコーダーの遅延から切り離す
+                buffer_frames=self.BUFFER_FRAMES,
+                preroll=int(self.config.config.buffer_preroll_ms / (Audio.FRAME_SECONDS * 1000)),
+                on_close=(lambda: self._close_nvideo(nvideo)) if nvideo else None,
+                fanout=self.bot.fanout,
+                supervisor=self.bot.supervisor,
+                guild_id=self.config.config.guild_id,
+                effects=self.effects,
+                # 前後の無音を解析済みならその区間を飛ばし、未解析なら再生中に解析する
+                trim=trim,
+                analyse=trim is None,
+                # ループ再生中は曲をOpusで保持し、繰り返しはFFmpegなしで再生する
+                record=lambda: self.is_loop
             )
 
-            logger.debug('✅ 音楽再生の設定が正常に完了しました')
-            return s_y
+        except Exception:
+            if nvideo:
+                self._close_nvideo(nvideo)
+            raise
 
+    @staticmethod
+    def _close_nvideo(nvideo):
+        """ニコニコ動画接続をクローズ"""
+        try:
+            nvideo.close()
+            logger.debug('🔄 ニコニコ動画接続をクローズしました')
         except Exception as e:
-            logger.error(f'❌ 音楽再生処理でエラーが発生しました: {e}')
-            if nvideo and nvideo != self.current_nvideo:
-                try:
-                    nvideo.close()
-                    logger.debug('🔄 エラー発生によりニコニコ動画接続をクローズしました')
-                except Exception as cleanup_error:
-                    logger.warning(f'⚠️ エラー後のニコニコ動画接続クリーンアップに失敗: {cleanup_error}')
-            return None
-
-    async def _play_next_song(self, vc, error):
-        """曲終了後に次の曲を再生"""
-        if error:
-            logger.error(f'❌ 音楽再生後のコールバックエラー: {error}')
+            logger.warning(f'⚠️ ニコニコ動画接続のクローズに失敗しました: {e}')
 
+    async def _on_track_recorded(self, url: str, loop: bool):
+        """再生開始時に曲の再生回数を記録"""
         try:
-            logger.debug('🔄 曲終了検知 - 次の曲の再生準備を開始します')
+            self.playlist.record_track_play(url)
+        except Exception as e:
+            logger.warning(f'⚠️ 再生回数の記録に失敗しました: {e}')
 
-            if len(self.queue.get_queue()) > 0 or self.is_loop:
-                logger.info('🎵 次の曲を自動再生します')
-                self.play_music(vc)
-            else:
-                logger.info('📋 キューが空になりました - 再生を停止します')
-                try:
-                    channel = self.bot.get_channel(self.config.config.channel_id)
-                    if channel:
-                        embed = discord.Embed(
-                            title='🎵 再生完了',
-                            description='キューの再生がすべて終了しました',
-                            color=0x00ff00
-                        )
-                        await channel.send(embed=embed)
-                except Exception as channel_error:
-                    logger.warning(f'⚠️ 再生完了メッセージ送信エラー: {channel_error}')
+    def _get_trim(self, url: str):
+        """曲の無音カット位置を取得（未解析ならNone）"""
+        try:
+            return self.playlist.get_track_trim(url)
+        except Exception as e:
+            logger.warning(f'⚠️ 無音カット位置の取得に失敗しました: {e}')
+            return None
 
+    async def _on_track_ended(self, url: str, error, analysis):
+        """最後まで再生した曲の前後の無音を記録"""
+        if analysis is None:
+            return
+        try:
+            start, end = await asyncio.to_thread(analysis.bounds)
+            self.playlist.set_track_trim(url, start, end)
+            if start or end is not None:
+                logger.info(f'🔇 前後の無音を検出しました: {start:.1f}秒〜{"終了" if end is None else f"{end:.1f}秒"} {url}')
         except Exception as e:
-            logger.error(f'❌ 次の曲再生準備でエラーが発生しました: {e}')
+            logger.warning(f'⚠️ 無音カット位置の記録に失敗しました: {e}')
+
+    async def _on_queue_finished(self, reason: str):
+        """キューを最後まで再生したら再生完了を通知"""
+        if reason != 'finished':
+            return
+        channel = self.bot.get_channel(self.config.config.channel_id)
+        if channel:
+            embed = discord.Embed(
+                title='🎵 再生完了',
+                description='キューの再生がすべて終了しました',
+                color=0x00ff00
+            )
+            self.bot.messenger.post(channel, embed=embed)
 
     def _create_next_embed(self, url: str) -> discord.Embed:
         """次の曲のEmbed作成"""
@@ -182,7 +259,7 @@ class MusicCog(commands.Cog):
                 description=f'[{title}]({url})',
                 color=0xffffff
             )
-            embed.set_footer(text=f'キューに入っている曲数:{len(self.queue.get_queue())}曲')
+            embed.set_footer(text=f'キューに入っている曲数:{len(self.queue)}曲')
 
             # サムネイル設定
             try:
@@ -220,122 +297,18 @@ class MusicCog(commands.Cog):
                 description=f'[次の曲]({url})',
                 color=0xffffff
             )
-            fallback_embed.set_footer(text=f'キューに入っている曲数:{len(self.queue.get_queue())}曲')
+            fallback_embed.set_footer(text=f'キューに入っている曲数:{len(self.queue)}曲')
             return fallback_embed
 
-    @tasks.loop(seconds=3)
-    async def check_music(self) -> None:
-        """音楽状態を監視するタスク"""
-        await self.bot.wait_until_ready()
-
-        vc_channel = self.bot.get_channel(self.config.config.vc_channel_id)
-        channel = self.bot.get_channel(self.config.config.channel_id)
-
-        if not vc_channel or not channel:
-            return
-
-        try:
-            if not vc_channel.guild.voice_client:
-                return
-
-            vc = discord.utils.get(self.bot.voice_clients)
-            if vc:
-                if vc.is_playing():
-                    # プレゼンス更新
-                    if self.queue.now_playing:
-                        try:
-                            title = self.utils.get_title_url(self.queue.now_playing)
-                            if title:
-                                if self.is_loop:
-                                    new_presence = "🔄" + title
-                                else:
-                                    new_presence = "⏩" + title
-                            else:
-                                new_presence = "🎵 音楽再生中"
-                        except Exception as e:
-                            logger.warning(f'⚠️ プレゼンス準備でエラーが発生しました: {e}')
-                            new_presence = "🎵 音楽再生中"
-                    else:
-                        new_presence = "🎵 音楽再生中"
-
-                    if new_presence != self.current_presence:
-                        try:
-                            await self.bot.change_presence(
-                                activity=discord.Activity(
-                                    type=discord.ActivityType.listening,
-                                    name=new_presence
-                                )
-                            )
-                            self.current_presence = new_presence
-                            logger.debug(f'🎵 プレゼンス更新: {new_presence}')
-                        except Exception as e:
-                            logger.warning(f'⚠️ プレゼンス更新でエラーが発生しました: {e}')
-
-                    # 曲変更検知
-                    try:
-                        current_source = vc.source
-                        if current_source != self.next_song:
-                            self.next_song = current_source
-                            logger.debug(f'🎵 音楽ソースの変化を検知しました')
-
-                            if len(self.queue.get_queue()) > 0:
-                                try:
-                                    next_embed = self._create_next_embed(self.queue.get_queue()[0])
-                                    await channel.send(embed=next_embed)
-                                    logger.info(f'📢 次の曲通知を送信しました')
-                                except Exception as embed_error:
-                                    logger.warning(f'⚠️ 次の曲Embed作成でエラー: {embed_error}')
-                                    simple_embed = discord.Embed(
-                                        title='次の曲',
-                                        description='次の曲を準備中...',
-                                        color=0x00ff00
-                                    )
-                                    await channel.send(embed=simple_embed)
-                    except IndexError:
-                        logger.debug('📋 次の曲の通知でIndexError - キューが空です')
-                    except Exception as e:
-                        logger.warning(f'⚠️ 次の曲の通知でエラーが発生しました: {e}')
-                else:
-                    if self.current_presence is not None:
-                        await self.bot.change_presence(activity=None)
-                        self.current_presence = None
-                        logger.debug('🎵 プレゼンス更新 - 再生停止')
-
-        except IndexError:
-            logger.debug('📋 音楽監視タスクでIndexError')
-        except Exception as e:
-            logger.error(f'❌ 音楽監視タスクでエラーが発生しました: {e}')
-
     async def playlist_autocomplete(
         self,
         interaction: discord.Interaction,
         current: str
     ) -> List[app_commands.Choice[str]]:
         """プレイリストのオートコンプリート"""
-        import os
-        data = []
-        playlists = []
-        playlist_path = self.config.PLAYLIST_PATH
-        files = os.listdir(playlist_path)
-
-        for file in files:
-            file = file[:-5]
-            if current.lower() in file.lower():
-                playlists.append(file)
-                if len(data) > 24:
-                    break
-
-        playlists = self.playlist.calculate_playlist_usage(playlists)
-
-        for playlist in playlists:
-            for file, date in playlist.items():
-                file = file[:-5]
-                if len(date) == 0:
-                    date = ['最後に再生した日付なし']
-                if current.lower() in file.lower():
-                    data.append(app_commands.Choice(name=file, value=file))
-
-        return data
+        playlists = self.playlist.search_playlists(current)
+
+        return [app_commands.Choice(name=playlist, value=playlist) for playlist in playlists]
 
     @app_commands.command(name='play', description='指定されたURL、プレイリストから曲を再生します。')
     @app_commands.describe(urls='動画のURL', playlists='プレイリスト名', shuffle='シャッフル再生')
@@ -347,8 +320,6 @@ class MusicCog(commands.Cog):
         shuffle: Literal['シャッフル再生'] = None
     ):
         """音楽を再生する"""
-        import os
-
         logger.info(f'🎵 /playコマンドが実行されました - ユーザー: {ctx.user.display_name}')
         logger.debug(f'📝 引数情報 - URLs: {urls}, プレイリスト: {playlists}, シャッフル: {shuffle}')
         start = time.time()
@@ -372,8 +343,6 @@ class MusicCog(commands.Cog):
             logger.info(f'🔊 ボイスチャンネル "{ctx.user.voice.channel.name}" に接続しました')
             await asyncio.sleep(0.5)
 
-        playlist_path = self.config.PLAYLIST_PATH
-
         # URL処理
         if urls is not None:
             logger.debug('📋 URL指定モードで処理を開始します')
@@ -387,23 +356,21 @@ class MusicCog(commands.Cog):
 
             if len(playlists) != len(list(dict.fromkeys(playlists))):
                 embed = discord.Embed(title=':warning:重複したプレイリストは削除されました。', color=0xffffff)
-                await ctx.channel.send(embed=embed)
+                self.bot.messenger.post(ctx.channel, embed=embed)
 
             playlists = list(dict.fromkeys(playlists))
             logger.info(f'🗂️ 重複プレイリストを削除しました: {playlists}')
 
             for playlist in playlists:
-                if os.path.exists(f'{playlist_path}{playlist}.json'):
-                    self.playlist.record_play_date(f'{playlist}.json', datetime.now())
-                    with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-                        json_list = orjson.loads(f.read())
-                        if urls is not None:
-                            urls.extend(json_list['urls'])
-                        else:
-                            urls = json_list['urls']
+                json_list = self.playlist.get_playlist(playlist)
+                if json_list is not None:
+                    if urls is not None:
+                        urls.extend(json_list['urls'])
+                    else:
+                        urls = json_list['urls']
                 else:
                     embed = discord.Embed(title=f':warning:プレイリスト{playlist}が存在しません。', color=0xff0000)
-                    await ctx.channel.send(embed=embed)
+                    self.bot.messenger.post(ctx.channel, embed=embed)
                     logger.warning(f'Playlist:{playlist} does not exist')
 
             if urls is None:
@@ -411,12 +378,15 @@ class MusicCog(commands.Cog):
                 await ctx.followup.send(embed=embed)
                 return
 
-            # 重複URL削除
-            if len(urls) != len(list(dict.fromkeys(urls))):
-                embed = discord.Embed(title=':warning:重複したURLは削除されました。', color=0xffffff)
-                await ctx.channel.send(embed=embed)
-
-            urls = list(dict.fromkeys(urls))
+            # 重複URL削除（動画IDで比較）
+            urls, duplicates = Merge.dedupe(urls)
+            if duplicates:
+                embed = discord.Embed(
+                    title=':warning:重複したURLは削除されました。',
+                    description=f'{len(duplicates)}件の重複をスキップしました。',
+                    color=0xffffff
+                )
+                self.bot.messenger.post(ctx.channel, embed=embed)
 
         urls, error = self.utils.check_url(urls)
         logger.info(f'URLs: {urls}')
@@ -428,7 +398,7 @@ class MusicCog(commands.Cog):
                 description='\n'.join(error),
                 color=0xff0000
             )
-            await ctx.channel.send(embed=embed)
+            self.bot.messenger.post(ctx.channel, embed=embed)
             logger.error(f'CheckURLErrors: {error}')
 
             # プレイリスト再生時はエラーURLを自動削除
@@ -442,18 +412,8 @@ class MusicCog(commands.Cog):
                             error_urls.append(err[start_idx:end_idx])
 
                 if error_urls:
-                    total_removed = 0
-                    for playlist in playlists:
-                        removed = self.playlist.remove_urls_from_playlist(playlist, error_urls)
-                        total_removed += removed
-
-                    if total_removed > 0:
-                        embed = discord.Embed(
-                            title=':wastebasket: エラーURLを自動削除しました',
-                            description=f'{total_removed}件のURLをプレイリストから削除しました。',
-                            color=0xff9900
-                        )
-                        await ctx.channel.send(embed=embed)
+                    # 編集中のプレイリストを待たないようにバックグラウンドで削除する
+                    asyncio.create_task(self._prune_playlists(ctx.channel, error_urls))
 
         if len(urls) == 0:
             embed = discord.Embed(
@@ -469,8 +429,8 @@ class MusicCog(commands.Cog):
             logger.debug('Shuffle URLs')
 
         # キューに追加
-        self.queue.add_queue(urls, interrupt=self.config.config.interrupt)
-        logger.debug(f'Queue: {self.queue.get_queue()}')
+        self.queue.add_queue(urls, interrupt=self.config.config.interrupt, requester=ctx.user.id)
+        logger.debug(f'Queue: {self.queue.peek_queue(10)}')
 
         # ボイスクライアント取得（再接続対応）
         vc = ctx.guild.voice_client
@@ -490,15 +450,15 @@ class MusicCog(commands.Cog):
                 await ctx.followup.send(embed=embed)
                 return
 
-        if not vc.is_playing():
-            next_song_url = self.queue.get_queue()[0] if len(self.queue.get_queue()) > 0 else None
+        if self.playback.state == Playback.State.IDLE:
+            next_song_url = self.queue.peek_queue(1)[0] if len(self.queue) > 0 else None
 
             embed = discord.Embed(description='🎵 再生を開始しています...', color=0x00ff00)
-            if len(self.queue.get_queue()) != 1:
+            if len(self.queue) != 1:
                 embed.set_footer(text=f'他{len(urls)-1}曲はキューに追加しました。')
             await ctx.followup.send(embed=embed)
 
-            self.play_music(vc)
+            await self.playback.play(vc)
 
             # 再生開始メッセージ
             try:
@@ -510,21 +470,21 @@ class MusicCog(commands.Cog):
                                 description=f'▶️ [{title}]({next_song_url})を再生開始しました',
                                 color=0x00ff00
                             )
-                            await ctx.channel.send(embed=detailed_embed)
+                            self.bot.messenger.post(ctx.channel, embed=detailed_embed)
                             logger.info(f'🎵 再生開始メッセージを送信しました: {title}')
                         else:
                             simple_embed = discord.Embed(
                                 description=f'▶️ 再生を開始しました: {next_song_url}',
                                 color=0x00ff00
                             )
-                            await ctx.channel.send(embed=simple_embed)
+                            self.bot.messenger.post(ctx.channel, embed=simple_embed)
                     except Exception as title_error:
                         logger.warning(f'⚠️ タイトル取得でエラー: {title_error}')
                         simple_embed = discord.Embed(
                             description=f'▶️ 再生を開始しました: {next_song_url}',
                             color=0x00ff00
                         )
-                        await ctx.channel.send(embed=simple_embed)
+                        self.bot.messenger.post(ctx.channel, embed=simple_embed)
             except Exception as e:
                 logger.error(f'❌ 再生開始メッセージ処理で予期しないエラー: {e}')
 
@@ -532,79 +492,86 @@ class MusicCog(commands.Cog):
             embed = discord.Embed(description=f'{len(urls)}曲をキューに追加しました。', color=0xffffff)
             await ctx.followup.send(embed=embed)
 
-        # キュー表示
-        if len(urls) <= 5:
-            try:
-                embed = self.utils.create_queue_embed(
-                    urls,
-                    title='キューに追加された曲一覧',
-                    footer=f'プレイリストに追加された曲数:{len(urls)}曲',
-                    addPages=True
-                )
-                await ctx.channel.send(embed=embed)
-            except Exception as e:
-                logger.warning(f'⚠️ キュー表示でエラーが発生しました: {e}')
-                simple_embed = discord.Embed(
-                    title='キューに追加された曲一覧',
-                    description=f'{len(urls)}曲が追加されました',
-                    color=0x00ff00
-                )
-                await ctx.channel.send(embed=simple_embed)
-        else:
+        # キュー表示（表示中のページのみタイトルを取得）
+        try:
+            await self.utils.send_paginated(
+                ctx.channel,
+                urls,
+                title='キューに追加された曲一覧',
+                footer=f'プレイリストに追加された曲数:{len(urls)}曲'
+            )
+        except Exception as e:
+            logger.warning(f'⚠️ キュー表示でエラーが発生しました: {e}')
             simple_embed = discord.Embed(
                 title='キューに追加された曲一覧',
-                description=f'{len(urls)}曲が追加されました\n（曲数が多いため、詳細表示を省略）',
+                description=f'{len(urls)}曲が追加されました',
                 color=0x00ff00
             )
-            await ctx.channel.send(embed=simple_embed)
+            self.bot.messenger.post(ctx.channel, embed=simple_embed)
 
-        # プレイリスト日付保存
+        # プレイリスト再生回数・日付保存
         if playlists is not None:
             try:
                 for playlist in playlists:
-                    self.playlist.record_play_date(f'{playlist}.json', datetime.now())
-                self.playlist.save_playlists_date()
+                    self.playlist.record_play(playlist, datetime.now())
             except Exception as e:
                 logger.warning(f'⚠️ プレイリスト日付保存でエラーが発生しました: {e}')
 
         endtime = time.time()
         logger.debug(f'🎵 Playコマンド処理完了時間: {endtime - start:.2f}秒')
 
+    async def _prune_playlists(self, channel, error_urls: list):
+        """エラーURLを登録されているすべてのプレイリストから削除"""
+        try:
+            removed = self.playlist.remove_tracks(error_urls)
+        except Exception as e:
+            logger.warning(f'⚠️ エラーURLの自動削除に失敗しました: {e}')
+            return
+
+        if removed:
+            embed = discord.Embed(
+                title=':wastebasket: エラーURLを自動削除しました',
+                description='\n'.join(f'{playlist}: {count}件' for playlist, count in removed.items()),
+                color=0xff9900
+            )
+            self.bot.messenger.post(channel, embed=embed)
+
     @app_commands.command(name='queue', description='キューの確認')
     async def queue_cmd(self, ctx: discord.Interaction):
         """キューを表示"""
         await ctx.response.defer()
 
-        if self.queue.get_queue():
-            logger.debug(f'Queue Sum: {len(self.queue.get_queue())}')
+        if len(self.queue) > 0:
+            logger.debug(f'Queue Sum: {len(self.queue)}')
 
             embed = discord.Embed(
                 title='キュー',
-                description=f'全{len(self.queue.get_queue())}曲',
+                description=f'全{len(self.queue)}曲',
                 color=0xffffff
             )
             await ctx.followup.send(embed=embed)
 
             try:
-                embed = self.utils.create_queue_embed(
+                # 表示するページの曲のタイトルだけを取得する
+                await self.utils.send_paginated(
+                    ctx.channel,
                     self.queue.get_queue(),
                     title='キュー一覧',
-                    addPages=True
+                    footer=f'キューに入っている曲数:{len(self.queue)}曲'
                 )
-                await ctx.channel.send(embed=embed)
             except Exception as e:
                 logger.warning(f'⚠️ キュー詳細表示でエラー: {e}')
                 simple_queue = '\n'.join([
-                    f'{i+1}. {url}' for i, url in enumerate(self.queue.get_queue()[:10])
+                    f'{i+1}. {url}' for i, url in enumerate(self.queue.peek_queue(10))
                 ])
                 fallback_embed = discord.Embed(
                     title='キュー一覧（簡易表示）',
                     description=simple_queue,
                     color=0xffff00
                 )
-                if len(self.queue.get_queue()) > 10:
-                    fallback_embed.set_footer(text=f'他 {len(self.queue.get_queue()) - 10} 曲...')
-                await ctx.channel.send(embed=fallback_embed)
+                if len(self.queue) > 10:
+                    fallback_embed.set_footer(text=f'他 {len(self.queue) - 10} 曲...')
+                self.bot.messenger.post(ctx.channel, embed=fallback_embed)
         else:
             embed = discord.Embed(title=':warning:キューに曲が入っていません。', color=0xffff00)
             await ctx.followup.send(embed=embed)
@@ -628,39 +595,26 @@ class MusicCog(commands.Cog):
         else:
             index = 0
 
-        vc = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
-
-        # ニコニコ動画接続クリーンアップ
-        if self.current_nvideo:
-            try:
-                self.current_nvideo.close()
-                logger.debug('🔄 スキップによりニコニコ動画接続をクローズしました')
-            except Exception as e:
-                logger.warning(f'⚠️ スキップ時のニコニコ動画接続クローズに失敗: {e}')
-            finally:
-                self.current_nvideo = None
-
-        if vc and vc.is_playing():
+        if self.playback.state in (Playback.State.PLAYING, Playback.State.PAUSED):
             if self.is_loop:
                 self.is_loop = False
                 embed = discord.Embed(title='ループ再生を解除しました。', color=0xffffff)
-                await ctx.channel.send(embed=embed)
-
-            self.queue.skip_queue(index)
+                self.bot.messenger.post(ctx.channel, embed=embed)
 
-            if len(self.queue.get_queue()) == 0:
+            if len(self.queue) <= index:
                 embed = discord.Embed(title=':warning:キューに曲がありません。', color=0xffff00)
                 await ctx.response.send_message(embed=embed)
-                vc.stop()
+                await self.playback.skip(index + 1)
                 return
 
+            next_url = self.queue.peek_queue(index + 1)[index]
             embed = discord.Embed(
                 title=f'{index+1}曲をスキップしました。',
-                description=f'[{self.utils.get_title_url(self.queue.get_queue()[0])}]({self.queue.get_queue()[0]})を再生します。',
+                description=f'[{self.utils.get_title_url(next_url)}]({next_url})を再生します。',
                 color=0xffffff
             )
             await ctx.response.send_message(embed=embed)
-            vc.stop()
+            await self.playback.skip(index + 1)
         else:
             embed = discord.Embed(title=':warning:再生中の曲がありません。', color=0xffff00)
             await ctx.response.send_message(embed=embed)
@@ -684,19 +638,113 @@ class MusicCog(commands.Cog):
             embed = discord.Embed(title=':warning:再生中の曲がありません。', color=0xffff00)
             await ctx.response.send_message(embed=embed)
 
-    def reset_state(self):
-        """状態をリセット"""
-        self.next_song = None
-        self.is_loop = False
-        self.current_presence = None
+    def _now_playing_embed(self) -> discord.Embed:
+        """再生中の曲と再生位置のEmbed作成"""
+        url = self.playback.current
+        title = self.utils.get_title_url(url) or url
+        paused = self.playback.state == Playback.State.PAUSED
+        embed = discord.Embed(
+            title=('⏸️ 一時停止中' if paused else '▶️ 再生中') + (' 🔄' if self.is_loop else ''),
+            description=f'[{title}]({url})\n{self.utils.progress_bar(self.playback.position, self.playback.duration)}',
+            color=0xffffff
+        )
+        embed.set_footer(text=f'キューに入っている曲数:{len(self.queue)}曲')
+        return embed
+
+    @app_commands.command(name='nowplaying', description='再生中の曲と再生位置を表示します。')
+    async def nowplaying(self, ctx: discord.Interaction):
+        """再生中の曲を表示"""
+        if self.playback.position is None:
+            embed = discord.Embed(title=':warning:再生中の曲がありません。', color=0xffff00)
+            await ctx.response.send_message(embed=embed)
+            return
+        await ctx.response.defer()
+        embed = await asyncio.to_thread(self._now_playing_embed)
+        await ctx.followup.send(embed=embed)
+
+    @app_commands.command(name='seek', description='再生中の曲の指定した位置に移動します。')
+    @app_commands.describe(position='再生位置（秒、分:秒 または 時:分:秒）')
+    async def seek(self, ctx: discord.Interaction, position: str):
+        """再生位置を変更"""
+        logger.info(f'⏩ /seekコマンドが実行されました - ユーザー: {ctx.user.display_name}, 位置: {position}')
+        seconds = self.utils.parse_time(position)
+        if seconds is None:
+            embed = discord.Embed(title=':warning:再生位置は 90、1:30、1:02:03 のように指定してください。', color=0xff0000)
+            await ctx.response.send_message(embed=embed)
+            return
 
-        if self.current_nvideo:
-            try:
-                self.current_nvideo.close()
-            except Exception as e:
-                logger.warning(f'Failed to close NVIDEO on reset: {e}')
-            finally:
-                self.current_nvideo = None
+        await ctx.response.defer()
+        duration = self.playback.duration
+        if self.playback.position is None:
+            embed = discord.Embed(title=':warning:再生中の曲がありません。', color=0xffff00)
+        elif duration is None:
+            embed = discord.Embed(title=':warning:この曲はシークできません。', color=0xffff00)
+        elif seconds >= duration:
+            embed = discord.Embed(
+                title=f':warning:曲の長さ({self.utils.format_time(duration)})より前の位置を指定してください。',
+                color=0xffff00
+            )
+        elif await self.playback.seek(seconds):
+            embed = discord.Embed(title=f'⏩ {self.utils.format_time(seconds)}に移動しました。', color=0xffffff)
+        else:
+            embed = discord.Embed(title=':warning:シークに失敗しました。', color=0xff0000)
+        await ctx.followup.send(embed=embed)
+
+    @app_commands.command(name='pause', description='再生中の曲を一時停止します。')
+    async def pause(self, ctx: discord.Interaction):
+        """一時停止"""
+        await ctx.response.defer()
+        if await self.playback.pause():
+            embed = discord.Embed(
+                title=f'⏸️ {self.utils.format_time(self.playback.position)}で一時停止しました。',
+                color=0xffffff
+            )
+        else:
+            embed = discord.Embed(title=':warning:再生中の曲がありません。', color=0xffff00)
+        await ctx.followup.send(embed=embed)
+
+    @app_commands.command(name='resume', description='一時停止中の曲を再開します。')
+    async def resume(self, ctx: discord.Interaction):
+        """再生再開"""
+        await ctx.response.defer()
+        if await self.playback.resume():
+            embed = discord.Embed(title='▶️ 再生を再開しました。', color=0xffffff)
+        else:
+            embed = discord.Embed(title=':warning:一時停止中の曲がありません。', color=0xffff00)
+        await ctx.followup.send(embed=embed)
+
+    @app_commands.command(name='volume', description='音量を変更します。')
+    @app_commands.describe(volume='音量（%、100で元の音量）')
+    async def volume(self, ctx: discord.Interaction, volume: app_commands.Range[int, 0, 200] = None):
+        """音量を変更"""
+        if volume is None:
+            embed = discord.Embed(title=f'🔊 現在の音量: {self.effects.volume * 100:.0f}%', color=0xffffff)
+        else:
+            self.effects.set_volume(volume / 100)
+            embed = discord.Embed(title=f'🔊 音量を{volume}%に変更しました。', color=0xffffff)
+            logger.info(f'🔊 音量を変更しました: {volume}%')
+        await ctx.response.send_message(embed=embed)
+
+    @app_commands.command(name='eq', description='低音・高音を調整します。')
+    @app_commands.describe(bass='低音（dB、0で元の音）', treble='高音（dB、0で元の音）')
+    async def eq(
+        self,
+        ctx: discord.Interaction,
+        bass: app_commands.Range[int, -12, 12] = None,
+        treble: app_commands.Range[int, -12, 12] = None
+    ):
+        """イコライザーを変更"""
+        self.effects.set_eq(bass=bass, treble=treble)
+        embed = discord.Embed(
+            title=f'🎚️ 低音: {self.effects.bass:+.0f}dB / 高音: {self.effects.treble:+.0f}dB',
+            color=0xffffff
+        )
+        await ctx.response.send_message(embed=embed)
+
+    async def reset_state(self):
+        """状態をリセット（再生を停止し、再生停止イベントで通知も止める）"""
+        self.is_loop = False
+        await self.playback.stop()
 
 
 async def setup(bot: commands.Bot):
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 """プレイリスト管理関連のCog"""
 
+import asyncio
 import logging
-import os
+import sqlite3
+import threading
 import time
 from datetime import datetime
 from typing import List
@@ -11,7 +13,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ui import Modal, text_input
-import orjson
+
+import Merge
+from Playlist import PlaylistConflictError
 
 logger = logging.getLogger('PlayAudio')
 
@@ -25,20 +29,19 @@ class DeleteInput(Modal, title='プレイリストを削除'):
         required=True
     )
 
-    def __init__(self, playlist: str, playlist_path: str, playlist_manager):
+    def __init__(self, playlist: str, playlist_manager):
         super().__init__(title='⚠削除後復元はできません！')
         self.playlist = playlist
-        self.playlist_path = playlist_path
         self.playlist_manager = playlist_manager
 
     async def on_submit(self, interaction: discord.Interaction):
         if self.text.value == self.playlist:
-            os.remove(f'{self.playlist_path}{self.playlist}.json')
+            async with self.playlist_manager.lock(self.playlist):
+                self.playlist_manager.delete_playlist(self.playlist)
             embed = discord.Embed(
                 title=f'プレイリスト:{self.playlist}を削除しました。',
                 color=0xffffff
             )
-            self.playlist_manager.delete_playlists_date(self.playlist)
             await interaction.response.send_message(embed=embed)
             logger.info(f'Delete Playlist: {self.playlist}')
         else:
@@ -63,11 +66,25 @@ class DeleteInput(Modal, title='プレイリストを削除'):
 class PlaylistCog(commands.Cog):
     """プレイリスト管理機能を提供するCog"""
 
-    def __init__(self, bot: commands.Bot, config, playlist, utils):
+    # インポート時に一度に保存する曲数
+    IMPORT_BATCH_SIZE = 200
+    # インポート進捗メッセージの更新間隔（秒）
+    IMPORT_PROGRESS_INTERVAL = 2
+
+    def __init__(self, bot: commands.Bot, config, playlist, utils, downloader):
         self.bot = bot
         self.config = config
         self.playlist = playlist
         self.utils = utils
+        self.downloader = downloader
+
+    @staticmethod
+    def conflict_embed(playlist: str) -> discord.Embed:
+        """同時編集の競合を通知するEmbed"""
+        return discord.Embed(
+            title=f':warning:プレイリスト{playlist}は他の操作で変更されました、もう一度実行してください。',
+            color=0xffff00
+        )
 
     async def playlist_autocomplete(
         self,
@@ -75,29 +92,9 @@ class PlaylistCog(commands.Cog):
         current: str
     ) -> List[app_commands.Choice[str]]:
         """プレイリストのオートコンプリート"""
-        data = []
-        playlists = []
-        playlist_path = self.config.PLAYLIST_PATH
-        files = os.listdir(playlist_path)
-
-        for file in files:
-            file = file[:-5]
-            if current.lower() in file.lower():
-                playlists.append(file)
-                if len(data) > 24:
-                    break
+        playlists = self.playlist.search_playlists(current)
 
-        playlists = self.playlist.calculate_playlist_usage(playlists)
-
-        for playlist in playlists:
-            for file, date in playlist.items():
-                file = file[:-5]
-                if len(date) == 0:
-                    date = ['最後に再生した日付なし']
-                if current.lower() in file.lower():
-                    data.append(app_commands.Choice(name=file, value=file))
-
-        return data
+        return [app_commands.Choice(name=playlist, value=playlist) for playlist in playlists]
 
     @app_commands.command(name='プレイリストを作成', description='プレイリストを作成します。')
     @app_commands.describe(
@@ -113,8 +110,6 @@ class PlaylistCog(commands.Cog):
         locked: bool
     ):
         """プレイリストを作成"""
-        playlist_path = self.config.PLAYLIST_PATH
-
         if self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title='プレイリスト作成',
@@ -130,13 +125,16 @@ class PlaylistCog(commands.Cog):
         urls = urls.split(',')
         urls = self.utils.delete_space(urls)
 
-        # 重複URL削除
-        if len(urls) != len(list(dict.fromkeys(urls))):
-            embed = discord.Embed(title=':warning:重複したURLは削除されました。', color=0xffffff)
+        # 重複URL削除（動画IDで比較）
+        urls, duplicates = Merge.dedupe(urls)
+        if duplicates:
+            embed = discord.Embed(
+                title=':warning:重複したURLは削除されました。',
+                description=f'{len(duplicates)}件の重複をスキップしました。',
+                color=0xffffff
+            )
             logger.debug('Delete Duplicate URLs')
-            await ctx.channel.send(embed=embed)
-
-        urls = list(dict.fromkeys(urls))
+            self.bot.messenger.post(ctx.channel, embed=embed)
         urls, error = self.utils.check_url(urls)
 
         if error:
@@ -145,7 +143,7 @@ class PlaylistCog(commands.Cog):
                 description='\n'.join(error),
                 color=0xff0000
             )
-            await ctx.channel.send(embed=embed)
+            self.bot.messenger.post(ctx.channel, embed=embed)
             logger.error(f'CheckURLErrors: {error}')
 
         if len(urls) == 0:
@@ -156,20 +154,16 @@ class PlaylistCog(commands.Cog):
             await ctx.followup.send(embed=embed)
             return
 
-        json_list = {'owner': [ctx.user.id], 'locked': locked, 'urls': urls}
         try:
-            with open(f'{playlist_path}{playlist}.json', 'w', encoding='utf-8') as f:
-                f.write(orjson.dumps(json_list, option=orjson.OPT_INDENT_2).decode('utf-8'))
-
-            os.chmod(f'{playlist_path}{playlist}.json', 0o666)
-
-        except Exception as e:
+            self.playlist.create_playlist(playlist, ctx.user.id, locked, urls)
+        except sqlite3.IntegrityError as e:
             embed = discord.Embed(
-                title=':warning:使用できない文字が入っています、別の名前に変えてください。',
-                color=0xffffff
+                title='プレイリスト作成',
+                description='プレイリストが既に存在します。',
+                color=0xff0000
             )
             await ctx.followup.send(embed=embed)
-            logger.warning(f'NameError_JSON: {e}')
+            logger.warning(f'Playlist already exists: {e}')
             return
 
         embed = discord.Embed(
@@ -177,17 +171,16 @@ class PlaylistCog(commands.Cog):
             description='以下のURLをを追加しました。',
             color=0xffffff
         )
-        self.playlist.record_play_date(f'{playlist}.json', datetime.now())
-        self.playlist.save_playlists_date()
+        self.playlist.record_play_date(playlist, datetime.now())
         await ctx.followup.send(embed=embed)
         logger.info(f'Create Playlist: {playlist}')
 
-        embed = self.utils.create_queue_embed(
+        await self.utils.send_paginated(
+            ctx.channel,
             urls,
             f'プレイリスト:{playlist}の曲の一覧',
             f'プレイリストに追加された曲数:{len(urls)}曲'
         )
-        await ctx.channel.send(embed=embed)
 
     @app_commands.command(name='プレイリストに曲を追加', description='プレイリストに曲を追加します。')
     @app_commands.describe(urls='動画のURL', playlist='プレイリスト名')
@@ -198,9 +191,7 @@ class PlaylistCog(commands.Cog):
         urls: str
     ):
         """プレイリストに曲を追加"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
@@ -214,11 +205,14 @@ class PlaylistCog(commands.Cog):
         urls = urls.split(',')
         urls = self.utils.delete_space(urls)
 
-        if len(urls) != len(list(dict.fromkeys(urls))):
-            embed = discord.Embed(title=':warning:重複したURLは削除されました。', color=0xffffff)
-            await ctx.channel.send(embed=embed)
-
-        urls = list(dict.fromkeys(urls))
+        urls, duplicates = Merge.dedupe(urls)
+        if duplicates:
+            embed = discord.Embed(
+                title=':warning:重複したURLは削除されました。',
+                description=f'{len(duplicates)}件の重複をスキップしました。',
+                color=0xffffff
+            )
+            self.bot.messenger.post(ctx.channel, embed=embed)
         urls, error = self.utils.check_url(urls)
 
         if error:
@@ -227,7 +221,7 @@ class PlaylistCog(commands.Cog):
                 description='\n'.join(error),
                 color=0xff0000
             )
-            await ctx.channel.send(embed=embed)
+            self.bot.messenger.post(ctx.channel, embed=embed)
             logger.error(f'CheckURLErrors: {error}')
 
         if len(urls) == 0:
@@ -238,8 +232,15 @@ class PlaylistCog(commands.Cog):
             await ctx.followup.send(embed=embed)
             return
 
-        with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-            json_list = orjson.loads(f.read())
+        async with self.playlist.lock(playlist):
+            json_list = self.playlist.get_playlist(playlist)
+            if json_list is None:
+                embed = discord.Embed(
+                    title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
+                    color=0xffff00
+                )
+                await ctx.followup.send(embed=embed)
+                return
             if json_list['locked']:
                 if ctx.user.id not in json_list['owner']:
                     embed = discord.Embed(
@@ -249,17 +250,23 @@ class PlaylistCog(commands.Cog):
                     await ctx.followup.send(embed=embed)
                     return
 
-            skip_urls = []
-
-        # 登録済みURL確認
-        for url in urls[:]:
-            if url in json_list['urls']:
-                skip_urls.append(url)
-                urls.remove(url)
+            # 登録済みURL確認
+            urls, skip_urls = Merge.merge(json_list['urls'], urls)
+            if urls:
+                try:
+                    self.playlist.add_urls(playlist, urls, expected_version=json_list['version'])
+                except PlaylistConflictError as e:
+                    logger.warning(f'⚠️ {e}')
+                    await ctx.followup.send(embed=self.conflict_embed(playlist))
+                    return
 
         if len(skip_urls) != 0:
-            embed = discord.Embed(title=':warning:登録済みのURLはスキップされました。', color=0xffff00)
-            await ctx.channel.send(embed=embed)
+            embed = discord.Embed(
+                title=':warning:登録済みのURLはスキップされました。',
+                description=f'{len(skip_urls)}件の登録済みURLをスキップしました。',
+                color=0xffff00
+            )
+            self.bot.messenger.post(ctx.channel, embed=embed)
 
         if len(urls) == 0:
             embed = discord.Embed(
@@ -269,38 +276,30 @@ class PlaylistCog(commands.Cog):
             await ctx.followup.send(embed=embed)
             return
 
-        json_list['urls'].extend(urls)
-        with open(f'{playlist_path}{playlist}.json', 'w', encoding='utf-8') as f:
-            f.write(orjson.dumps(json_list, option=orjson.OPT_INDENT_2).decode('utf-8'))
-
         embed = discord.Embed(
             title=f'プレイリスト:{playlist}に曲を追加しました。',
             description='以下のURLをを追加しました。',
             color=0xffffff
         )
-        self.playlist.record_play_date(f'{playlist}.json', datetime.now())
-        self.playlist.save_playlists_date()
+        self.playlist.record_play_date(playlist, datetime.now())
 
         endtime = time.time()
         logger.debug(f'Add Music to Playlist Command processing time: {endtime - start}sec')
         logger.info(f'Add Music to Playlist: {playlist}')
         await ctx.followup.send(embed=embed)
 
-        embed = self.utils.create_queue_embed(
+        await self.utils.send_paginated(
+            ctx.channel,
             urls,
             title=f'プレイリスト:{playlist}の曲の一覧',
-            footer=f'プレイリストに追加された曲数:{len(urls)}曲',
-            addPages=True
+            footer=f'プレイリストに追加された曲数:{len(urls)}曲'
         )
-        await ctx.channel.send(embed=embed)
 
     @app_commands.command(name='プレイリストを削除', description='プレイリストを削除します。')
     @app_commands.describe(playlist='プレイリスト名')
     async def delete_playlist(self, ctx: discord.Interaction, playlist: str):
         """プレイリストを削除"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
@@ -308,18 +307,17 @@ class PlaylistCog(commands.Cog):
             await ctx.response.send_message(embed=embed)
             return
 
-        with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-            json_list = orjson.loads(f.read())
-            if json_list['locked']:
-                if ctx.user.id not in json_list['owner']:
-                    embed = discord.Embed(
-                        title=f':warning:プレイリスト{playlist}は編集が禁止されています。',
-                        color=0xffff00
-                    )
-                    await ctx.response.send_message(embed=embed)
-                    return
+        json_list = self.playlist.get_playlist(playlist)
+        if json_list['locked']:
+            if ctx.user.id not in json_list['owner']:
+                embed = discord.Embed(
+                    title=f':warning:プレイリスト{playlist}は編集が禁止されています。',
+                    color=0xffff00
+                )
+                await ctx.response.send_message(embed=embed)
+                return
 
-        await ctx.response.send_modal(DeleteInput(playlist, playlist_path, self.playlist))
+        await ctx.response.send_modal(DeleteInput(playlist, self.playlist))
 
     @app_commands.command(name='プレイリストから曲を削除', description='プレイリストに登録された曲を削除します。')
     @app_commands.describe(urls='動画のURL', playlist='プレイリスト名')
@@ -330,9 +328,7 @@ class PlaylistCog(commands.Cog):
         urls: str
     ):
         """プレイリストから曲を削除"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
@@ -343,8 +339,15 @@ class PlaylistCog(commands.Cog):
         urls = urls.split(',')
         urls = self.utils.delete_space(urls)
 
-        with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-            json_list = orjson.loads(f.read())
+        async with self.playlist.lock(playlist):
+            json_list = self.playlist.get_playlist(playlist)
+            if json_list is None:
+                embed = discord.Embed(
+                    title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
+                    color=0xffff00
+                )
+                await ctx.response.send_message(embed=embed)
+                return
             if json_list['locked']:
                 if ctx.user.id not in json_list['owner']:
                     embed = discord.Embed(
@@ -354,21 +357,27 @@ class PlaylistCog(commands.Cog):
                     await ctx.response.send_message(embed=embed)
                     return
 
-        targets_urls = list(set(urls) & set(json_list['urls']))
+            json_list['urls'], targets_urls = Merge.subtract(json_list['urls'], urls)
 
-        if not targets_urls:
-            embed = discord.Embed(
-                title=':warning:指定されたURLはプレイリストに登録されていません。',
-                color=0xffff00
-            )
-            await ctx.response.send_message(embed=embed)
-            return
+            if not targets_urls:
+                embed = discord.Embed(
+                    title=':warning:指定されたURLはプレイリストに登録されていません。',
+                    color=0xffff00
+                )
+                await ctx.response.send_message(embed=embed)
+                return
 
-        for target in targets_urls:
-            json_list['urls'].remove(target)
+            try:
+                self.playlist.remove_urls_from_playlist(playlist, targets_urls,
+                                                        expected_version=json_list['version'])
+                if len(json_list['urls']) == 0:
+                    self.playlist.delete_playlist(playlist)
+            except PlaylistConflictError as e:
+                logger.warning(f'⚠️ {e}')
+                await ctx.response.send_message(embed=self.conflict_embed(playlist))
+                return
 
         if len(json_list['urls']) == 0:
-            os.remove(f'{playlist_path}{playlist}.json')
             embed = discord.Embed(
                 title=f':warning:プレイリストに登録されている曲がなくなったため、プレイリスト：{playlist}を削除しました。',
                 color=0xffff00
@@ -376,9 +385,6 @@ class PlaylistCog(commands.Cog):
             await ctx.response.send_message(embed=embed)
             return
 
-        with open(f'{playlist_path}{playlist}.json', 'w', encoding='utf-8') as f:
-            f.write(orjson.dumps(json_list, option=orjson.OPT_INDENT_2).decode('utf-8'))
-
         embed = discord.Embed(
             title=f'プレイリスト:{playlist}から曲を削除しました。',
             description='削除後のプレイリストの曲一覧はこちらです。',
@@ -386,16 +392,14 @@ class PlaylistCog(commands.Cog):
         )
         await ctx.response.send_message(embed=embed)
         logger.info(f'Delete Music from Playlist: {playlist}')
-        self.playlist.record_play_date(f'{playlist}.json', datetime.now())
-        self.playlist.save_playlists_date()
+        self.playlist.record_play_date(playlist, datetime.now())
 
-        embed = self.utils.create_queue_embed(
+        await self.utils.send_paginated(
+            ctx.channel,
             json_list["urls"],
             title=f'プレイリスト:{playlist}の曲の一覧',
-            footer=f'プレイリストに登録された曲数:{len(json_list["urls"])}曲',
-            addPages=True
+            footer=f'プレイリストに登録された曲数:{len(json_list["urls"])}曲'
         )
-        await ctx.channel.send(embed=embed)
 
     @app_commands.command(name='プレイリスト名を変更', description='プレイリスト名を変更します。')
     @app_commands.describe(playlist='プレイリスト名', new_playlist='新しいプレイリスト名')
@@ -406,16 +410,14 @@ class PlaylistCog(commands.Cog):
         new_playlist: str
     ):
         """プレイリスト名を変更"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
             )
             await ctx.response.send_message(embed=embed)
             return
-        elif os.path.exists(f'{playlist_path}{new_playlist}.json'):
+        elif self.playlist.check_file(new_playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{new_playlist}が既に存在します。',
                 color=0xffff00
@@ -423,7 +425,19 @@ class PlaylistCog(commands.Cog):
             await ctx.response.send_message(embed=embed)
             return
 
-        self.playlist.rename_playlist(playlist, new_playlist)
+        # 名前順にロックを取得し、逆方向の名前変更とのデッドロックを防ぐ
+        first, second = sorted((playlist, new_playlist))
+        async with self.playlist.lock(first), self.playlist.lock(second):
+            try:
+                self.playlist.rename_playlist(playlist, new_playlist)
+            except sqlite3.IntegrityError as e:
+                embed = discord.Embed(
+                    title=f':warning:プレイリスト{new_playlist}が既に存在します。',
+                    color=0xffff00
+                )
+                await ctx.response.send_message(embed=embed)
+                logger.warning(f'Playlist already exists: {e}')
+                return
         embed = discord.Embed(
             title=f'プレイリスト名を{new_playlist}に変更しました。',
             color=0xffffff
@@ -433,12 +447,7 @@ class PlaylistCog(commands.Cog):
     @app_commands.command(name='プレイリスト一覧を表示', description='登録されているプレイリスト一覧を表示します。')
     async def show_playlist(self, ctx: discord.Interaction):
         """プレイリスト一覧を表示"""
-        playlist_path = self.config.PLAYLIST_PATH
-        lists = [
-            os.path.splitext(file)[0]
-            for file in os.listdir(playlist_path)
-            if file.endswith('.json')
-        ]
+        lists = self.playlist.list_playlists()
         logger.debug(f'Playlist Files: {lists}')
 
         if lists == []:
@@ -455,23 +464,20 @@ class PlaylistCog(commands.Cog):
         )
         await ctx.response.send_message(embed=embed)
 
-        embed = self.utils.create_queue_embed(
-            lists,
+        await self.utils.send_paginated(
+            ctx.channel,
+            [f'{playlist} ({self.playlist.get_playlist_count(playlist)}曲)' for playlist in lists],
             title='登録されているプレイリスト一覧',
             footer=f'登録されているプレイリスト数:{len(lists)}',
-            addPages=True,
             getTitle=False
         )
-        await ctx.channel.send(embed=embed)
         logger.info('Show Playlist Command')
 
     @app_commands.command(name='プレイリストに登録されている曲を表示', description='プレイリストに登録された曲を表示します。')
     @app_commands.describe(playlist='プレイリスト名')
     async def show_music_from_playlist(self, ctx: discord.Interaction, playlist: str):
         """プレイリストの曲一覧を表示"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
@@ -479,21 +485,47 @@ class PlaylistCog(commands.Cog):
             await ctx.response.send_message(embed=embed)
             return
 
-        with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-            json_list = orjson.loads(f.read())
-            embed = discord.Embed(
-                title=f'プレイリスト:{playlist}に登録されている曲一覧',
-                color=0xffffff
-            )
-            await ctx.response.send_message(embed=embed)
+        json_list = self.playlist.get_playlist(playlist)
+        embed = discord.Embed(
+            title=f'プレイリスト:{playlist}に登録されている曲一覧',
+            color=0xffffff
+        )
+        await ctx.response.send_message(embed=embed)
 
-            embed = self.utils.create_queue_embed(
-                json_list['urls'],
-                title=f'プレイリスト:{playlist}の曲の一覧',
-                footer=f'プレイリストに登録された曲数:{len(json_list["urls"])}曲',
-                addPages=True
-            )
-            await ctx.channel.send(embed=embed)
+        await self.utils.send_paginated(
+            ctx.channel,
+            json_list['urls'],
+            title=f'プレイリスト:{playlist}の曲の一覧',
+            footer=f'プレイリストに登録された曲数:{len(json_list["urls"])}曲'
+        )
+
+    @app_commands.command(name='プレイリストの統計を表示', description='よく使うプレイリストやよく再生される曲を表示します。')
+    @app_commands.describe(limit='表示する件数')
+    async def show_stats(self, ctx: discord.Interaction, limit: app_commands.Range[int, 1, 25] = 10):
+        """利用統計を表示"""
+        usage = self.playlist.get_usage(limit)
+
+        embed = discord.Embed(title='📊 利用統計', color=0xffffff)
+        embed.add_field(
+            name='よく再生されるプレイリスト',
+            value='\n'.join(f'{i}. {playlist} ({count}回)'
+                            for i, (playlist, count) in enumerate(usage['most_used'], start=1)) or 'なし',
+            inline=False
+        )
+        embed.add_field(
+            name='最近使用したプレイリスト',
+            value='\n'.join(f'{i}. {playlist} ({date:%Y-%m-%d %H:%M})'
+                            for i, (playlist, date) in enumerate(usage['recently_used'], start=1)) or 'なし',
+            inline=False
+        )
+        embed.add_field(
+            name='よく再生される曲',
+            value='\n'.join(f'{i}. {url} ({plays}回)'
+                            for i, (url, plays) in enumerate(usage['top_tracks'], start=1))[:1024] or 'なし',
+            inline=False
+        )
+        await ctx.response.send_message(embed=embed)
+        logger.info('Show Stats Command')
 
     @app_commands.command(name='プレイリストのロックを変更', description='プレイリストの編集ロックを変更します。')
     @app_commands.describe(playlist='プレイリスト名', locked='プレイリストの編集を禁止する')
@@ -504,9 +536,7 @@ class PlaylistCog(commands.Cog):
         locked: bool
     ):
         """プレイリストのロック設定を変更"""
-        playlist_path = self.config.PLAYLIST_PATH
-
-        if not os.path.exists(f'{playlist_path}{playlist}.json'):
+        if not self.playlist.check_file(playlist):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xffff00
@@ -516,8 +546,7 @@ class PlaylistCog(commands.Cog):
 
         await ctx.response.defer()
 
-        with open(f'{playlist_path}{playlist}.json', 'r', encoding='utf-8') as f:
-            json_list = orjson.loads(f.read())
+        json_list = self.playlist.get_playlist(playlist)
 
         if ctx.user.id not in json_list['owner']:
             embed = discord.Embed(
@@ -527,9 +556,12 @@ class PlaylistCog(commands.Cog):
             await ctx.followup.send(embed=embed)
             return
 
-        json_list['locked'] = locked
-        with open(f'{playlist_path}{playlist}.json', 'w', encoding='utf-8') as f:
-            f.write(orjson.dumps(json_list, option=orjson.OPT_INDENT_2).decode('utf-8'))
+        try:
+            self.playlist.set_locked(playlist, locked, expected_version=json_list['version'])
+        except PlaylistConflictError as e:
+            logger.warning(f'⚠️ {e}')
+            await ctx.followup.send(embed=self.conflict_embed(playlist))
+            return
 
         result = 'ロックを有効化しました。' if locked else 'ロックを無効化しました。'
         embed = discord.Embed(
@@ -550,15 +582,13 @@ class PlaylistCog(commands.Cog):
         child_playlist: str
     ):
         """プレイリストを結合"""
-        playlist_path = self.config.PLAYLIST_PATH
-
         if parent_playlist == child_playlist:
             embed = discord.Embed(title=':warning:同じプレイリスト同士は結合できません。', color=0xffff00)
             await ctx.response.send_message(embed=embed)
             return
 
-        if not (os.path.exists(f'{playlist_path}{parent_playlist}.json') and
-                os.path.exists(f'{playlist_path}{child_playlist}.json')):
+        if not (self.playlist.check_file(parent_playlist) and
+                self.playlist.check_file(child_playlist)):
             embed = discord.Embed(
                 title=f':warning:プレイリスト{parent_playlist}または{child_playlist}が存在しません、名前が合っているか確認してください。',
                 color=0xff0000
@@ -568,33 +598,43 @@ class PlaylistCog(commands.Cog):
 
         await ctx.response.defer()
 
-        with open(f'{playlist_path}{parent_playlist}.json', 'r', encoding='utf-8') as f:
-            parent_json = orjson.loads(f.read())
-
-        if parent_json['locked']:
-            if ctx.user.id not in parent_json['owner']:
+        async with self.playlist.lock(parent_playlist):
+            parent_json = self.playlist.get_playlist(parent_playlist)
+            child_json = self.playlist.get_playlist(child_playlist)
+            if parent_json is None or child_json is None:
                 embed = discord.Embed(
-                    title=f':warning:プレイリスト{parent_playlist}は編集が禁止されています。',
-                    color=0xffff00
+                    title=f':warning:プレイリスト{parent_playlist}または{child_playlist}が存在しません、名前が合っているか確認してください。',
+                    color=0xff0000
                 )
                 await ctx.followup.send(embed=embed)
                 return
 
-        with open(f'{playlist_path}{child_playlist}.json', 'r', encoding='utf-8') as f:
-            child_json = orjson.loads(f.read())
-
-        skip_urls = []
+            if parent_json['locked']:
+                if ctx.user.id not in parent_json['owner']:
+                    embed = discord.Embed(
+                        title=f':warning:プレイリスト{parent_playlist}は編集が禁止されています。',
+                        color=0xffff00
+                    )
+                    await ctx.followup.send(embed=embed)
+                    return
 
-        for url in child_json['urls'][:]:
-            if url not in parent_json['urls']:
-                parent_json['urls'].append(url)
-            else:
-                child_json['urls'].remove(url)
-                skip_urls.append(url)
+            child_json['urls'], skip_urls = Merge.merge(parent_json['urls'], child_json['urls'])
+            if child_json['urls']:
+                try:
+                    self.playlist.add_urls(parent_playlist, child_json['urls'],
+                                           expected_version=parent_json['version'])
+                except PlaylistConflictError as e:
+                    logger.warning(f'⚠️ {e}')
+                    await ctx.followup.send(embed=self.conflict_embed(parent_playlist))
+                    return
 
         if len(skip_urls) != 0:
-            embed = discord.Embed(title=':warning:登録済みのURLはスキップされました。', color=0xffff00)
-            await ctx.channel.send(embed=embed)
+            embed = discord.Embed(
+                title=':warning:登録済みのURLはスキップされました。',
+                description=f'{len(skip_urls)}件の登録済みURLをスキップしました。',
+                color=0xffff00
+            )
+            self.bot.messenger.post(ctx.channel, embed=embed)
 
         if len(child_json['urls']) == 0:
             embed = discord.Embed(
@@ -604,27 +644,148 @@ class PlaylistCog(commands.Cog):
             await ctx.followup.send(embed=embed)
             return
 
-        json_list = {
-            'owner': parent_json['owner'],
-            'locked': parent_json['locked'],
-            'urls': parent_json['urls']
-        }
-        with open(f'{playlist_path}{parent_playlist}.json', 'w', encoding='utf-8') as f:
-            f.write(orjson.dumps(json_list, option=orjson.OPT_INDENT_2).decode('utf-8'))
-
         embed = discord.Embed(
             title=f'プレイリスト:{child_playlist}を{parent_playlist}に結合しました。',
             color=0xffffff
         )
         await ctx.followup.send(embed=embed)
 
-        embed = self.utils.create_queue_embed(
+        await self.utils.send_paginated(
+            ctx.channel,
             child_json['urls'],
             title=f'プレイリスト:{parent_playlist}に追加された曲の一覧',
-            footer=f'プレイリストに登録された曲数:{len(child_json["urls"])}曲',
-            addPages=True
+            footer=f'プレイリストに登録された曲数:{len(child_json["urls"])}曲'
         )
-        await ctx.channel.send(embed=embed)
+
+    @app_commands.command(name='プレイリストにインポート',
+                          description='YouTubeの再生リストやニコニコのマイリストをプレイリストに取り込みます。')
+    @app_commands.describe(
+        playlist='取り込み先のプレイリスト名（存在しない場合は作成）',
+        url='YouTube再生リストまたはニコニコ動画マイリストのURL',
+        locked='新しく作成するプレイリストの編集を禁止する'
+    )
+    async def import_playlist(
+        self,
+        ctx: discord.Interaction,
+        playlist: str,
+        url: str,
+        locked: bool = False
+    ):
+        """外部プレイリストをインポート"""
+        logger.info(f'📥 /プレイリストにインポート - ユーザー: {ctx.user.display_name}, URL: {url}')
+        start = time.time()
+
+        json_list = self.playlist.get_playlist(playlist)
+        if json_list is not None and json_list['locked'] and ctx.user.id not in json_list['owner']:
+            embed = discord.Embed(
+                title=f':warning:プレイリスト{playlist}は編集が禁止されています。',
+                color=0xffff00
+            )
+            await ctx.response.send_message(embed=embed)
+            return
+
+        await ctx.response.defer()
+        embed = discord.Embed(title=f'プレイリスト:{playlist}にインポート中...', description='取得を開始しました。',
+                              color=0x0099ff)
+        message = await ctx.followup.send(embed=embed, wait=True)
+
+        if json_list is None:
+            json_list = {'owner': [ctx.user.id], 'locked': locked, 'urls': []}
+
+        # yt-dlpの展開はスレッドで行い、バッチごとにイベントループへ渡す
+        loop = asyncio.get_running_loop()
+        batches = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                batch = []
+                for entry_url in self.downloader.iter_playlist_urls(url):
+                    if stop.is_set():
+                        return
+                    batch.append(entry_url)
+                    if len(batch) >= self.IMPORT_BATCH_SIZE:
+                        loop.call_soon_threadsafe(batches.put_nowait, batch)
+                        batch = []
+                if batch:
+                    loop.call_soon_threadsafe(batches.put_nowait, batch)
+                loop.call_soon_threadsafe(batches.put_nowait, None)
+            except Exception as e:
+                loop.call_soon_threadsafe(batches.put_nowait, e)
+
+        producer = loop.run_in_executor(None, produce)
+
+        seen = Merge.track_set(json_list['urls'])
+        version = json_list.get('version')
+        fetched = added = skipped = 0
+        last_update = time.monotonic()
+        error = None
+
+        try:
+            while True:
+                batch = await batches.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    error = batch
+                    break
+                # バッチごとにロックを取得し、他の編集を長時間待たせない
+                try:
+                    async with self.playlist.lock(playlist):
+                        current_version = self.playlist.get_playlist_version(playlist)
+                        if current_version is None:
+                            self.playlist.create_playlist(playlist, ctx.user.id, locked, [])
+                            current_version = self.playlist.get_playlist_version(playlist)
+                            seen = set()
+                        elif current_version != version:
+                            # 他の操作で変更されていれば登録済みURLを読み直す
+                            seen = Merge.track_set(self.playlist.get_playlist(playlist)['urls'])
+                        # 読み込み済みの登録済み曲に追加していく
+                        new_urls, skip_urls = Merge.merge((), batch, seen)
+                        if new_urls:
+                            self.playlist.add_urls(playlist, new_urls, expected_version=current_version)
+                            current_version += 1
+                        version = current_version
+                except (PlaylistConflictError, sqlite3.Error) as e:
+                    # 取り込みを止める（取得スレッドはfinallyで止める）
+                    error = e
+                    break
+                fetched += len(batch)
+                added += len(new_urls)
+                skipped += len(skip_urls)
+
+                if time.monotonic() - last_update >= self.IMPORT_PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    embed.description = f'{fetched}曲を取得 - 追加: {added}曲, スキップ: {skipped}曲'
+                    try:
+                        await message.edit(embed=embed)
+                    except discord.HTTPException as e:
+                        logger.warning(f'⚠️ インポート進捗の更新に失敗しました: {e}')
+        finally:
+            # 途中で終了しても取得スレッドを止める
+            stop.set()
+
+        await producer
+
+        async with self.playlist.lock(playlist):
+            if self.playlist.get_playlist_count(playlist) == 0:
+                self.playlist.delete_playlist(playlist)
+
+        if error is not None:
+            logger.error(f'❌ プレイリストのインポートに失敗しました: {error}')
+            embed.title = f':warning:プレイリスト:{playlist}へのインポート中にエラーが発生しました。'
+            embed.color = 0xff0000
+            embed.description = f'{added}曲を追加しました。\nエラー内容: {error}'
+        else:
+            embed.title = f'プレイリスト:{playlist}へのインポートが完了しました。'
+            embed.color = 0xffffff
+            embed.description = f'{fetched}曲を取得 - 追加: {added}曲, スキップ: {skipped}曲'
+            self.playlist.record_play_date(playlist, datetime.now())
+        embed.set_footer(text=f'プレイリストに登録された曲数:{self.playlist.get_playlist_count(playlist)}曲')
+        await message.edit(embed=embed)
+
+        logger.info(f'📥 インポート完了 - {playlist}: 追加{added}曲, スキップ{skipped}曲, '
+                    f'処理時間: {time.time() - start:.2f}秒')
 
 
 async def setup(bot: commands.Bot):
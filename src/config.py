@@ -9,6 +9,8 @@ from typing import Optional
 
 import orjson
 
+from Persistence import atomic_write
+
 
 @dataclass
 class BotConfig:
@@ -18,6 +20,8 @@ class BotConfig:
     vc_channel_id: int
     channel_id: int
     interrupt: bool = False
+    fair_queue: bool = False
+    buffer_preroll_ms: int = 500
 
 
 class ConfigManager:
@@ -27,6 +31,7 @@ class ConfigManager:
     DISCORD_TOKEN_FOLDER = '../DiscordTokens/'
     PLAYLIST_PATH = '/Lists/'
     PLAYLIST_DATES_PATH = './data/playlist_date.json'
+    PLAYLIST_DB_PATH = './data/playlists.sqlite3'
     LOG_PATH = './Log/PlayAudio.log'
     SETTING_PATH = './Settings/settings.json'
 
@@ -76,12 +81,15 @@ class ConfigManager:
                 vc_channel_id = int(v.read().strip())
                 channel_id = int(c.read().strip())
 
+            settings = self.load_settings()
             self._config = BotConfig(
                 token=token,
                 guild_id=guild_id,
                 vc_channel_id=vc_channel_id,
                 channel_id=channel_id,
-                interrupt=self.load_settings().get('interrupt', False)
+                interrupt=settings.get('interrupt', False),
+                fair_queue=settings.get('fair_queue', False),
+                buffer_preroll_ms=settings.get('buffer_preroll_ms', 500)
             )
 
             self.logger.info('✅ Discordトークンの読み込みが完了しました')
@@ -95,18 +103,18 @@ class ConfigManager:
     def load_settings(self) -> dict:
         """設定ファイルを読み込み"""
         if not os.path.exists(self.SETTING_PATH):
-            self.save_settings({'interrupt': False})
-            return {'interrupt': False}
+            self.save_settings({'interrupt': False, 'fair_queue': False, 'buffer_preroll_ms': 500})
+            return {'interrupt': False, 'fair_queue': False, 'buffer_preroll_ms': 500}
 
         with open(self.SETTING_PATH, 'r') as f:
             settings = orjson.loads(f.read())
-            self.logger.info(f'⚙️ 設定の読み込みが完了しました - 割り込み機能: {settings.get("interrupt", False)}')
+            self.logger.info(f'⚙️ 設定の読み込みが完了しました - 割り込み機能: {settings.get("interrupt", False)}, '
+                             f'公平キュー: {settings.get("fair_queue", False)}')
             return settings
 
     def save_settings(self, settings: dict):
         """設定ファイルを保存"""
-        with open(self.SETTING_PATH, 'w') as f:
-            f.write(orjson.dumps(settings, option=orjson.OPT_INDENT_2).decode('utf-8'))
+        atomic_write(self.SETTING_PATH, orjson.dumps(settings, option=orjson.OPT_INDENT_2))
 
     @property
     def config(self) -> BotConfig:
@@ -6,7 +6,7 @@ PlayAudio Discord Bot - エントリーポイント
 各機能は以下のCogに分割されています：
 - cogs/music.py: 音楽再生機能（play, queue, skip, loop）
 - cogs/playlist.py: プレイリスト管理機能
-- cogs/admin.py: 管理機能（reset, log, settings, update）
+- cogs/admin.py: 管理機能（reset, log, settings, update, health）
 """
 
 import asyncio
@@ -18,9 +18,12 @@ from discord.ext import commands
 # 各モジュールのインポート
 from config import config_manager
 import Downloader as DownloaderModule
+import FanOut as FanOutModule
+import Messenger as MessengerModule
 import Player as PlayerModule
 import Playlist as PlaylistModule
 import Queue as QueueModule
+import Supervisor as SupervisorModule
 import UpdateManager as UpdateManagerModule
 import Utils as UtilsModule
 
@@ -43,10 +46,20 @@ except FileNotFoundError:
 # 各クラスのインスタンス化
 Downloader = DownloaderModule.Downloader()
 Player = PlayerModule.Player()
-Playlist = PlaylistModule.Playlist(config_manager.PLAYLIST_PATH, config_manager.PLAYLIST_DATES_PATH)
-Queue = QueueModule.Queue()
+Playlist = PlaylistModule.Playlist(
+    config_manager.PLAYLIST_PATH,
+    config_manager.PLAYLIST_DATES_PATH,
+    config_manager.PLAYLIST_DB_PATH
+)
+Queue = QueueModule.Queue(fair=bot_config.fair_queue)
 Utils = UtilsModule.Utils()
 UpdateManager = UpdateManagerModule.UpdateManager()
+UpdateManager.shutdown_hooks.append(Playlist.close)
+Utils.title_store = Playlist
+Messenger = MessengerModule.Messenger()
+Utils.messenger = Messenger
+FanOut = FanOutModule.FanOut()
+Supervisor = SupervisorModule.FFmpegSupervisor()
 
 
 class PlayAudioBot(commands.Bot):
@@ -64,6 +77,9 @@ class PlayAudioBot(commands.Bot):
 
         self.config_manager = config_manager
         self.guild = GUILD
+        self.messenger = Messenger
+        self.fanout = FanOut
+        self.supervisor = Supervisor
 
         # Cogインスタンスを保持
         self.music_cog = None
@@ -85,7 +101,8 @@ class PlayAudioBot(commands.Bot):
             self,
             config_manager,
             Playlist,
-            Utils
+            Utils,
+            Downloader
         )
         self.admin_cog = AdminCog(
             self,
@@ -93,13 +110,17 @@ class PlayAudioBot(commands.Bot):
             Queue,
             Utils,
             UpdateManager,
-            self.music_cog
+            self.music_cog,
+            Playlist
         )
 
         await self.add_cog(self.music_cog)
         await self.add_cog(self.playlist_cog)
         await self.add_cog(self.admin_cog)
 
+        # FFmpegプロセスの監視を開始
+        Supervisor.start()
+
         # オートコンプリートの設定
         self._setup_autocomplete()
 
@@ -123,6 +144,7 @@ class PlayAudioBot(commands.Bot):
             'プレイリスト名を変更',
             'プレイリストに登録されている曲を表示',
             'プレイリストのロックを変更',
+            'プレイリストにインポート',
         ]
 
         for cmd_name in playlist_commands:
@@ -236,16 +258,26 @@ class PlayAudioBot(commands.Bot):
         if updated_packages:
             await UpdateManager.restart_bot()
 
+    async def close(self):
+        """ボット終了時の処理"""
+        # 送信待ちのメッセージと保留中のプレイリスト使用履歴を保存
+        await Messenger.flush()
+        Playlist.close()
+        Supervisor.stop()
+        await super().close()
+
     async def on_voice_state_update(self, member, before, after):
         """ボイスチャンネル状態更新時の処理"""
         voice_state = member.guild.voice_client
 
         if voice_state is not None and len(voice_state.channel.members) == 1:
-            voice_state.cleanup()
-
-            # MusicCogの状態をリセット
+            # MusicCogの状態をリセット（再生中の曲を止めてからクリーンアップする）
             if self.music_cog:
-                self.music_cog.reset_state()
+                await self.music_cog.reset_state()
+
+            voice_state.cleanup()
+            # 停止後も残っているFFmpegプロセスを強制終了
+            await asyncio.to_thread(Supervisor.kill_all, member.guild.id)
 
             Queue.clear_queue()
             await self.change_presence(activity=None)
@@ -263,7 +295,7 @@ class PlayAudioBot(commands.Bot):
             title=f'🚨 重大なエラーが発生しました: {error}',
             color=0xff0000
         )
-        await interaction.channel.send(embed=embed)
+        self.messenger.post(interaction.channel, embed=embed)
 
 
 def main():
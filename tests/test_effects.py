@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+import Effects
+
+RATE = 48000
+SAMPLES = 960
+
+
+class SineSource:
+    """440 Hz stereo sine in 20 ms frames"""
+
+    def __init__(self, frames: int, amplitude: float = 20000):
+        t = np.arange(SAMPLES * frames) / RATE
+        self.signal = (np.sin(2 * np.pi * 440 * t) * amplitude).astype(np.int16)
+        self.frame = 0
+
+    def read(self) -> bytes:
+        start = self.frame * SAMPLES
+        self.frame += 1
+        frame = self.signal[start:start + SAMPLES]
+        if len(frame) < SAMPLES:
+            return b''
+        return np.repeat(frame[:, None], 2, axis=1).tobytes()
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def test_switching_bypass_does_not_jump():
+    chain = Effects.EffectsChain()
+    original = SineSource(200)
+    source = Effects.EffectsSource(original, chain)
+    played = []
+    for frame in range(200):
+        if frame == 50:
+            chain.set_volume(0.99)
+        elif frame == 100:
+            chain.set_volume(1.0)
+        played.append(np.frombuffer(source.read(), dtype=np.int16)[::2].astype(int))
+    played = np.concatenate(played)
+    # After the initial delay, the largest step is the one of the sine itself
+    natural = np.abs(np.diff(original.signal.astype(int))).max()
+    assert np.abs(np.diff(played[SAMPLES:])).max() <= natural + 1
+    # Bypassed output is the input delayed by half the EQ filter
+    delay = (Effects.EffectsSource.TAPS - 1) // 2
+    assert np.array_equal(played[delay:SAMPLES * 50], original.signal[:SAMPLES * 50 - delay])
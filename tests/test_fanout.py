@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from FanOut import FanOut
+
+FRAMES = 1500
+CAPACITY = 250
+
+
+class CountingSource:
+    """Decodes numbered frames as fast as it is read"""
+
+    def __init__(self, frames: int = FRAMES):
+        self.frames = frames
+        self.read_count = 0
+
+    def read(self) -> bytes:
+        if self.read_count >= self.frames:
+            return b''
+        self.read_count += 1
+        return (self.read_count - 1).to_bytes(4, 'big')
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def play(reader, received: list, interval: float = 0.0, delay: float = 0.0, stop: int = None):
+    """Read like the voice thread does until the end (or stop frames)"""
+    time.sleep(delay)
+    while stop is None or len(received) < stop:
+        data = reader.read()
+        if not data:
+            break
+        received.append(int.from_bytes(data, 'big'))
+        if interval:
+            time.sleep(interval)
+
+
+def test_readers_out_of_phase_lose_no_frames():
+    fanout = FanOut()
+    source = CountingSource()
+    readers = [fanout.open('track', lambda: source, capacity=CAPACITY, preroll=5) for _ in range(2)]
+    received = [[], []]
+    threads = [threading.Thread(target=play, args=(reader, frames, 0.0005, 0.001 * n))
+               for n, (reader, frames) in enumerate(zip(readers, received))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    for reader, frames in zip(readers, received):
+        assert frames == list(range(FRAMES))
+        assert reader.skipped == 0
+        reader.cleanup()
+    assert fanout.stats() == {'decoders': 0, 'readers': 0}
+
+
+def test_paused_reader_is_dropped_without_stalling_the_others():
+    fanout = FanOut()
+    playing = fanout.open('track', CountingSource, capacity=CAPACITY, preroll=5)
+    paused = fanout.open('track', CountingSource, capacity=CAPACITY, preroll=5)
+    first, second = [], []
+    play(paused, second, stop=10)
+    thread = threading.Thread(target=play, args=(playing, first))
+    thread.start()
+    thread.join(30)
+    assert first == list(range(FRAMES))
+    assert paused.dropped
+    # Resuming skips ahead to the oldest frame still buffered
+    play(paused, second)
+    assert second[:10] == list(range(10))
+    assert second[10] == FRAMES - CAPACITY and second[-1] == FRAMES - 1
+    assert paused.skipped == FRAMES - CAPACITY - 10
+    playing.cleanup()
+    paused.cleanup()
+
+
+def test_first_reader_sees_the_start_of_a_fast_decoder():
+    fanout = FanOut()
+    source = CountingSource()
+    reader = fanout.open('track', lambda: source, capacity=CAPACITY, preroll=5)
+    time.sleep(0.1)
+    assert source.read_count == CAPACITY
+    assert int.from_bytes(reader.read(), 'big') == 0
+    reader.cleanup()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import discord
+
+from Messenger import Messenger
+
+
+class FakeChannel:
+    """Records what would be sent"""
+
+    def __init__(self):
+        self.id = 1
+        self.sent = []
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+        return len(self.sent)
+
+
+def messenger() -> Messenger:
+    messenger = Messenger(rate=100.0, capacity=100)
+    messenger.COALESCE_DELAY = 0.01
+    return messenger
+
+
+def test_small_notices_are_merged():
+    async def main():
+        channel = FakeChannel()
+        m = messenger()
+        futures = [m.post(channel, embed=discord.Embed(title=f'notice {n}')) for n in range(3)]
+        assert await asyncio.gather(*futures) == [1, 1, 1]
+        assert len(channel.sent) == 1
+        assert len(channel.sent[0]['embeds']) == 3
+
+    asyncio.run(main())
+
+
+def test_embeds_over_the_total_size_are_not_merged():
+    async def main():
+        channel = FakeChannel()
+        m = messenger()
+        first = m.post(channel, embed=discord.Embed(title='errors', description='a' * 3500))
+        second = m.post(channel, embed=discord.Embed(title='queue', description='b' * 3500))
+        assert await asyncio.gather(first, second) == [1, 2]
+        # Discord rejects a message whose embeds total more than 6000 characters
+        for message in channel.sent:
+            assert sum(len(embed) for embed in message['embeds']) <= 6000
+
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from Persistence import WriteBehind, atomic_write
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+SIZE = 4 * 1024 * 1024
+
+# Rewrites the file with alternating full versions until it is killed
+WRITER = f'''
+import sys
+sys.path.insert(0, {SRC!r})
+from Persistence import atomic_write
+path = sys.argv[1]
+version = 0
+while True:
+    version += 1
+    atomic_write(path, bytes([version % 251]) * {SIZE})
+    sys.stdout.write('.')
+    sys.stdout.flush()
+'''
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / 'settings.json'
+    atomic_write(str(path), b'old')
+    os.chmod(path, 0o600)
+    atomic_write(str(path), b'new')
+    assert path.read_bytes() == b'new'
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ['settings.json']
+
+
+def test_atomic_write_survives_sigkill(tmp_path):
+    """A writer killed at a random point leaves a complete old or new version"""
+    path = tmp_path / 'data.bin'
+    atomic_write(str(path), b'\0' * SIZE)
+    random.seed(0)
+    for _ in range(20):
+        writer = subprocess.Popen([sys.executable, '-c', WRITER, str(path)], stdout=subprocess.PIPE)
+        # Wait until it is rewriting the file, then kill it somewhere inside atomic_write
+        writer.stdout.read(1)
+        time.sleep(random.uniform(0, 0.05))
+        writer.send_signal(signal.SIGKILL)
+        writer.wait()
+        writer.stdout.close()
+
+        data = path.read_bytes()
+        assert len(data) == SIZE
+        assert data.count(data[:1]) == SIZE, 'file is a mix of two versions'
+
+
+def test_write_behind_coalesces_and_refuses_after_close():
+    flushes = []
+
+    async def main():
+        writer = WriteBehind(lambda: flushes.append(time.monotonic()), interval=0.05, name='test')
+        for _ in range(100):
+            writer.mark_dirty()
+        await asyncio.sleep(0.1)
+        assert len(flushes) == 1
+
+        writer.mark_dirty()
+        handle = writer._handle
+        writer.close()
+        assert len(flushes) == 2
+        assert handle.cancelled() and writer._handle is None
+
+        writer.mark_dirty()
+        await asyncio.sleep(0.1)
+        assert len(flushes) == 2 and not writer.dirty
+
+    asyncio.run(main())
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import random
+import threading
+import time
+
+import Audio
+import Events
+import Playback
+from Queue import Queue
+
+
+def url(n: int) -> str:
+    return f'https://www.youtube.com/watch?v={n:011d}'
+
+
+class FakePCM:
+    """Decoder that counts cleanups"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.cleanups = 0
+
+    def read(self) -> bytes:
+        return b''
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        self.cleanups += 1
+
+
+class FakeStream:
+    """Resolved stream that records every source it opens"""
+    duration = None
+    is_live = False
+    reusable = False
+
+    def __init__(self, url: str):
+        self.url = url
+        self.sources = []
+        self.closes = 0
+
+    def open(self, start: float = 0.0):
+        pcm = FakePCM(self)
+        self.sources.append(pcm)
+        return Audio.TrackedSource(pcm, offset=start)
+
+    def close(self):
+        self.closes += 1
+
+
+class FakeVoiceClient:
+    """VoiceClient whose player thread ends a track after a short random time, or on stop()"""
+    def __init__(self, auto_end: bool = True):
+        self.auto_end = auto_end
+        self.source = None
+        self.after = None
+        self.paused = False
+        self.plays = 0
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def is_playing(self) -> bool:
+        return self.source is not None and not self.paused
+
+    def is_paused(self) -> bool:
+        return self.source is not None and self.paused
+
+    def play(self, source, after):
+        with self._lock:
+            assert self.source is None, 'play() while a source is playing'
+            self.source, self.after, self.paused = source, after, False
+            self.plays += 1
+        if self.auto_end:
+            timer = threading.Timer(random.uniform(0.001, 0.02), self._finish, args=(source,))
+            self.threads.append(timer)
+            timer.start()
+
+    def _finish(self, source):
+        # Like discord.player.AudioPlayer: cleanup the source, then call after
+        with self._lock:
+            if self.source is not source:
+                return
+            self.source = None
+            after = self.after
+        source.cleanup()
+        after(None)
+
+    def stop(self):
+        with self._lock:
+            source, after, self.source = self.source, self.after, None
+        if source is not None:
+            thread = threading.Thread(target=lambda: (source.cleanup(), after(None)))
+            self.threads.append(thread)
+            thread.start()
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+class Harness:
+    def __init__(self, auto_end: bool = True):
+        self.queue = Queue()
+        self.events = Events.EventBus()
+        self.vc = FakeVoiceClient(auto_end)
+        self.streams = []
+        self.started = []
+        self.skipped = []
+        self.popped = []
+        pop_queue = self.queue.pop_queue
+        self.queue.pop_queue = lambda: self.popped.append(pop_queue()) or self.popped[-1]
+        self.events.subscribe(Events.TRACK_STARTED, lambda url, loop: self.started.append(url))
+        self.events.subscribe(Events.TRACK_SKIPPED, lambda url: self.skipped.append(url))
+        self.controller = Playback.PlaybackController(self.queue, self.resolve, self.events)
+
+    async def resolve(self, url: str) -> FakeStream:
+        stream = FakeStream(url)
+        self.streams.append(stream)
+        return stream
+
+    async def settle(self):
+        """Wait for player threads and the after callbacks they queued"""
+        await asyncio.to_thread(self.vc.join)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+
+    def assert_released(self):
+        for stream in self.streams:
+            assert stream.closes >= 1, f'stream not closed: {stream.url}'
+            for pcm in stream.sources:
+                assert pcm.cleanups >= 1, f'source not cleaned up: {stream.url}'
+
+
+def test_stress_concurrent_play_skip_stop():
+    """Hundreds of commands per second from concurrent callers"""
+    async def main():
+        random.seed(1)
+        h = Harness()
+        pc = h.controller
+        added = []
+        commands = 0
+        deadline = time.monotonic() + 1.5
+        while time.monotonic() < deadline:
+            urls = [url(len(added) + i) for i in range(5)]
+            added.extend(urls)
+            h.queue.add_queue(urls, False)
+            calls = []
+            for _ in range(50):
+                r = random.random()
+                if r < 0.5:
+                    calls.append(pc.skip(random.randint(1, 3)))
+                elif r < 0.8:
+                    calls.append(pc.play(h.vc))
+                elif r < 0.9:
+                    calls.append(pc.pause())
+                elif r < 0.95:
+                    calls.append(pc.resume())
+                else:
+                    calls.append(pc.stop())
+            await asyncio.gather(*calls)
+            commands += len(calls)
+            await asyncio.sleep(0.002)
+
+        await pc.stop()
+        await h.settle()
+        assert commands / 1.5 > 200
+        assert h.started, 'nothing played'
+        # Every popped URL was started exactly once and came from the queue
+        assert len(h.popped) == len(set(h.popped)), 'URL popped twice'
+        assert h.started == h.popped
+        assert set(h.popped) <= set(added)
+        # Consistent final state with nothing left open
+        assert pc.state == Playback.State.IDLE
+        assert pc.current is None
+        assert not h.vc.is_playing() and not h.vc.is_paused()
+        h.assert_released()
+
+    asyncio.run(main())
+
+
+def test_consecutive_skips_are_merged():
+    async def main():
+        h = Harness(auto_end=False)
+        pc = h.controller
+        h.queue.add_queue([url(n) for n in range(6)], False)
+        assert await pc.play(h.vc)
+        assert h.started == [url(0)]
+
+        # Submitted before the worker runs again, handled as one skip(3)
+        results = await asyncio.gather(pc.skip(), pc.skip(), pc.skip())
+        assert results == [True, True, True]
+        assert h.skipped == [url(0)]
+        assert h.started == [url(0), url(3)]
+        assert pc.current == url(3)
+        assert len(h.queue) == 2
+
+        await pc.stop()
+        await h.settle()
+        h.assert_released()
+
+    asyncio.run(main())
+
+
+def test_stale_after_callback_is_ignored():
+    async def main():
+        h = Harness(auto_end=False)
+        pc = h.controller
+        h.queue.add_queue([url(n) for n in range(3)], False)
+        await pc.play(h.vc)
+        first_after = h.vc.after
+
+        await pc.skip()
+        assert pc.current == url(1)
+        await h.settle()
+        # The after callback of the skipped track fires again (e.g. late from the audio thread)
+        first_after(None)
+        await h.settle()
+        assert pc.current == url(1)
+        assert pc.state == Playback.State.PLAYING
+        assert h.started == [url(0), url(1)]
+        assert len(h.queue) == 1
+
+        # The current track's own callback still advances
+        h.vc._finish(h.vc.source)
+        await h.settle()
+        assert pc.current == url(2)
+
+        await pc.stop()
+        await h.settle()
+        h.assert_released()
+
+    asyncio.run(main())
+
+
+def test_watchdog_runs_only_while_playing():
+    async def main():
+        h = Harness(auto_end=False)
+        pc = h.controller
+        pc.WATCHDOG_INTERVAL = 0.01
+        h.queue.add_queue([url(n) for n in range(2)], False)
+        # No command yet, nothing polls
+        assert pc._watchdog is None
+
+        await pc.play(h.vc)
+        assert pc._watchdog is not None and not pc._watchdog.done()
+        await pc.stop()
+        assert pc._watchdog is None
+
+        await pc.play(h.vc)
+        assert not pc._watchdog.done()
+        # The queue runs out: the watchdog is stopped with the playback
+        h.vc._finish(h.vc.source)
+        await h.settle()
+        assert pc.state == Playback.State.IDLE
+        assert pc._watchdog is None
+        h.assert_released()
+
+    asyncio.run(main())
+
+
+def test_watchdog_resumes_stalled_stream():
+    async def main():
+        h = Harness(auto_end=False)
+        pc = h.controller
+        pc.WATCHDOG_INTERVAL = 0.01
+        pc.STALL_TIMEOUT = 0.05
+        h.queue.add_queue([url(0)], False)
+        await pc.play(h.vc)
+        # The voice thread never reads a frame: the stream counts as stalled
+        h.vc.source.last_read = time.monotonic() - 1
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(h.streams) > 1:
+                break
+        assert len(h.streams) == 2, 'stalled stream was not re-resolved'
+        assert pc.current == url(0)
+
+        await pc.stop()
+        await h.settle()
+        h.assert_released()
+
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from Player import Player
+
+
+def audio(format_id: str, acodec: str, abr: float, protocol: str = 'https', **fields) -> dict:
+    return dict(format_id=format_id, url=f'https://example.com/{format_id}', vcodec='none',
+                acodec=acodec, abr=abr, protocol=protocol, **fields)
+
+
+FORMATS = [
+    audio('139', 'mp4a.40.5', 48),
+    audio('249', 'opus', 50),
+    audio('250', 'opus', 70),
+    audio('140', 'mp4a.40.2', 129),
+    audio('251', 'opus', 135),
+    audio('233', 'mp4a.40.2', 130, protocol='m3u8_native'),
+    dict(format_id='18', url='https://example.com/18', vcodec='avc1', acodec='mp4a.40.2', abr=96),
+]
+
+
+def selected(formats: list, kbps: int) -> str:
+    return Player.select_audio_format(formats, kbps * 1000)['format_id']
+
+
+def test_smallest_opus_at_or_above_the_channel_bitrate():
+    assert selected(FORMATS, 64) == '250'
+    assert selected(FORMATS, 96) == '251'
+    assert selected(FORMATS, 8) == '249'
+
+
+def test_largest_opus_below_a_high_channel_bitrate():
+    assert selected(FORMATS, 384) == '251'
+
+
+def test_no_audio_only_format():
+    assert Player.select_audio_format([FORMATS[-1]], 64000) is None
+
+
+def test_original_language_and_non_drc_audio_track():
+    formats = [
+        audio('249-0', 'opus', 50, language='es', language_preference=-1, format_note='Spanish, low'),
+        audio('250-0', 'opus', 70, language='es', language_preference=-1, format_note='Spanish, low'),
+        audio('251-0', 'opus', 135, language='es', language_preference=-1, format_note='Spanish, medium'),
+        audio('251-drc', 'opus', 120, language='en', language_preference=10,
+              format_note='English original (default), medium, DRC'),
+        audio('140-1', 'mp4a.40.2', 129, language='en', language_preference=10,
+              format_note='English original (default), medium'),
+        audio('251-1', 'opus', 135, language='en', language_preference=10,
+              format_note='English original (default), medium'),
+    ]
+    assert selected(formats, 64) == '251-1'
+    assert selected(formats, 384) == '251-1'
+    # A DRC variant is only used if it is all the original track has
+    assert selected([f for f in formats if f['format_id'] != '251-1'], 64) == '140-1'
+    assert selected([f for f in formats if f['language'] == 'es' or f['format_id'] == '251-drc'], 64) == '251-drc'